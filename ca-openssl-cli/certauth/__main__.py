@@ -14,7 +14,8 @@ on the command line. For each client specifier:
     to the client name.
 
 PFX files for client certificates will be passcode-protected. The passcode will
-be the client name.
+be the client name. The encryption of PFX files is selected by the --pfx-profile
+option, which can also skip them.
 
 The script can take a list of certificate purpose specifiers too. By example:
 
@@ -26,7 +27,20 @@ The script can take a list of certificate purpose specifiers too. By example:
     -   Second has the purposes Encryption and Signature.
 -   "a,es" is a short form of "Auth,EncryptSign".
 
-The script generates a certificate set for each client."""
+The script generates a certificate set for each client.
+
+Other commands work on an existing depot. Run them with --help for their usage.
+
+-   benchmark, to measure the time taken by each stage of issuing certificates.
+-   crl, to create a certificate revocation list, or a delta CRL.
+-   expiring, to list or renew certificates that expire soon.
+-   import-p7b, to import certificates signed by an external CA from PKCS #7.
+-   list, to list certificates from the depot index.
+-   merge, to combine shard depots into the depot.
+-   ocsp, to run an OCSP responder for the certificates in the depot.
+-   revoke, to revoke certificates by client or serial number.
+-   serve, to run a local service that issues certificates over HTTP.
+-   verify, to check the chain, key usages, and PFX of every certificate."""
 
 # This file makes a runnable module. To get the command line usage, run it like
 # this.
@@ -42,6 +56,10 @@ The script generates a certificate set for each client."""
 # Reference: https://docs.python.org/3/library/argparse.html
 import argparse
 #
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
 # Module for the operating system interface.
 # https://docs.python.org/3/library/sys.html
 from sys import argv, exit
@@ -54,8 +72,15 @@ import textwrap
 # Local imports.
 #
 # The main code, CertificateAuthority, and purpose helper, CertificatePurpose.
+from certauth.bundle_archive import archive_path, archiveFormats
 from certauth.certificate_authority import CertificateAuthority
+from certauth.certificate_backend import backendNames, keyTypes
+from certauth.certificate_configuration import depotLayouts
 from certauth.certificate_purpose import CertificatePurpose
+from certauth.commands import commands
+from certauth.depot_shard import shard_argument
+from certauth.export_profile import (
+    ExportProfile, exportProfileNames, iterations_argument)
 # Dot notation can be used because there is an __init__.py file in this
 # directory.
 
@@ -70,6 +95,13 @@ class CountryCodeAction(argparse.Action):
         setattr(namespace, self.dest, values)
 
 def main(commandLine):
+    # Commands are the first argument. A client with the same name as a
+    # command can still be given after a double dash, like this.
+    #
+    #     python3 -m certauth -- list
+    if len(commandLine) > 1 and commandLine[1] in commands:
+        return commands[commandLine[1]](commandLine[2:])
+
     argumentParser = argparse.ArgumentParser(
         prog="python3 -m certauth",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -82,6 +114,124 @@ def main(commandLine):
         '--copies', default=1, type=int, help=
         'Create multiple copies of each certificate.'
         ' Each copy has its own private key. Default: 1.')
+    argumentParser.add_argument(
+        '-j', '--jobs', default=1, type=int, help=
+        'Number of certificates to create in parallel. Output for each'
+        ' certificate is printed in one piece, in the usual order.'
+        ' Zero means one job per CPU. Default: 1.')
+    argumentParser.add_argument(
+        '--asyncio', dest='asyncDriver', action='store_true', help=
+        'Run the openssl commands as asyncio subprocesses in one thread,'
+        ' instead of running each job in a thread of its own. The --jobs option'
+        ' is the limit on how many certificates are created at the same time.')
+    argumentParser.add_argument(
+        '--pipe', dest='pipeline', action='store_true', help=
+        'Pass the CSR and certificate from one openssl command to the next'
+        ' through pipes instead of through files in the depot. There are three'
+        ' openssl processes per certificate instead of four, and no CSR files.'
+        ' The key, certificate, and PFX files are written as usual.')
+    argumentParser.add_argument(
+        '--scratch-dir', dest='scratchDir', metavar='DIRECTORY', default=None
+        , type=Path, help=
+        'Create the files of each certificate in a directory for the run under'
+        ' DIRECTORY, like /dev/shm, and then move the key, certificate, and PFX'
+        ' into the depot, each atomically. CSR files are deleted. Default:'
+        ' create files in the depot.')
+    argumentParser.add_argument(
+        '--depot-layout', dest='depotLayout', default=None
+        , choices=depotLayouts, help=
+        'Layout of the client files in the depot. "sharded" puts the files of'
+        ' each client in one of 256 subdirectories, by a hash of the client'
+        ' name, which is better for tens of thousands of clients. The layout is'
+        ' recorded in the depot and used by later runs and other commands.'
+        ' Certificates already in the depot stay where they are. Default: the'
+        ' recorded layout, or "flat".')
+    argumentParser.add_argument(
+        '--shard', metavar='I/N', default=None, type=shard_argument, help=
+        'Issue shard I of N shards of the run, so that it can be spread over'
+        ' N hosts. The shard gets every Nth client, starting with the Ith, and'
+        ' a range of serial numbers that no other shard uses. Its files go in a'
+        ' shard depot next to the depot, like "example.com.shard-1-of-4". The'
+        ' authority is read from the depot, which needs to have been created'
+        ' already, and copied to each host. Combine the shard depots with the'
+        ' merge command afterwards.')
+    argumentParser.add_argument(
+        '--archive', dest='archivePath', metavar='PATH', default=None
+        , type=archive_path, help=
+        'Add the PFX of each certificate to an archive as soon as it is'
+        ' created, as well as leaving it in the depot. The archive has a'
+        ' manifest.jsonl member at the end with an entry for each certificate.'
+        f' PATH ends with one of {", ".join(archiveFormats)}. The archive is'
+        ' replaced if it exists.')
+    argumentParser.add_argument(
+        '--archive-certificates', dest='archiveCertificates'
+        , action='store_true', help=
+        'Add the certificate PEM of each certificate to the --archive too.')
+    argumentParser.add_argument(
+        '--keep-intermediates', dest='keepIntermediates', action='store_true'
+        , help='Keep the CSR files in --pipe or --scratch-dir mode too.')
+    argumentParser.add_argument(
+        '--incremental', action='store_true', help=
+        'Only create certificates that are missing, that are due for renewal,'
+        ' or whose subject, purposes, key settings, or authority have changed'
+        ' since they were created. The depot manifest records what each'
+        ' certificate was created from. Default is to create every'
+        ' certificate.')
+    argumentParser.add_argument(
+        '--renew-within', dest='renewWithin', metavar='DAYS', default=7
+        , type=int, help=
+        'Renewal period for --incremental. Certificates that expire within'
+        ' this many days are created again. Default: 7.')
+    argumentParser.add_argument(
+        '--metrics', dest='metricsPath', metavar='PATH', default=None, type=str
+        , help=
+        'Write metrics of the run to a file, or to stdout if PATH is "-". The'
+        ' metrics are the time, return code, and bytes written of each stage of'
+        ' each certificate, summarised as totals, percentiles, and histograms,'
+        ' and the slowest clients. Default: no metrics.')
+    argumentParser.add_argument(
+        '--metrics-format', dest='metricsFormat', default="json"
+        , choices=("json", "prometheus"), help=
+        'Format of --metrics output. "prometheus" is the Prometheus text'
+        ' exposition format, for a node exporter textfile collector for'
+        ' example. Default: "json".')
+    argumentParser.add_argument(
+        '--key-pool', dest='keyPoolSize', metavar='SIZE', default=0, type=int
+        , help=
+        'Take client keys from a pool of pre-generated keys in the depot, and'
+        ' keep the pool topped up to SIZE keys in the background. If the pool'
+        ' is empty then keys are generated as usual. Default: 0, no pool.')
+    argumentParser.add_argument(
+        '--fill-key-pool', dest='fillKeyPool', action='store_true', help=
+        'Fill the key pool up to the --key-pool size and then exit without'
+        ' creating any certificates. Use the --jobs option to fill in'
+        ' parallel.')
+    argumentParser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=
+        'Code that creates keys and certificates. "openssl" runs the openssl'
+        ' CLI for each step. "cryptography" runs in process and requires the'
+        f' cryptography Python package. Default: "{backendNames[0]}".')
+    argumentParser.add_argument(
+        '--key-type', dest='keyType', default=keyTypes[0], choices=keyTypes
+        , help=
+        'Type and size of keys, for the authority if it is created, and for'
+        ' client certificates. EC keys are quicker to generate and make smaller'
+        ' files. Key usages that need an RSA key are left out of certificates'
+        ' with EC keys, or replaced with keyAgreement.'
+        f' Default: "{keyTypes[0]}".')
+    argumentParser.add_argument(
+        '--pfx-profile', dest='exportProfile', default=exportProfileNames[0]
+        , choices=exportProfileNames, help=
+        'Encryption of client PFX files: ' + ExportProfile.usage() + '. Can'
+        ' be set per client in the clients file.'
+        f' Default: "{exportProfileNames[0]}".')
+    argumentParser.add_argument(
+        '--pfx-iterations', dest='pfxIterations', metavar='COUNT'
+        , default=None, type=iterations_argument, help=
+        'Iteration count of the key derivation and MAC of client PFX files,'
+        ' instead of the default of the profile. Fewer iterations are quicker'
+        ' to create, and to open, and quicker to crack.')
     argumentParser.add_argument(
         '-d', '--domain', default="example.com", type=str, help=
         'Internet domain to append to any client names that ' "aren't" ' email'
@@ -117,6 +267,21 @@ def main(commandLine):
         , default=CertificatePurpose.humanSuffixes(), type=str, help=
         'Specifier for certificate purposes.'
         f' Default: "{CertificatePurpose.humanSuffixes()}"')
+    argumentParser.add_argument(
+        '--clients-file', dest='clientsFile', metavar='PATH', default=None
+        , type=str, help=
+        'Read clients from a file, or from stdin if PATH is "-", instead of'
+        ' from the command line. Each line can be a client specifier, a CSV'
+        ' line of client, domain, purposes, and pfx, or a JSON object with'
+        ' "client", "domain", "purposes", and "pfx" members. Domain, purposes,'
+        ' and pfx, which is a --pfx-profile, are optional.'
+        ' Progress is saved in a checkpoint file so that an interrupted run'
+        ' resumes where it stopped.')
+    argumentParser.add_argument(
+        '--checkpoint', dest='checkpointPath', metavar='PATH', default=None
+        , type=Path, help=
+        'Checkpoint file for --clients-file. Default: the clients file name'
+        ' with ".checkpoint" appended, in the depot directory.')
     argumentParser.add_argument(
         dest='clients', metavar='client', default=["user01"], type=str
         , nargs='*', help=
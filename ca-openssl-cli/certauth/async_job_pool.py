@@ -0,0 +1,98 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for asynchronous I/O.
+# https://docs.python.org/3/library/asyncio.html
+import asyncio
+#
+# Module for spawning a process to run a command. Only used for its constants
+# and the CompletedProcess class.
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+#
+# Module for threads. Only used for the event loop thread.
+# https://docs.python.org/3/library/threading.html
+import threading
+#
+# Local imports.
+#
+from certauth.job_pool import (
+    JobPool, capture_async, command_environment, job_output)
+
+async def run_async(command, input=None, capture=False, environment=None):
+    """Same as job_pool.run(), but the command runs as an asyncio subprocess so
+    that the event loop can get on with other jobs while it waits."""
+    output = job_output()
+    process = await asyncio.create_subprocess_exec(
+        *command, env=command_environment(environment)
+        , stdin=None if input is None else subprocess.PIPE
+        , stdout=(
+            subprocess.PIPE if capture or output is not None else None)
+        , stderr=(
+            None if output is None
+            else subprocess.PIPE if capture else subprocess.STDOUT))
+    stdout, stderr = await process.communicate(
+        None if input is None else input.encode('utf-8'))
+    stdout = None if stdout is None else stdout.decode('utf-8', 'replace')
+    stderr = None if stderr is None else stderr.decode('utf-8', 'replace')
+    if output is not None:
+        if capture:
+            output.append(stderr)
+        else:
+            output.append(stdout)
+            stdout = None
+    return subprocess.CompletedProcess(
+        command, process.returncode, stdout, stderr)
+
+class AsyncJobPool(JobPool):
+    """Job pool that runs coroutine function jobs in an asyncio event loop,
+    instead of running jobs in threads.
+
+    The event loop runs in a thread of its own. At most jobs jobs run at the
+    same time. Output is printed in order, same as the JobPool base class."""
+
+    asynchronous = True
+
+    def _start(self):
+        self._executor = None
+        self._limit = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _stop(self, cancel=False):
+        if cancel:
+            for item in self._pending:
+                if hasattr(item, 'cancel'):
+                    item.cancel()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _limited(self, job, *args):
+        # The semaphore is created here so that it's in the event loop.
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self._jobs)
+        async with self._limit:
+            return await capture_async(job, *args)
+
+    def submit(self, job, *args):
+        if not asyncio.iscoroutinefunction(job):
+            # Plain jobs, like messages about failures, run in a thread.
+            plainJob = job
+            async def job(*args):
+                return await asyncio.to_thread(plainJob, *args)
+        self._pending.append(asyncio.run_coroutine_threadsafe(
+            self._limited(job, *args), self._loop))
+        while len(self._pending) > self._window:
+            self._emit_one()
@@ -0,0 +1,43 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Local imports.
+#
+from certauth.certificate_details import CertificateDetails
+
+class AuthorityMaterial:
+    """Authority certificate, and key if the backend can hold one, loaded once
+    and then reused for every client certificate in a run."""
+
+    def __init__(self, authority):
+        details = CertificateDetails.from_PEM(
+            authority.authorityCertPath.read_text())
+        if len(details) == 0:
+            raise ValueError(
+                f'No certificate in "{authority.authorityCertPath}".')
+        self._details = details[0]
+        self._pem = self._details.pem
+        self._handle = authority.backend.loadAuthority(authority)
+
+    @property
+    def pem(self):
+        """Authority certificate in PEM format, same as the output of openssl
+        x509 -in authority.cer."""
+        return self._pem
+
+    @property
+    def details(self):
+        return self._details
+
+    @property
+    def handle(self):
+        """Whatever the backend returned from loadAuthority(), which could be
+        None."""
+        return self._handle
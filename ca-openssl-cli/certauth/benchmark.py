@@ -0,0 +1,292 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Benchmark of the issuance pipeline, run like `python3 -m certauth benchmark`.
+Certificates are issued into a scratch depot, for each of a number of purposes
+specifiers, and the times of each stage are appended to a JSON lines file."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for command line switches.
+# https://docs.python.org/3/library/argparse.html
+import argparse
+#
+# Module for dates and times. Only used to time stamp results.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for JSON.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for the operating system interface.
+# https://docs.python.org/3/library/os.html
+import os
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for platform information. Only used to describe the host in results.
+# https://docs.python.org/3/library/platform.html
+import platform
+#
+# Module for high-level file operations. Only used for directory tree removal.
+# https://docs.python.org/3/library/shutil.html#shutil.rmtree
+import shutil
+#
+# Module for spawning a process to run a command. Only used to get the openssl
+# version.
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+#
+# Module for temporary files. Only used for the scratch directory.
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+#
+# Module for time. Only used for the performance counter.
+# https://docs.python.org/3/library/time.html#time.perf_counter
+import time
+#
+# Local imports.
+#
+from certauth.async_job_pool import AsyncJobPool
+from certauth.certificate_authority import CertificateAuthority
+from certauth.certificate_backend import backendNames, keyTypes
+from certauth.export_profile import exportProfileNames, iterations_argument
+from certauth.job_pool import JobPool
+from certauth.stage_timings import clientStages
+
+# Purposes specifiers that are benchmarked by default. One certificate with all
+# purposes, two certificates, and three certificates per client.
+defaultSpecifiers = ("aes", "a,es", "a,e,s")
+
+# Stages that are timed by the benchmark, as well as the client stages. The
+# purposes stage is parsing the purposes specifier, and the cnf stage is making
+# the CNF text for one client.
+benchmarkStages = ("authority", "purposes", "cnf") + clientStages
+
+def _authority(arguments):
+    # Same defaults as the main command line.
+    authority = CertificateAuthority()
+    authority.domain = "example.com"
+    authority.authorityStem = "authority"
+    authority.backendName = arguments.backendName
+    authority.keyType = arguments.keyType
+    authority.exportProfile = arguments.exportProfile
+    authority.pfxIterations = arguments.pfxIterations
+    authority.pipeline = arguments.pipeline
+    authority.countryCode = "UK"
+    authority.stateName = "Example State"
+    authority.localityName = "Example Locality"
+    authority.organisationName = "Example Organisation"
+    authority.organisationalUnitName = "Example Unit"
+    authority.copies = arguments.copies
+    authority.jobs = arguments.jobs
+    authority.incremental = False
+    authority.keyPoolSize = 0
+    return authority
+
+def _openssl_version():
+    try:
+        return subprocess.run(
+            ["openssl", "version"], capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        return None
+
+def _run_one(arguments, purposesSpecifier, log):
+    """Benchmark one purposes specifier. Return a dictionary of results, or
+    None if the authority couldn't be created."""
+    authority = _authority(arguments)
+    timings = authority.timings
+    # The authority is created in a job so that its output goes to the log.
+    with JobPool(1, log) as jobPool:
+        jobPool.submit(authority.createAuthority)
+    if jobPool.failed > 0:
+        return None
+
+    authority.purposesSpecifier = purposesSpecifier
+    with timings.stage("purposes"):
+        ok = authority.parsePurposesSpecifier()
+    if not ok:
+        return None
+
+    start = time.perf_counter()
+    with (AsyncJobPool if arguments.asyncDriver else JobPool)(
+        authority.jobs, log
+    ) as jobPool:
+        authority.serialAllocator.blockSize = (
+            1 if jobPool.jobs <= 1 else jobPool.jobs * 4)
+        for index in range(arguments.count):
+            clientName = f"bench{index + 1:05d}"
+            email = f"{clientName}@{authority.domain}"
+            with timings.stage("cnf"):
+                cnfs = tuple(authority.client_CNFs(
+                    authority.depotPath, clientName, email))
+            for clientPath, purposes, cnfText in cnfs:
+                for copy in (
+                    ("",) if authority.copies <= 1
+                    else tuple(f"{copy}" for copy in range(
+                        1, authority.copies + 1))
+                ):
+                    jobPool.submit(
+                        authority.createClientAsync if jobPool.asynchronous
+                        else authority.createClient
+                        , clientName, email, purposes, clientPath, copy)
+    seconds = time.perf_counter() - start
+    authority.index.close()
+
+    return {
+        "purposes": purposesSpecifier,
+        "clients": arguments.count,
+        "certificates": jobPool.succeeded,
+        "failed": jobPool.failed,
+        "seconds": seconds,
+        "throughput": jobPool.succeeded / seconds if seconds > 0 else None,
+        "stages": {
+            name: timings.summary(name) for name in benchmarkStages
+            if len(timings.durations(name)) > 0}
+    }
+
+def _print_result(result):
+    print(
+        f'Purposes "{result["purposes"]}".'
+        f' Certificates: {result["certificates"]}.'
+        f' Failed: {result["failed"]}.'
+        f' Seconds: {result["seconds"]:.2f}.'
+        f' Per second: {result["throughput"] or 0:.2f}.')
+    print(f'    {"stage":<10}{"count":>8}{"p50 ms":>10}{"p95 ms":>10}'
+          f'{"max ms":>10}')
+    for name, summary in result["stages"].items():
+        print(
+            f'    {name:<10}{summary["count"]:>8}'
+            + "".join(
+                f'{summary[key] * 1000:>10.1f}' for key in ("p50", "p95", "max")
+            ))
+
+def benchmark_command(commandLine):
+    parser = argparse.ArgumentParser(
+        prog="python3 -m certauth benchmark", description=
+        "Issue certificates into a scratch depot and report the throughput,"
+        " and the p50 and p95 time of each stage. Results are appended to a"
+        " JSON lines file so that runs can be compared.")
+    parser.add_argument(
+        '-n', '--count', default=100, type=int, help=
+        'Number of clients for each purposes specifier. Default: 100.')
+    parser.add_argument(
+        '--copies', default=1, type=int, help=
+        'Copies of each certificate. Default: 1.')
+    parser.add_argument(
+        '-p', '--purposes', dest='purposesSpecifiers', metavar='SPECIFIER'
+        , nargs='+', default=list(defaultSpecifiers), help=
+        'Purposes specifiers to benchmark.'
+        f' Default: {" ".join(defaultSpecifiers)}')
+    parser.add_argument(
+        '-j', '--jobs', default=1, type=int, help=
+        'Number of certificates to create in parallel. Zero means one job per'
+        ' CPU. Default: 1.')
+    parser.add_argument(
+        '--asyncio', dest='asyncDriver', action='store_true', help=
+        'Run the openssl commands as asyncio subprocesses, same as the main'
+        ' command line option.')
+    parser.add_argument(
+        '--pipe', dest='pipeline', action='store_true', help=
+        'Pass the CSR and certificate through pipes, same as the main command'
+        ' line option.')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=f'Default: "{backendNames[0]}".')
+    parser.add_argument(
+        '--key-type', dest='keyType', default=keyTypes[0], choices=keyTypes
+        , help=f'Default: "{keyTypes[0]}".')
+    parser.add_argument(
+        '--pfx-profile', dest='exportProfile', default=exportProfileNames[0]
+        , choices=exportProfileNames, help=
+        'Same as the main command line option.'
+        f' Default: "{exportProfileNames[0]}".')
+    parser.add_argument(
+        '--pfx-iterations', dest='pfxIterations', metavar='COUNT'
+        , default=None, type=iterations_argument, help=
+        'Same as the main command line option.')
+    parser.add_argument(
+        '--scratch', dest='scratchPath', default=None, type=Path, help=
+        'Directory in which to create the scratch depot. Default: a new'
+        ' temporary directory, which is deleted afterwards.')
+    parser.add_argument(
+        '--keep', action='store_true', help=
+        'Keep the scratch depot of the last purposes specifier, and the log.'
+        ' Default is to delete them.')
+    parser.add_argument(
+        '-o', '--output', dest='outputPath', default=Path("benchmark.jsonl")
+        , type=Path, help=
+        'JSON lines file to which to append one line of results per purposes'
+        ' specifier. Default: "benchmark.jsonl"')
+    parser.add_argument(
+        '--label', default=None, type=str, help=
+        'Label to record with the results, like a branch name.')
+    arguments = parser.parse_args(commandLine)
+
+    outputPath = arguments.outputPath.resolve()
+    scratchPath = (
+        Path(tempfile.mkdtemp(prefix="certauth-benchmark-"))
+        if arguments.scratchPath is None else arguments.scratchPath.resolve())
+    scratchPath.mkdir(parents=True, exist_ok=True)
+    logPath = Path(scratchPath, "benchmark.log")
+    print(f'Benchmarking in "{scratchPath}". Log "{logPath}".')
+
+    environment = {
+        "time": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "label": arguments.label,
+        "backend": arguments.backendName,
+        "keyType": arguments.keyType,
+        "pfxProfile": arguments.exportProfile,
+        "pfxIterations": arguments.pfxIterations,
+        "jobs": arguments.jobs,
+        "asyncio": arguments.asyncDriver,
+        "pipe": arguments.pipeline,
+        "copies": arguments.copies,
+        "cpus": os.cpu_count(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "openssl": _openssl_version()
+    }
+    # The depot path is also the domain of the client email addresses, so the
+    # benchmark runs in the scratch directory and the depot has the usual
+    # relative name.
+    returnCode = 0
+    workingDirectory = os.getcwd()
+    try:
+        os.chdir(scratchPath)
+        with open(logPath, "w") as log:
+            for purposesSpecifier in arguments.purposesSpecifiers:
+                result = _run_one(arguments, purposesSpecifier, log)
+                if result is None:
+                    print(f'Failed to benchmark "{purposesSpecifier}".')
+                    returnCode = 3
+                    continue
+                _print_result(result)
+                if result["failed"] > 0:
+                    returnCode = 3
+                with open(outputPath, "a") as file:
+                    file.write(json.dumps({**environment, **result}) + "\n")
+    finally:
+        os.chdir(workingDirectory)
+        if arguments.keep:
+            pass
+        elif arguments.scratchPath is None:
+            shutil.rmtree(scratchPath, ignore_errors=True)
+        else:
+            # Only delete what the benchmark created, in case the scratch
+            # directory has other files in it.
+            shutil.rmtree(Path(scratchPath, "example.com"), ignore_errors=True)
+            logPath.unlink(missing_ok=True)
+    print(f'Results appended to "{outputPath}".')
+    return returnCode
@@ -0,0 +1,144 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for command line switches. Only used for the argument type error.
+# https://docs.python.org/3/library/argparse.html
+import argparse
+#
+# Module for dates and times. Only used for member time stamps.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime
+#
+# Module for in-memory streams. Only used to add members to tar archives.
+# https://docs.python.org/3/library/io.html#io.BytesIO
+import io
+#
+# Module for JSON.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for tar archives.
+# https://docs.python.org/3/library/tarfile.html
+import tarfile
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+#
+# Module for time. Only used for member time stamps.
+# https://docs.python.org/3/library/time.html
+import time
+#
+# Module for zip archives.
+# https://docs.python.org/3/library/zipfile.html
+import zipfile
+
+# Endings of archive file names, and the tarfile mode of each, or None for zip.
+archiveFormats = {
+    ".tar.gz": "w:gz", ".tgz": "w:gz", ".tar": "w", ".zip": None
+}
+
+# Name of the manifest member, which is written last.
+manifestName = "manifest.jsonl"
+
+def archive_path(text):
+    """Argument type for an archive path, which has to end with one of the
+    archiveFormats endings."""
+    if not text.lower().endswith(tuple(archiveFormats)):
+        raise argparse.ArgumentTypeError(
+            f'Archive "{text}" should end with one of'
+            f' {", ".join(archiveFormats)}.')
+    return Path(text)
+
+class BundleArchive:
+    """Archive to which the files of each certificate are added as soon as the
+    certificate is created, so that there's no second pass over the depot.
+
+    The PFX of each certificate is added, and the certificate PEM if
+    withCertificates is True. A JSON lines manifest with an entry for each
+    certificate is added at the end, by close(). Certificates can be added from
+    any thread."""
+
+    def __init__(self, path, withCertificates=False):
+        self._path = Path(path)
+        self._withCertificates = withCertificates
+        self._lock = threading.Lock()
+        self._entries = []
+        mode = next(
+            mode for ending, mode in archiveFormats.items()
+            if self._path.name.lower().endswith(ending))
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._zip = None
+        self._tar = None
+        if mode is None:
+            self._zip = zipfile.ZipFile(
+                self._path, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            self._tar = tarfile.open(self._path, mode)
+
+    @property
+    def path(self):
+        return self._path
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _add_bytes(self, name, content):
+        if self._zip is not None:
+            self._zip.writestr(
+                zipfile.ZipInfo(name, datetime.now().timetuple()[:6])
+                , content, compress_type=zipfile.ZIP_DEFLATED)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mtime = int(time.time())
+            info.mode = 0o600
+            self._tar.addfile(info, io.BytesIO(content))
+
+    def add(self, certificate, details):
+        """Add the files of a certificate that has just been created. The
+        details are its CertificateDetails."""
+        members = (
+            [certificate.exportPath] if certificate.exportProfile.exports
+            else []) + (
+            [certificate.certPath] if self._withCertificates else [])
+        # Files are read outside the lock so that only the archive writing is
+        # serialised.
+        contents = [(path.name, path.read_bytes()) for path in members]
+        entry = {
+            "stem": certificate.stem.name,
+            "client": certificate.clientName,
+            "email": certificate.email,
+            "purposes": certificate.purposesSuffix,
+            "serial": f"{details.serial:X}",
+            "notAfter": details.notAfter.isoformat(),
+            "files": [name for name, _ in contents]
+        }
+        with self._lock:
+            for name, content in contents:
+                self._add_bytes(name, content)
+            self._entries.append(entry)
+
+    def close(self):
+        with self._lock:
+            self._add_bytes(manifestName, "".join(
+                json.dumps(entry) + "\n" for entry in self._entries
+            ).encode('utf-8'))
+            if self._zip is not None:
+                self._zip.close()
+            else:
+                self._tar.close()
@@ -0,0 +1,186 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Import of certificates signed by an external CA, like ADFS, from PKCS #7
+bundles, run like `python3 -m certauth import-p7b`. The keys are created as
+usual, in the depot, and their CSRs signed elsewhere. The certificates come
+back in bundles of any size, in any order.
+
+Bundles are read by the DER parser in one pass, and each certificate is matched
+to the private key file in the depot that has the same public key. The
+certificate is written next to its key, as a .cer.pem file, with a PFX of the
+key and the full chain, made of the other certificates in the bundles. Existing
+files for the key are replaced. PFX files are written in parallel jobs."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for process pools. Only used to read key files in parallel.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ProcessPoolExecutor
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Local imports.
+#
+from certauth.certificate_details import (
+    CertificateDetails, pem_text, pkcs7_certificates, private_key_id,
+    public_key_id)
+from certauth.depot_index import _certificate_row
+from certauth.export_profile import ExportProfile
+from certauth.job_pool import JobPool, report
+
+# Ending of the name of a private key file in the depot.
+keySuffix = ".key.pem"
+
+def _key_id(keyPath):
+    # Runs in a worker process when there are parallel jobs.
+    try:
+        return private_key_id(keyPath.read_text())
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def depot_keys(depotPath, jobs=1):
+    """Dictionary of public key identifier to the path of each private key file
+    in the depot. Keys in the key pool are left out."""
+    keyPaths = [
+        path for path in depotPath.rglob("*" + keySuffix)
+        if "keypool" not in path.relative_to(depotPath).parts]
+    if jobs <= 1 or len(keyPaths) < 2:
+        keyIds = map(_key_id, keyPaths)
+        return {
+            keyId: keyPath for keyPath, keyId in zip(keyPaths, keyIds)
+            if keyId is not None}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        keyIds = executor.map(
+            _key_id, keyPaths
+            , chunksize=max(1, len(keyPaths) // (jobs * 4)))
+        return {
+            keyId: keyPath for keyPath, keyId in zip(keyPaths, keyIds)
+            if keyId is not None}
+
+def read_bundles(bundlePaths):
+    """List of CertificateDetails of every certificate in the bundles, without
+    repeats, and the number of bundles that couldn't be read."""
+    certificates = {}
+    failed = 0
+    for bundlePath in bundlePaths:
+        try:
+            for der in pkcs7_certificates(Path(bundlePath).read_bytes()):
+                if der not in certificates:
+                    certificates[der] = CertificateDetails(der)
+        except (IndexError, OSError, ValueError) as error:
+            print(f'Failed to read bundle "{bundlePath}". {error}')
+            failed += 1
+    return list(certificates.values()), failed
+
+def chain_PEM(details, issuers):
+    """PEM of a certificate and then each of its issuers in turn, from a
+    dictionary of subject DER to issuer certificate, as far as they go."""
+    chain = [details]
+    while (
+        details.issuerDER != details.subjectDER
+        and details.issuerDER in issuers
+        and len(chain) <= len(issuers)
+    ):
+        details = issuers[details.issuerDER]
+        chain.append(details)
+    return "".join(pem_text(certificate.der) for certificate in chain)
+
+def passcode(details):
+    """Passcode for the PFX of a certificate, which is the client name, same as
+    for certificates created by the authority."""
+    email = details.subjectAttributes.get(
+        "emailAddress", details.subjectAttributes.get("CN", ""))
+    return email.partition("@")[0]
+
+def _name(details):
+    return details.subjectAttributes.get("CN", details.subject)
+
+def _no_key(details):
+    report(f'No key in the depot for "{_name(details)}". Not imported.')
+    return False
+
+def import_one(authority, details, chainPEM, keyPath):
+    """Write the certificate and PFX files of an imported certificate next to
+    its key, and add it to the depot index. The PFX has the export profile of
+    the authority. Return True for success."""
+    stem = keyPath.name[:-len(keySuffix)]
+    certPath = keyPath.with_name(stem + ".cer.pem")
+    exportPath = keyPath.with_name(stem + ".pfx")
+    certPath.write_text(pem_text(details.der))
+    exportProfile = ExportProfile[authority.exportProfile]
+    if not exportProfile.exports:
+        exportPath.unlink(missing_ok=True)
+    elif not authority.backend.exportPFX(
+        keyPath, chainPEM, exportPath, passcode(details), exportProfile
+        , authority.pfxIterations or exportProfile.iterations
+    ):
+        return False
+    row, error = _certificate_row(certPath, authority.depotPath)
+    if row is None:
+        report(f'For "{stem}" not indexed. {error}')
+        return False
+    row["exportProfile"] = exportProfile.name
+    authority.index.insert((row,))
+    return True
+
+def import_bundles(authority, bundlePaths, jobs=1):
+    """Import the certificates in PKCS #7 bundles whose keys are in the depot.
+    Return a tuple of the number imported, and the number of bundles and
+    certificates that failed."""
+    certificates, failed = read_bundles(bundlePaths)
+    # Certificates that issued any of the others, and the authority, go in the
+    # chains. The rest should each have a key in the depot.
+    issuerDERs = set(
+        details.issuerDER for details in certificates
+        if details.issuerDER != details.subjectDER)
+    issuers = {
+        details.subjectDER: details for details in certificates
+        if details.issuerDER == details.subjectDER
+        or details.subjectDER in issuerDERs}
+    # The authority key isn't needed so the certificate is read directly.
+    if authority.authorityCertPath.exists():
+        for details in CertificateDetails.from_PEM(
+            authority.authorityCertPath.read_text()
+        ):
+            issuers.setdefault(details.subjectDER, details)
+    leaves = [
+        details for details in certificates
+        if issuers.get(details.subjectDER) is not details]
+    print(
+        f'Certificates in bundles: {len(certificates)}.'
+        f' To import: {len(leaves)}.')
+
+    keys = depot_keys(authority.depotPath, jobs)
+    # If there's more than one certificate for a key, only the one issued last
+    # is imported.
+    newest = {}
+    for details in leaves:
+        keyId = public_key_id(details.publicKeyInfo)
+        if keyId in newest and newest[keyId].notBefore >= details.notBefore:
+            continue
+        newest[keyId] = details
+    with JobPool(jobs) as jobPool:
+        for details in leaves:
+            keyId = public_key_id(details.publicKeyInfo)
+            keyPath = keys.get(keyId)
+            if keyPath is None:
+                jobPool.submit(_no_key, details)
+            elif newest[keyId] is details:
+                jobPool.submit(
+                    import_one, authority, details
+                    , chain_PEM(details, issuers), keyPath)
+            else:
+                jobPool.skip(
+                    f'Skipped "{_name(details)}" serial {details.serial:X}.'
+                    ' There is a newer certificate for the same key.')
+    return jobPool.succeeded, failed + jobPool.failed
@@ -14,6 +14,22 @@
 #
 # Standard library imports, in alphabetic order.
 #
+# Module for asynchronous I/O. Only used for createClientAsync().
+# https://docs.python.org/3/library/asyncio.html
+import asyncio
+#
+# Module for dates and times. Only used for the renewal period.
+# https://docs.python.org/3/library/datetime.html
+from datetime import timedelta
+#
+# Module for secure hashes. Only used for digests of certificate settings.
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+#
+# Module for JSON. Only used for metrics output.
+# https://docs.python.org/3/library/json.html
+import json
+#
 # Module for OO path handling.
 # https://docs.python.org/3/library/pathlib.html
 from pathlib import Path
@@ -22,26 +38,102 @@ from pathlib import Path
 # https://docs.python.org/3/library/shutil.html#shutil.rmtree
 import shutil
 #
-# Module for spawning a process to run a command.
-# https://docs.python.org/3/library/subprocess.html
-import subprocess
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+#
+# Module for time. Only used for the run time in metrics.
+# https://docs.python.org/3/library/time.html#time.perf_counter
+import time
 #
 # Module for the operating system interface. Only used to return an error in
-# case an attempt is made to run this file as a standalone script.
+# case an attempt is made to run this file as a standalone script, and for
+# metrics output to stdout.
 # https://docs.python.org/3/library/sys.html
-from sys import stderr, exit
+from sys import stderr, stdout, exit
 #
 # Local imports.
 #
+from certauth.async_job_pool import AsyncJobPool
+from certauth.authority_material import AuthorityMaterial
 from certauth.certificate_purpose import CertificatePurpose
-from certauth.certificate_configuration import CertificateConfiguration
+from certauth.bundle_archive import BundleArchive
+from certauth.certificate_configuration import (
+    CertificateConfiguration, depotLayouts)
+from certauth.certificate_backend import backendNames, create_backend
+from certauth.certificate_details import CertificateDetails
+from certauth.client_certificate import ClientCertificate
+from certauth.client_source import Checkpoint, read_clients
+from certauth.depot_index import DepotIndex
+from certauth.depot_manifest import DepotManifest
+from certauth.depot_shard import (
+    in_shard, serial_range, shard_depot_path, write_shard_file)
+from certauth.export_profile import ExportProfile, exportProfileNames
+from certauth.job_pool import JobPool, job_count, report
+from certauth.key_pool import KeyPool
+from certauth.revocation_store import RevocationStore
+from certauth.scratch_directory import ScratchDirectory, move_file
+from certauth.serial_allocator import SerialAllocator
+from certauth.stage_timings import StageTimings, prometheus_text
 
 atSign = "@"
 
 class CertificateAuthority(CertificateConfiguration):
 
+    def __init__(self):
+        super().__init__()
+        # Backing attributes of CLI properties that have defaults. The defaults
+        # are the same as the command line, which doesn't set a property that
+        # already has a value.
+        self._archivePath = None
+        self._archiveCertificates = False
+        self._backendName = backendNames[0]
+        self._depotLayout = None
+        self._exportProfile = exportProfileNames[0]
+        self._keepIntermediates = False
+        self._pfxIterations = None
+        self._pipeline = False
+        self._scratchDir = None
+        self._shard = None
+        # Created or loaded on first use.
+        self._archive = None
+        self._backend = None
+        self._index = None
+        self._keyPool = None
+        self._manifest = None
+        self._recordedDepotLayout = None
+        self._revocations = None
+        self._scratch = None
+        self._authorityMaterial = None
+        self._authorityMaterialLock = threading.Lock()
+        self._purposesCache = {}
+        self._timings = StageTimings()
+
     # Properties that are set by the CLI.
     #
+    @property
+    def asyncDriver(self):
+        return self._asyncDriver
+    @asyncDriver.setter
+    def asyncDriver(self, asyncDriver):
+        self._asyncDriver = asyncDriver
+
+    # Archive to which to add the files of each certificate as it's created, or
+    # None for no archive.
+    @property
+    def archivePath(self):
+        return self._archivePath
+    @archivePath.setter
+    def archivePath(self, archivePath):
+        self._archivePath = archivePath
+
+    @property
+    def archiveCertificates(self):
+        return self._archiveCertificates
+    @archiveCertificates.setter
+    def archiveCertificates(self, archiveCertificates):
+        self._archiveCertificates = archiveCertificates
+
     @property
     def authorityStem(self):
         return self._authorityStem
@@ -50,6 +142,28 @@ class CertificateAuthority(CertificateConfiguration):
         self._authorityStem = authorityStem
         self._setComputedProperties()
 
+    @property
+    def backendName(self):
+        return self._backendName
+    @backendName.setter
+    def backendName(self, backendName):
+        self._backendName = backendName
+        self._backend = None
+
+    @property
+    def checkpointPath(self):
+        return self._checkpointPath
+    @checkpointPath.setter
+    def checkpointPath(self, checkpointPath):
+        self._checkpointPath = checkpointPath
+
+    @property
+    def clientsFile(self):
+        return self._clientsFile
+    @clientsFile.setter
+    def clientsFile(self, clientsFile):
+        self._clientsFile = clientsFile
+
     @property
     def clients(self):
         return self._clients
@@ -71,6 +185,110 @@ class CertificateAuthority(CertificateConfiguration):
     def create(self, create):
         self._create = create
 
+    # Name of the ExportProfile for PFX files, for clients that don't have
+    # their own in the clients file.
+    @property
+    def exportProfile(self):
+        return self._exportProfile
+    @exportProfile.setter
+    def exportProfile(self, exportProfile):
+        self._exportProfile = exportProfile
+
+    # Iteration count for PFX files, or None for the default of the profile.
+    @property
+    def pfxIterations(self):
+        return self._pfxIterations
+    @pfxIterations.setter
+    def pfxIterations(self, pfxIterations):
+        self._pfxIterations = pfxIterations
+
+    @property
+    def incremental(self):
+        return self._incremental
+    @incremental.setter
+    def incremental(self, incremental):
+        self._incremental = incremental
+
+    # Only CSR files for now. The other files of a certificate are always kept.
+    @property
+    def keepIntermediates(self):
+        return self._keepIntermediates
+    @keepIntermediates.setter
+    def keepIntermediates(self, keepIntermediates):
+        self._keepIntermediates = keepIntermediates
+
+    @property
+    def metricsPath(self):
+        return self._metricsPath
+    @metricsPath.setter
+    def metricsPath(self, metricsPath):
+        self._metricsPath = metricsPath
+
+    @property
+    def metricsFormat(self):
+        return self._metricsFormat
+    @metricsFormat.setter
+    def metricsFormat(self, metricsFormat):
+        self._metricsFormat = metricsFormat
+
+    # True to pass the CSR and certificate between the openssl commands through
+    # pipes, instead of through files.
+    @property
+    def pipeline(self):
+        return self._pipeline
+    @pipeline.setter
+    def pipeline(self, pipeline):
+        self._pipeline = pipeline
+
+    # Directory in which to create the files of each certificate, before the
+    # final files are moved into the depot. None to create them in the depot.
+    @property
+    def scratchDir(self):
+        return self._scratchDir
+    @scratchDir.setter
+    def scratchDir(self, scratchDir):
+        self._scratchDir = scratchDir
+        self._scratch = (
+            None if scratchDir is None else ScratchDirectory(scratchDir))
+
+    # Tuple of the shard number, from 1, and the number of shards, or None if
+    # the run isn't sharded. A shard has its own depot and serial number range.
+    @property
+    def shard(self):
+        return self._shard
+    @shard.setter
+    def shard(self, shard):
+        self._shard = shard
+        self._setComputedProperties()
+
+    @property
+    def renewWithin(self):
+        return self._renewWithin
+    @renewWithin.setter
+    def renewWithin(self, renewWithin):
+        self._renewWithin = renewWithin
+
+    @property
+    def jobs(self):
+        return self._jobs
+    @jobs.setter
+    def jobs(self, jobs):
+        self._jobs = jobs
+
+    @property
+    def fillKeyPool(self):
+        return self._fillKeyPool
+    @fillKeyPool.setter
+    def fillKeyPool(self, fillKeyPool):
+        self._fillKeyPool = fillKeyPool
+
+    @property
+    def keyPoolSize(self):
+        return self._keyPoolSize
+    @keyPoolSize.setter
+    def keyPoolSize(self, keyPoolSize):
+        self._keyPoolSize = keyPoolSize
+
     @property
     def domain(self):
         return self._domain
@@ -84,6 +302,14 @@ class CertificateAuthority(CertificateConfiguration):
     # End of CLI properties.
 
     # Computed properties
+    @property
+    def backend(self):
+        # Created on first use because the backend might need a module that
+        # isn't installed, which only matters if it's selected.
+        if self._backend is None:
+            self._backend = create_backend(self._backendName)
+        return self._backend
+
     @property
     def authorityKeyPath(self):
         return self._authorityKeyPath
@@ -96,10 +322,91 @@ class CertificateAuthority(CertificateConfiguration):
     def authoritySerialPath(self):
         return self._authoritySerialPath
 
+    @property
+    def authorityMaterial(self):
+        # Loaded on first use and then reused for every client certificate.
+        # The lock is for parallel jobs.
+        with self._authorityMaterialLock:
+            if self._authorityMaterial is None:
+                self._authorityMaterial = AuthorityMaterial(self)
+            return self._authorityMaterial
+
     @property
     def depotPath(self):
         return self._depotPath
 
+    # The layout is recorded in the depot so that other commands, like serve,
+    # and later runs use the same layout without being told.
+    @property
+    def depotLayoutPath(self):
+        return Path(self.depotPath, "layout")
+
+    # Layout set on the command line, or else the one recorded in the depot,
+    # or else the default.
+    @property
+    def depotLayout(self):
+        if self._depotLayout is not None:
+            return self._depotLayout
+        if self._recordedDepotLayout is None:
+            try:
+                self._recordedDepotLayout = (
+                    self.depotLayoutPath.read_text().strip())
+            except FileNotFoundError:
+                self._recordedDepotLayout = depotLayouts[0]
+        return self._recordedDepotLayout
+    @depotLayout.setter
+    def depotLayout(self, depotLayout):
+        self._depotLayout = depotLayout
+
+    def saveDepotLayout(self):
+        """Record the layout in the depot, if it isn't the default or there's
+        a layout recorded already."""
+        layout = self.depotLayout
+        if layout != depotLayouts[0] or self.depotLayoutPath.exists():
+            self.depotPath.mkdir(parents=True, exist_ok=True)
+            self.depotLayoutPath.write_text(layout + "\n")
+
+    @property
+    def keyPool(self):
+        # Created on first use because it needs the backend.
+        if self._keyPool is None:
+            self._keyPool = KeyPool(
+                Path(self.depotPath, "keypool"), self.backend, self.keyType)
+        return self._keyPool
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = DepotIndex(Path(self.depotPath, "index.sqlite3"))
+        return self._index
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = DepotManifest(
+                Path(self.depotPath, "manifest.jsonl"))
+        return self._manifest
+
+    @property
+    def revocations(self):
+        if self._revocations is None:
+            self._revocations = RevocationStore(
+                Path(self.depotPath, "revocations.sqlite3"))
+        return self._revocations
+
+    def crlPath(self, delta=False):
+        """Default path of the CRL, or of the delta CRL."""
+        return Path(self.depotPath, "".join((
+            self.authorityStem, ".delta" if delta else "", ".crl.pem")))
+
+    @property
+    def serialAllocator(self):
+        return self._serialAllocator
+
+    @property
+    def timings(self):
+        return self._timings
+
     # End of computed properties.
 
     def _setComputedProperties(self):
@@ -109,15 +416,25 @@ class CertificateAuthority(CertificateConfiguration):
         #     pass
         
         try:
-            self._depotPath = Path(self._domain)
+            self._depotPath = (
+                Path(self._domain) if self.shard is None
+                else shard_depot_path(self._domain, self.shard))
+            self._recordedDepotLayout = None
         except AttributeError:
             pass
 
+        # The authority is always in the depot of the domain. A shard has its
+        # own serial file, in its depot, for its own range of serial numbers.
         try:
-            authorityStem = Path(self._depotPath, self._authorityStem).resolve()
+            authorityStem = Path(self._domain, self._authorityStem).resolve()
             self._authorityKeyPath = authorityStem.with_suffix(".key")
             self._authorityCertPath = authorityStem.with_suffix(".cer")
-            self._authoritySerialPath = authorityStem.with_suffix(".srl")
+            self._authoritySerialPath = Path(
+                self._depotPath, self._authorityStem
+            ).resolve().with_suffix(".srl")
+            self._serialAllocator = SerialAllocator(
+                self._authoritySerialPath, serialRange=(
+                    None if self.shard is None else serial_range(self.shard)))
         except AttributeError:
             pass
 
@@ -132,6 +449,23 @@ class CertificateAuthority(CertificateConfiguration):
         #     raise FileExistsError(
         #         errno.EEXIST, os.strerror(errno.EEXIST), str(self.depotPath))
 
+        # The manifest, index, revocation store, key pool, layout, and shared
+        # CNF files are in the depot, which is about to be deleted. The key pool
+        # is stopped in case it's topping up in the background.
+        self._manifest = None
+        self._recordedDepotLayout = None
+        with self._sharedCNFLock:
+            self._sharedCNFPaths.clear()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        if self._revocations is not None:
+            self._revocations.close()
+            self._revocations = None
+        if self._keyPool is not None:
+            self._keyPool.stop()
+            self._keyPool = None
+
         try:
             shutil.rmtree(self.depotPath)
             print(f'Deleted depot directory "{self.depotPath.resolve()}"')
@@ -140,120 +474,464 @@ class CertificateAuthority(CertificateConfiguration):
 
         print(f'Creating depot directory "{self.depotPath.resolve()}"')
         self.depotPath.mkdir(parents=True)
-        commonName = f'{self.authorityStem}.{self.domain}'
-
-        # https://www.ibm.com/docs/en/ibm-mq/7.5?topic=certificates-distinguished-names
-        caCertCompleted = subprocess.run([
-            "openssl", "req", "-x509", "-new", "-nodes", "-batch", "-sha256"
-            , "-newkey", "rsa:2048", "-keyout", str(self.authorityKeyPath)
-            , "-out", str(self.authorityCertPath)
-            , "-subj", f'/CN={commonName}/C={self.countryCode}'
-            f'/ST={self.stateName}/L={self.localityName}'
-            f'/O={self.organisationName}/OU={self.organisationalUnitName}'
-        ])
-        runOK = caCertCompleted.returncode == 0
+        self.serialAllocator.reset()
+        with self.timings.stage("authority", None, (
+            self.authorityKeyPath, self.authorityCertPath)
+        ) as step:
+            runOK = self.backend.createAuthority(self)
+            step.returncode = 0 if runOK else 1
+        # Any authority material loaded before now is out of date.
+        with self._authorityMaterialLock:
+            self._authorityMaterial = None
         print(" ".join((
             "Generated" if runOK else "Failed to generate",
             "authority certificate and key.",
-            f"Return code {caCertCompleted.returncode}.")))
+            f'Backend "{self.backend.name}".')))
         return runOK
     
-    def createClient(self, clientName, cnfPath, suffix):
-        clientStem = cnfPath.with_stem(cnfPath.stem + suffix)
-        forClient = f'For "{clientStem.stem}" '
-
-        clientKeyPath = clientStem.with_suffix(".key.pem")
-        clientCSR_Path = clientStem.with_suffix(".csr.pem")
-        csrCompleted = subprocess.run([
-            "openssl", "req", "-new", "-nodes"
-            , "-newkey", "rsa:2048", "-keyout", str(clientKeyPath)
-            , "-out", str(clientCSR_Path), "-config", str(cnfPath)
-        ])
-        print(forClient + f'CSR and key {csrCompleted.returncode}.')
-        # Handy command to check the CSR, for key usages for example.
-        #
-        #     openssl req -in example.com/user01.csr.pem -text
-
-        clientCertPath = clientStem.with_suffix(".cer.pem")
-        signingCompleted = subprocess.run([
-            "openssl", "x509", "-req", "-in", str(clientCSR_Path)
-            , "-CAserial", str(self.authoritySerialPath), "-CAcreateserial"
-            , "-CA", str(self.authorityCertPath)
-            , "-CAkey", str(self.authorityKeyPath)
-            , "-out", str(clientCertPath)
-            # Add the CNF here, as well as in the csr step, because there
-            # doesn't seem to be an equivalent to copy_extensions in the openssl
-            # x509 command.
-            , "-extfile", str(cnfPath)
-        ])
-        print(forClient + f'signing {signingCompleted.returncode}.')
-
-        # TOTH how to create a PFX that includes the chain of trust.
-        # https://stackoverflow.com/a/18830742/7657675
-        clientPEM_Completed = subprocess.run([
-            "openssl", "x509" , "-in", str(clientCertPath)
-        ], stdout=subprocess.PIPE, text=True)
-        chainPEM = clientPEM_Completed.stdout
-        print(forClient + f'PEM {clientPEM_Completed.returncode}.')
-
-        authorityPEM_Completed = subprocess.run([
-            "openssl", "x509" , "-in", str(self.authorityCertPath)
-        ], stdout=subprocess.PIPE, text=True)
-        chainPEM += authorityPEM_Completed.stdout
-        print(forClient + f'authority PEM {authorityPEM_Completed.returncode}.')
-
-        # https://stackoverflow.com/questions/21141215/creating-a-p12-file#comment55842075_21141215
-        clientExportPath = clientStem.with_suffix(".pfx")
-        clientExportCompleted = subprocess.run([
-            "openssl", "pkcs12", "-export", "-nodes"
-            , "-inkey", str(clientKeyPath)
-            , "-out", str(clientExportPath)
-            , "-passout", f"pass:{clientName}"
-        ], input=chainPEM, text=True)
-        print(forClient + f'export {clientExportCompleted.returncode}.')
-
-    def _client_name_and_email(self, client):
+    def cnf_digest(self, cnfText, keySpec=None, exportProfile=None):
+        """Digest of everything that a client certificate is made from: the
+        CNF, which has the subject and purposes, the key settings, the export
+        settings, and the authority. If any of those change then the
+        certificate has to be created again."""
+        digest = hashlib.sha256(cnfText.encode('utf-8'))
+        digest.update((keySpec or self.keyType).encode('utf-8'))
+        digest.update(self.authorityMaterial.details.der)
+        # Default export settings aren't included, so that digests from before
+        # there were export profiles still match.
+        exportProfile = exportProfile or ExportProfile[self.exportProfile]
+        if (
+            exportProfile is not ExportProfile.modern
+            or self.pfxIterations is not None
+        ):
+            digest.update(
+                f"{exportProfile.name}:{self.pfxIterations}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _new_certificate(
+        self, clientName, email, purposes, clientPath, suffix, keySpec,
+        exportProfile
+    ):
+        certificate = ClientCertificate(
+            clientName, email, purposes, clientPath, suffix
+            , self.serialAllocator(), keySpec or self.keyType)
+        certificate.cnfPath = self.shared_CNF_path(
+            self.depotPath, certificate.purposes, certificate.keySpec)
+        certificate.exportProfile = (
+            exportProfile or ExportProfile[self.exportProfile])
+        certificate.exportIterations = self.pfxIterations
+        scratch = self._scratch
+        if scratch is not None:
+            certificate.scratchPath = scratch.path
+        certificate.keepCSR = self.keepIntermediates or not (
+            self.pipeline or scratch is not None)
+        if self.keyPoolSize > 0 and certificate.keySpec == self.keyType:
+            # If the pool is empty then the backend generates a key, as usual.
+            certificate.hasKey = self.keyPool.take(certificate.keyPath)
+        return certificate
+
+    def _move_to_depot(self, certificate):
+        # The files that are kept are moved from the scratch directory into the
+        # depot, each atomically. The rest are deleted.
+        scratchPath = certificate.scratchPath
+        if scratchPath is None:
+            return
+        certificate.scratchPath = None
+        with self.timings.stage(
+            "move", certificate.stem.name, certificate.outputPaths
+        ):
+            for path in certificate.outputPaths:
+                move_file(scratchPath / path.name, path)
+            if not certificate.keepCSR:
+                Path(scratchPath, certificate.csrPath.name).unlink(
+                    missing_ok=True)
+
+    def _record(self, certificate, digest):
+        # Details are read from the certificate file, which is quicker than
+        # running openssl to get them. Returns the serial number in hex, as in
+        # the depot index.
+        with self.timings.stage("record", certificate.stem.name):
+            details = CertificateDetails.from_PEM(
+                certificate.certPath.read_text())[0]
+            exports = certificate.exportProfile.exports
+            if not exports:
+                # A PFX from before would have the previous certificate.
+                certificate.exportPath.unlink(missing_ok=True)
+            if digest is not None:
+                self.manifest.record(
+                    certificate.stem.name, digest, certificate.outputPaths
+                    , details)
+            # There's no CNF file for each client any more, only the shared
+            # CNF. The column is kept for depots from before.
+            self.index.add(self.depotPath, certificate, details, {
+                "certPath": certificate.certPath,
+                "keyPath": certificate.keyPath,
+                "exportPath": certificate.exportPath if exports else None,
+                "cnfPath": None
+            })
+        archive = self._archive
+        if archive is not None:
+            with self.timings.stage("archive", certificate.stem.name):
+                archive.add(certificate, details)
+        return f"{details.serial:X}"
+
+    def createClient(
+        self, clientName, email, purposes, clientPath, suffix, digest=None,
+        keySpec=None, exportProfile=None
+    ):
+        """Create a client certificate. Return its serial number in hex, as in
+        the depot index, or False if it failed."""
+        certificate = self._new_certificate(
+            clientName, email, purposes, clientPath, suffix, keySpec
+            , exportProfile)
+        if not self.backend.createClient(self, certificate):
+            return False
+        self._move_to_depot(certificate)
+        return self._record(certificate, digest)
+
+    async def createClientAsync(
+        self, clientName, email, purposes, clientPath, suffix, digest=None,
+        keySpec=None, exportProfile=None
+    ):
+        """Same as createClient() but for an asyncio event loop. The openssl
+        steps of the certificate run in order, as asyncio subprocesses, so that
+        the steps of many certificates can overlap in one thread. Limit how
+        many run at once with a semaphore, or submit them to an
+        AsyncJobPool."""
+        # Serial allocation takes a file lock, and taking a key from the pool
+        # renames or copies a file, so neither is done on the event loop.
+        certificate = await asyncio.to_thread(
+            self._new_certificate, clientName, email, purposes, clientPath
+            , suffix, keySpec, exportProfile)
+        if not await self.backend.createClientAsync(self, certificate):
+            return False
+        await asyncio.to_thread(self._move_to_depot, certificate)
+        return await asyncio.to_thread(self._record, certificate, digest)
+
+    def fillPool(self):
+        jobs = job_count(self.jobs)
+        print(
+            f'Filling key pool "{self.keyPool.directory}" to'
+            f' {self.keyPoolSize} in {jobs} jobs.')
+        generated = self.keyPool.fill(self.keyPoolSize, jobs)
+        print(f"Keys generated: {generated}. Keys in pool: {len(self.keyPool)}.")
+        return len(self.keyPool) >= self.keyPoolSize
+
+    def client_name_and_email(self, client, domain=None):
+        """Client name and email address from a client specifier, which is a
+        name or an email address, and a domain, which is the authority domain
+        if it's None."""
         (clientName, clientAt, clientDomain) = client.partition(atSign)
         email = "".join((
-            clientName, atSign, self.domain)) if clientAt == "" else client
+            clientName, atSign, domain or self.domain
+        )) if clientAt == "" else client
         return clientName, email
 
+    def _client_entries(self):
+        # Each entry is the client specifier, and the domain, purposes
+        # specifier, and export profile name, which are None for the defaults.
+        if self.clientsFile is None:
+            return ((client, None, None, None) for client in self.clients)
+        return read_clients(self.clientsFile)
+
+    def certificates_purposes(self, purposesSpecifier):
+        """Purposes of each certificate for a purposes specifier, or the
+        default purposes if it's None. Return None if the specifier can't be
+        parsed. Each distinct specifier is parsed once."""
+        if purposesSpecifier is None:
+            return self.certificatesPurposes
+        if purposesSpecifier not in self._purposesCache:
+            shortForm, certificates, ok, reports = (
+                CertificatePurpose.parsePurposesSpecifier(purposesSpecifier))
+            self._purposesCache[purposesSpecifier] = (
+                certificates if ok else None)
+        return self._purposesCache[purposesSpecifier]
+
+    @staticmethod
+    def _reject(message):
+        report(message)
+        return False
+
+    def _submit_clients(self, jobPool, checkpoint):
+        if jobPool.jobs > 1:
+            print(f'Creating certificates in {jobPool.jobs} jobs.')
+        # Reserve serial numbers in blocks so that parallel jobs seldom wait for
+        # the serial file lock.
+        self.serialAllocator.blockSize = (
+            1 if jobPool.jobs <= 1 else jobPool.jobs * 4)
+        resume = 0 if checkpoint is None else checkpoint.count
+        if resume > 0:
+            print(f'Resuming after {resume} clients.')
+        shard = self.shard
+        for index, (client, domain, purposesSpecifier, exportName) in (
+            enumerate(self._client_entries())
+        ):
+            if index < resume or not (shard is None or in_shard(index, shard)):
+                continue
+
+            certificatesPurposes = self.certificates_purposes(
+                purposesSpecifier)
+            exportProfile = ExportProfile.from_name(
+                exportName or self.exportProfile)
+            if certificatesPurposes is None:
+                jobPool.submit(
+                    self._reject, 'Failed to parse certificate purposes'
+                    f' "{purposesSpecifier}" for "{client}".')
+            elif exportProfile is None:
+                jobPool.submit(
+                    self._reject, f'Unknown PFX profile "{exportName}" for'
+                    f' "{client}". Profiles: {", ".join(exportProfileNames)}.')
+            else:
+                self._submit_client(
+                    jobPool, client, domain, certificatesPurposes
+                    , exportProfile)
+
+            if checkpoint is not None:
+                jobPool.then(checkpoint.advance, index + 1)
+
+    def _submit_client(
+        self, jobPool, client, domain, certificatesPurposes, exportProfile=None
+    ):
+        tail = f' for "{client}" ...'
+        purposes = len(certificatesPurposes)
+        if self.copies > 1:
+            jobPool.message(
+                f'Creating {self.copies} x {purposes} certificates' + tail)
+        else:
+            if purposes > 1:
+                jobPool.message(f'Creating {purposes} certificates' + tail)
+            else:
+                jobPool.message('Creating certificate' + tail)
+
+        renewWithin = timedelta(days=self.renewWithin)
+        for stem, arguments in self.client_certificates(
+            client, domain, certificatesPurposes, self.copies, exportProfile
+        ):
+            clientPath, copy, digest = arguments[3:6]
+            if copy != "":
+                jobPool.message(f'Creating copy {copy}' + tail)
+            if self.incremental and self.manifest.is_current(
+                stem, digest, clientPath.parent, renewWithin
+            ):
+                jobPool.skip(f'For "{stem}" current.')
+                continue
+            jobPool.submit(
+                self.createClientAsync if jobPool.asynchronous
+                else self.createClient
+                , *arguments)
+
+    def client_certificates(
+        self, client, domain, certificatesPurposes, copies, exportProfile=None
+    ):
+        """Each certificate to create for a client, as a tuple of its stem and
+        the arguments of createClient(). There's one for each copy of each
+        purposes set. The CLI and the serve command both issue certificates
+        from this, so that they name and configure them the same way."""
+        clientName, email = self.client_name_and_email(client, domain)
+        for clientPath, purposes, cnfText in self.client_CNFs(
+            self.depotPath, clientName, email, certificatesPurposes
+        ):
+            digest = self.cnf_digest(cnfText, exportProfile=exportProfile)
+            for copy in (
+                ("",) if copies <= 1
+                else tuple(f"{copy}" for copy in range(1, copies + 1))
+            ):
+                yield clientPath.name + copy, (
+                    clientName, email, purposes, clientPath, copy, digest, None
+                    , exportProfile)
+
+    def _submit_renewal(self, jobPool, row):
+        stem = row["stem"]
+        purposes = CertificatePurpose.from_suffix(row["purposes"])
+        # The new certificate is in the same directory as the old one, whatever
+        # the layout is now.
+        clientPath = None if purposes is None else Path(
+            self.depotPath, row["certPath"]
+        ).parent.resolve() / self.client_stem(row["client"], purposes)
+        if clientPath is None or not stem.startswith(clientPath.name):
+            jobPool.submit(
+                self._reject, f'For "{stem}" no purposes. Not renewed.')
+            return
+        jobPool.message(f'Renewing "{stem}" ...')
+        # The CNF is made again from the purposes and the subject of the
+        # authority, so the new certificate has the same subject and purposes.
+        # The key type is also kept, because the key usages in the CNF depend
+        # on it. Whatever is after the client path is the copy number.
+        keySpec = None
+        try:
+            keySpec = CertificateDetails.from_PEM(Path(
+                self.depotPath, row["certPath"]).read_text())[0].keySpec
+        except (IndexError, OSError, TypeError, ValueError):
+            pass
+        # A certificate without a PFX is renewed without one.
+        exportProfile = None if row["exportPath"] is not None else (
+            ExportProfile.none)
+        cnfText = self.client_CNF_text(
+            row["email"], purposes, keySpec or self.keyType)
+        jobPool.submit(
+            self.createClient, row["client"], row["email"], purposes
+            , clientPath, stem[len(clientPath.name):]
+            , self.cnf_digest(cnfText, keySpec, exportProfile)
+            , keySpec, exportProfile)
+
+    def createCRL(self, delta=False, days=7, crlPath=None):
+        """Create a CRL of every revoked certificate that hasn't expired, or a
+        delta CRL of the certificates revoked since the latest full CRL. Return
+        the path of the CRL, or None if it couldn't be created."""
+        base = None
+        if delta:
+            base = self.revocations.lastBase()
+            if base is None:
+                print('No full CRL yet, to be the base of a delta CRL.')
+                return None
+        crlPath = self.crlPath(delta) if crlPath is None else crlPath
+        with self.timings.stage("crl"):
+            number, revoked = self.revocations.startCRL(base)
+            created = False
+            try:
+                created = self.backend.createCRL(
+                    self, number, revoked, base, days, crlPath)
+            finally:
+                if not created:
+                    self.revocations.abandonCRL(number)
+            if not created:
+                return None
+        self.revocations.finishCRL(number, crlPath)
+        print(
+            f'{"Delta CRL" if delta else "CRL"} {number}'
+            + ("" if base is None else f' on base {base}')
+            + f' with {len(revoked)} revoked certificates in "{crlPath}".')
+        return crlPath
+
+    def loadSubject(self):
+        """Set the subject fields from the authority certificate. The client
+        subject is the same as the authority subject, apart from the common
+        name and email address."""
+        subject = self.authorityMaterial.details.subjectAttributes
+        self.countryCode = subject.get("C", "")
+        self.stateName = subject.get("ST", "")
+        self.localityName = subject.get("L", "")
+        self.organisationName = subject.get("O", "")
+        self.organisationalUnitName = subject.get("OU", "")
+
+    def renew(self, rows):
+        """Create the certificates of depot index rows again, each with a new
+        key and serial number. Return the job pool, which has the counts of
+        certificates created and failed."""
+        # Backends that don't use the CNF need the subject fields.
+        self.loadSubject()
+        with JobPool(self.jobs) as jobPool:
+            self.serialAllocator.blockSize = (
+                1 if jobPool.jobs <= 1 else jobPool.jobs * 4)
+            for row in rows:
+                self._submit_renewal(jobPool, row)
+        return jobPool
+
+    def writeMetrics(self, totals):
+        """Write the stage timings and run totals to the metrics path, or to
+        stdout if the path is "-"."""
+        metrics = self.timings.metrics(totals)
+        text = (
+            prometheus_text(metrics) if self.metricsFormat == "prometheus"
+            else json.dumps(metrics, indent=2) + "\n")
+        if str(self.metricsPath) == "-":
+            stdout.write(text)
+        else:
+            Path(self.metricsPath).write_text(text)
+            print(f'Metrics written to "{self.metricsPath}".')
+
     def __call__(self):
+        try:
+            self.backend
+        except (ImportError, ValueError) as error:
+            print(f'Backend "{self.backendName}" unavailable. {error}')
+            return 4
+
+        if self.shard is not None:
+            # Every shard has to be signed by the same authority.
+            if self.create:
+                print("Can't --create an authority in a shard.")
+                return 1
+            if not self.authorityCertPath.exists():
+                print(f'No authority certificate "{self.authorityCertPath}".')
+                return 1
+            write_shard_file(
+                self.depotPath, self.shard, self.domain
+                , self.authorityMaterial.details.fingerprint)
+            print('Shard {}/{} depot "{}".'.format(
+                *self.shard, self.depotPath.resolve()))
+
         if self.create:
             if not self.createAuthority():
                 return 1
 
+        if self.fillKeyPool:
+            return 0 if self.fillPool() else 5
+
+        if self._depotLayout is not None:
+            # Set on the command line.
+            self.saveDepotLayout()
+
         if not self.parsePurposesSpecifier():
             print('Failed to parse certificate purposes.')
             return 2
 
-        created = 0
-        for client in self.clients:
-            tail = f' for "{client}" ...'
-            purposes = len(self.certificatesPurposes)
-            if self.copies > 1:
+        if self.keyPoolSize > 0:
+            # Top up the key pool in the background while certificates are
+            # being created.
+            self.keyPool.start(self.keyPoolSize)
+        checkpoint = None
+        if self.clientsFile is not None:
+            checkpoint = Checkpoint(self.checkpointPath or Path(
+                self.depotPath, "".join((
+                    "stdin" if self.clientsFile == "-"
+                    else Path(self.clientsFile).name, ".checkpoint"))))
+            checkpoint.load()
+        if self.archivePath is not None:
+            self._archive = BundleArchive(
+                self.archivePath, self.archiveCertificates)
+        start = time.perf_counter()
+        try:
+            with (AsyncJobPool if self.asyncDriver else JobPool)(
+                self.jobs
+            ) as jobPool:
+                self._submit_clients(jobPool, checkpoint)
+        except (OSError, ValueError) as error:
+            print(f'Failed to read clients. {error}')
+            return 6
+        finally:
+            if self.keyPoolSize > 0:
+                self.keyPool.stop()
+            if checkpoint is not None:
+                checkpoint.save()
+            if self.scratchDir is not None:
+                self._scratch.remove()
+            if self.archivePath is not None:
+                self._archive.close()
                 print(
-                    f'Creating {self.copies} x {purposes} certificates' + tail)
-            else:
-                if purposes > 1:
-                    print(f'Creating {purposes} certificates' + tail)
-                else:
-                    print('Creating certificate' + tail)
-
-            clientName, email = self._client_name_and_email(client)
-            for cnfPath in self.write_client_CNFs(
-                self.depotPath, clientName, email
-            ):
-                if self.copies <= 1:
-                    self.createClient(clientName, cnfPath, "")
-                    created += 1
-                else:
-                    for copy in range(1, self.copies + 1):
-                        print(f'Creating copy {copy}' + tail)
-                        self.createClient(clientName, cnfPath, f"{copy}")
-                        created += 1
-
-        print(f"Certificates created: {created}.")
+                    f'Certificates archived: {len(self._archive)}'
+                    f' in "{self.archivePath}".')
+                self._archive = None
+        if checkpoint is not None:
+            # Everything was processed so there's nothing to resume.
+            checkpoint.remove()
+
+        if self.metricsPath is not None:
+            self.writeMetrics({
+                "run_seconds": time.perf_counter() - start,
+                "jobs": jobPool.jobs,
+                "certificates_created": jobPool.succeeded,
+                "certificates_skipped": jobPool.skipped,
+                "certificates_failed": jobPool.failed,
+                "backend": self.backend.name
+            })
+
+        print(f"Certificates created: {jobPool.succeeded}.")
+        if jobPool.skipped > 0:
+            print(f"Certificates current and not created: {jobPool.skipped}.")
+        if jobPool.failed > 0:
+            print(f"Certificates failed: {jobPool.failed}.")
+            return 3
         return 0
 
 if __name__ == '__main__':
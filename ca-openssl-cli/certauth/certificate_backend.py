@@ -0,0 +1,120 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for asynchronous I/O. Only used for the default createClientAsync().
+# https://docs.python.org/3/library/asyncio.html
+import asyncio
+
+# Key type and size for all keys, unless another is selected.
+defaultKeySpec = "rsa:2048"
+
+# Key types that can be selected on the command line. RSA with a number of bits,
+# or elliptic curve (EC) with a NIST curve name.
+keyTypes = ("rsa:2048", "rsa:3072", "rsa:4096", "ec:P-256", "ec:P-384")
+
+def is_elliptic_curve(keySpec):
+    return keySpec.partition(':')[0].lower() == "ec"
+
+# Names of the backends that can be selected on the command line. The first one
+# is the default.
+backendNames = ("openssl", "cryptography")
+
+class CertificateBackend:
+    """Interface for the code that creates keys and certificates.
+
+    A backend is given the CertificateAuthority, for its paths and
+    configuration, and writes the same files in the depot whichever backend it
+    is. Progress is printed with job_pool.report() so that output of parallel
+    jobs stays in one piece."""
+
+    name = None
+
+    def createAuthority(self, authority):
+        """Create the authority key and certificate. Return True for
+        success."""
+        raise NotImplementedError()
+
+    def loadAuthority(self, authority):
+        """Load the authority certificate and key into whatever form the
+        backend can reuse for signing. Called once per run, not once per
+        certificate. The default is nothing, for backends that can only sign
+        from the files."""
+        return None
+
+    def createClient(self, authority, certificate):
+        """Create the key, CSR, certificate, and PFX files for a
+        ClientCertificate. If the certificate has a key already, from the key
+        pool, then use that key instead of generating one. The PFX is created
+        with the export profile of the certificate, or not at all if the
+        profile doesn't export. Return True for success."""
+        raise NotImplementedError()
+
+    async def createClientAsync(self, authority, certificate):
+        """Same as createClient() but for an asyncio event loop. The default
+        runs createClient() in a thread, which suits backends that don't run
+        child processes."""
+        return await asyncio.to_thread(
+            self.createClient, authority, certificate)
+
+    def generateKey(self, keyPath, keySpec):
+        """Generate a private key, for the key pool, and write it to keyPath in
+        PEM format. Return True for success."""
+        raise NotImplementedError()
+
+    def createCRL(self, authority, number, revocations, base, days, crlPath):
+        """Sign a CRL with the authority key and write it to crlPath in PEM
+        format. The revocations are rows from the RevocationStore. If base is
+        not None then the CRL is a delta CRL on the CRL with that number. Return
+        True for success."""
+        raise NotImplementedError()
+
+    def createOCSPResponses(self, authority, statuses, validity, jobs=1):
+        """Sign an OCSP response for each status, which is a dictionary with
+        the serial in hex, notAfter, and status, which is "good" or "revoked".
+        Revoked statuses also have the revoked time and reason. Responses are
+        signed by the authority key, have SHA-1 certificate IDs, and are valid
+        for the validity timedelta. Return a dictionary of serial number, as an
+        int, to the DER of its response. Statuses that fail are left out."""
+        raise NotImplementedError()
+
+    def exportPFX(
+        self, keyPath, chainPEM, exportPath, passcode, exportProfile
+        , iterations
+    ):
+        """Write a PFX file of the private key in keyPath and the certificates
+        in chainPEM, which starts with the certificate of the key, with the
+        encryption of an ExportProfile. Return True for success."""
+        raise NotImplementedError()
+
+    def verifyCertificates(self, authority, certPaths):
+        """Check that each certificate file was signed by the authority and is
+        valid now. Return a list with None for each certificate that is OK, or
+        the reason it isn't, in the same order as the paths."""
+        raise NotImplementedError()
+
+    def openPFX(self, exportPath, passcode):
+        """Open a PFX file with a passcode. Return a tuple of True if there's a
+        private key in it, and a list of the DER of each certificate in it.
+        Raises ValueError, with the reason, if the PFX can't be opened."""
+        raise NotImplementedError()
+
+def create_backend(name):
+    """Create a backend by name. Raises ImportError if the backend needs a
+    module that isn't installed, or ValueError if there is no such backend."""
+    # Imports are here so that optional modules are only loaded if selected.
+    if name == "openssl":
+        from certauth.openssl_backend import OpenSSLBackend
+        return OpenSSLBackend()
+    if name == "cryptography":
+        from certauth.cryptography_backend import CryptographyBackend
+        return CryptographyBackend()
+    raise ValueError(f'Unknown backend "{name}".')
@@ -13,14 +13,62 @@
 #
 # Standard library imports, in alphabetic order.
 #
+# Module for secure hashes. Only used for sharded depot directory names.
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+#
+# Module for the operating system interface. Only used for atomic replacement.
+# https://docs.python.org/3/library/os.html#os.replace
+import os
+#
 # Module for OO path handling.
 # https://docs.python.org/3/library/pathlib.html
 from pathlib import Path
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
 
+from certauth.certificate_backend import defaultKeySpec, is_elliptic_curve
 from certauth.certificate_purpose import CertificatePurpose
 
+# Layouts of the client files in the depot directory. The first one is the
+# default. In the sharded layout, the files of each client are in one of 256
+# subdirectories, named by the first two hex digits of a hash of the client
+# name.
+depotLayouts = ("flat", "sharded")
+
+# Suffix of the default purposes, which is left out of client file names. On the
+# next line
+#
+# -   humanSuffixes() is the default of all purposes.
+# -   [1] gets the certificate long forms.
+# -   [0] gets the first long form and there will be only one certificate.
+defaultSuffix = CertificatePurpose.suffix(
+    CertificatePurpose.parsePurposesSpecifier(
+        CertificatePurpose.humanSuffixes())[1][0])
+
+# Text that stands for the client email address in a CNF template. It can't be
+# in any of the other text of the CNF.
+emailPlaceholder = "\0email\0"
+
+# Environment variable from which openssl reads the client email address in a
+# shared CNF file.
+CNFEmailVariable = "CERTAUTH_EMAIL"
+
+def CNF_environment(email):
+    """Environment variables for an openssl command that reads a shared CNF
+    file, for a client email address."""
+    return {CNFEmailVariable: email}
+
 class CertificateConfiguration:
 
+    def __init__(self):
+        self._keyType = defaultKeySpec
+        self._CNF_templates = {}
+        self._sharedCNFPaths = set()
+        self._sharedCNFLock = threading.Lock()
+
     # Properties for cartauth CLI.
     @property
     def countryCode(self):
@@ -57,6 +105,15 @@ class CertificateConfiguration:
     def organisationalUnitName(self, organisationalUnitName):
         self._organisationalUnitName = organisationalUnitName
 
+    # Key type and size, for the authority and the clients. Key usages in the
+    # CNF depend on it.
+    @property
+    def keyType(self):
+        return self._keyType
+    @keyType.setter
+    def keyType(self, keyType):
+        self._keyType = keyType
+
     @property
     def purposesSpecifier(self):
         return self._purposesSpecifier
@@ -73,7 +130,20 @@ class CertificateConfiguration:
 
     # End of computer property.
 
-    def _write_one_CNF(self, cnfPath, email, purposes):
+    def _CNF_template(self, purposes, keySpec):
+        """Text of the CNF file for a purpose set and key type, split at each
+        place where the client email address goes. The text is rendered once
+        for each distinct purpose set, key type, and subject, and then cached,
+        so that the CNF of a client is only a join."""
+        subject = (
+            self.countryCode, self.stateName, self.localityName,
+            self.organisationName, self.organisationalUnitName)
+        key = (tuple(purposes), keySpec, subject)
+        templates = self._CNF_templates
+        template = templates.get(key)
+        if template is not None:
+            return template
+
         # TOTH
         #
         # CNF file:
@@ -94,18 +164,9 @@ class CertificateConfiguration:
         # https://sockettools.com/kb/creating-certificate-using-openssl/
         # https://www.openssl.org/docs/manmaster/man5/x509v3_config.html
 
-        emailCNF = email.replace('#', '\#')
-
-        keyUsages = []
-        extendedKeyUsages = []
-        for purpose in purposes:
-            for usage in purpose.keyUsages:
-                if usage not in keyUsages:
-                    keyUsages.append(usage)
-            for usage in purpose.extendedKeyUsages:
-                if usage not in extendedKeyUsages:
-                    extendedKeyUsages.append(usage)
-        
+        keyUsages, extendedKeyUsages = CertificatePurpose.mergedUsages(
+            purposes, is_elliptic_curve(keySpec))
+
         keyUsagesCNF = (
             "" if len(keyUsages) == 0 else
             ''.join(( 'keyUsage = ', (", ".join(keyUsages)), "\n" ))
@@ -117,17 +178,17 @@ class CertificateConfiguration:
             ))
         )
 
-        if email != emailCNF:
-            print(f'CNF email "{emailCNF}"')
-        cnfPath.write_text(f'''# Written by certauth module.
+        # The email address is the only part that's different for each client.
+        # The template is split at each place it goes.
+        template = tuple((f'''# Written by certauth module.
 basicConstraints = CA:FALSE
 subjectKeyIdentifier = hash
 authorityKeyIdentifier = keyid,issuer
 subjectAltName = @alt_names
 {keyUsagesCNF}{extendedKeyUsagesCNF}
 [alt_names]
-otherName = 1.3.6.1.4.1.311.20.2.3;UTF8:{emailCNF}
-email = {emailCNF}
+otherName = 1.3.6.1.4.1.311.20.2.3;UTF8:{emailPlaceholder}
+email = {emailPlaceholder}
 
 [req]
 prompt = no
@@ -138,11 +199,11 @@ req_extensions = req_extensions
 subjectAltName = @alt_names
 {keyUsagesCNF}{extendedKeyUsagesCNF}
 [distinguished_names]
-commonName = {emailCNF}
+commonName = {emailPlaceholder}
 countryName = {self.countryCode}
 stateOrProvinceName = {self.stateName}
 localityName = {self.localityName}
-emailAddress = {emailCNF}
+emailAddress = {emailPlaceholder}
 organizationName = {self.organisationName}
 organizationalUnitName = {self.organisationalUnitName}
 '''
@@ -150,32 +211,82 @@ organizationalUnitName = {self.organisationalUnitName}
 # nsCertType = client, email
 # nsComment = "OpenSSL Generated Client Certificate"
 
-        )
+        ).split(emailPlaceholder))
+        templates[key] = template
+        return template
+
+    def client_CNF_text(self, email, purposes, keySpec):
+        """Text of the CNF of one client, which is the shared CNF with the
+        email address in place. It's only used for the digest of what the
+        certificate is made from, and is never written."""
+        return email.replace('#', '\\#').join(
+            self._CNF_template(purposes, keySpec))
 
+    def shared_CNF_path(self, depotPath, purposes, keySpec):
+        """Path of the CNF file that every client with the purposes and key type
+        shares. The file is written the first time it's needed, in the cnf
+        directory of the depot. The client email address is read from the
+        environment variable named by CNFEmailVariable when openssl runs, so
+        there's no file for each client."""
+        text = f"${{ENV::{CNFEmailVariable}}}".join(
+            self._CNF_template(purposes, keySpec))
+        # Named by a digest of the text so that a different subject or key
+        # usages never reuse an old file.
+        cnfPath = Path(depotPath, "cnf", "".join((
+            hashlib.sha256(text.encode('utf-8')).hexdigest()[:16], ".cnf"))
+        ).resolve()
+        with self._sharedCNFLock:
+            if cnfPath not in self._sharedCNFPaths:
+                if not cnfPath.exists():
+                    cnfPath.parent.mkdir(parents=True, exist_ok=True)
+                    temporaryPath = cnfPath.with_name(
+                        f"{cnfPath.name}.{os.getpid()}.new")
+                    temporaryPath.write_text(text)
+                    os.replace(temporaryPath, cnfPath)
+                self._sharedCNFPaths.add(cnfPath)
         return cnfPath
 
-    def write_client_CNFs(self, depotPath, clientName, email):
-        # On the next line
-        #
-        # -   humanSuffixes() is the default of all purposes.
-        # -   [1] gets the certificate long forms.
-        # -   [0] gets the first long form and there will be only one
-        #     certificate.
-        defaultSuffix = CertificatePurpose.suffix(
-            CertificatePurpose.parsePurposesSpecifier(
-                CertificatePurpose.humanSuffixes())[1][0])
-
-        for purposes in self.certificatesPurposes:
-            suffix = CertificatePurpose.suffix(purposes)
-            if suffix == defaultSuffix:
-                suffix = ""
-            # Add a dummy suffix in case the client name includes a dot. The
-            # with_suffix() method replaces everything after the last dot in the
-            # stem.
-            cnfPath = Path(
-                depotPath, "".join((clientName, suffix, ".dummySuffix"))
-            ).resolve().with_suffix(".cnf")
-            yield self._write_one_CNF(cnfPath, email, purposes)
+    def clientDirectory(self, depotPath, clientName):
+        """Directory for the files of a client, which is the depot directory
+        itself in the flat layout. All client file paths are derived from this,
+        so it's the only place that depends on the depot layout. The layout is
+        the depotLayout property of the subclass, CertificateAuthority, which
+        can read it from the depot."""
+        if self.depotLayout == "flat":
+            return Path(depotPath)
+        directory = Path(depotPath, hashlib.sha256(
+            clientName.encode('utf-8')).hexdigest()[:2])
+        directory.mkdir(exist_ok=True)
+        return directory
+
+    @staticmethod
+    def client_stem(clientName, purposes):
+        """Stem of the client files for a purposes set, without the copy number,
+        like user01_Auth. The default purposes have no suffix."""
+        suffix = CertificatePurpose.suffix(purposes)
+        return clientName + ("" if suffix == defaultSuffix else suffix)
+
+    def client_path(self, depotPath, clientName, purposes):
+        """Path of the client files for a purposes set, without the copy number
+        or the file type, like depot/user01_Auth."""
+        return Path(
+            self.clientDirectory(depotPath, clientName)
+            , self.client_stem(clientName, purposes)).resolve()
+
+    def client_CNFs(
+        self, depotPath, clientName, email, certificatesPurposes=None,
+        keySpec=None
+    ):
+        """Each purposes set of a client, as a tuple of the client path, the
+        purposes, and the text of the client CNF. Nothing is written."""
+        keySpec = self.keyType if keySpec is None else keySpec
+        for purposes in (
+            self.certificatesPurposes if certificatesPurposes is None
+            else certificatesPurposes
+        ):
+            yield (
+                self.client_path(depotPath, clientName, purposes), purposes,
+                self.client_CNF_text(email, purposes, keySpec))
 
     def parsePurposesSpecifier(self):
         shortForm, certificates, ok, reports = (
@@ -0,0 +1,384 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for base64 encoding. Used for PEM format.
+# https://docs.python.org/3/library/base64.html
+import base64
+#
+# Module for dates and times. Only used for certificate validity.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for secure hashes. Only used for fingerprints.
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+#
+# Module for regular expressions. Only used to find PEM blocks.
+# https://docs.python.org/3/library/re.html
+import re
+
+# Details of a certificate are read here, by a minimal DER parser, instead of by
+# running `openssl x509 -text` for every certificate. Only the fields that the
+# certauth module needs are parsed.
+#
+# TOTH A Layman's Guide to a Subset of ASN.1, BER, and DER
+# https://luca.ntop.org/Teaching/Appunti/asn1.html
+
+pemPattern = re.compile(
+    r"-----BEGIN ([A-Z0-9 ]+)-----\s+(.*?)-----END \1-----", re.DOTALL)
+
+# Short names of the distinguished name attributes that certauth uses, same as
+# openssl.
+attributeNames = {
+    "2.5.4.3": "CN", "2.5.4.6": "C", "2.5.4.7": "L", "2.5.4.8": "ST",
+    "2.5.4.10": "O", "2.5.4.11": "OU", "1.2.840.113549.1.9.1": "emailAddress"
+}
+
+# Object identifiers of public key algorithms, and of elliptic curves, for key
+# specifiers like the --key-type option.
+rsaEncryptionOID = "1.2.840.113549.1.1.1"
+ecPublicKeyOID = "1.2.840.10045.2.1"
+curveNames = {"1.2.840.10045.3.1.7": "P-256", "1.3.132.0.34": "P-384"}
+
+# Object identifiers of the key usage extensions, and names of the usages, same
+# as in an openssl CNF. Key usages are named in order of their bit in the bit
+# string, from RFC 5280.
+# https://datatracker.ietf.org/doc/html/rfc5280#section-4.2.1.3
+keyUsageOID = "2.5.29.15"
+extendedKeyUsageOID = "2.5.29.37"
+keyUsageNames = (
+    "digitalSignature", "nonRepudiation", "keyEncipherment",
+    "dataEncipherment", "keyAgreement", "keyCertSign", "cRLSign",
+    "encipherOnly", "decipherOnly"
+)
+extendedKeyUsageNames = {
+    "1.3.6.1.5.5.7.3.1": "serverAuth", "1.3.6.1.5.5.7.3.2": "clientAuth",
+    "1.3.6.1.5.5.7.3.3": "codeSigning", "1.3.6.1.5.5.7.3.4": "emailProtection"
+}
+
+def pem_blocks(text, label="CERTIFICATE"):
+    """DER bytes of each PEM block with the label, in order."""
+    return [
+        base64.b64decode("".join(body.split()))
+        for blockLabel, body in pemPattern.findall(text)
+        if blockLabel == label]
+
+def pem_text(der, label="CERTIFICATE"):
+    """PEM text for DER bytes, in the same layout as openssl writes."""
+    encoded = base64.b64encode(der).decode('ascii')
+    lines = [encoded[index:index + 64] for index in range(0, len(encoded), 64)]
+    return "".join((
+        f"-----BEGIN {label}-----\n", "\n".join(lines),
+        f"\n-----END {label}-----\n"))
+
+def read_element(der, offset=0):
+    """Read one DER element. Return its tag, the offset of its content, and the
+    offset of whatever follows it."""
+    tag = der[offset]
+    length = der[offset + 1]
+    offset += 2
+    if length & 0x80:
+        lengthBytes = length & 0x7F
+        length = int.from_bytes(der[offset:offset + lengthBytes], 'big')
+        offset += lengthBytes
+    return tag, offset, offset + length
+
+def elements(der, start=0, end=None):
+    """Each element from start to end, as a tuple like read_element() with the
+    offset of the element itself added at the end."""
+    end = len(der) if end is None else end
+    while start < end:
+        element = read_element(der, start)
+        yield element + (start,)
+        start = element[2]
+
+def oid_text(content):
+    numbers = []
+    value = 0
+    for byte in content:
+        value = (value << 7) | (byte & 0x7F)
+        if not (byte & 0x80):
+            numbers.append(value)
+            value = 0
+    first = min(numbers[0] // 40, 2)
+    return ".".join(str(number) for number in (
+        first, numbers[0] - first * 40, *numbers[1:]))
+
+def key_spec(publicKeyInfo):
+    """Key specifier, like "rsa:2048" or "ec:P-256", of the DER of a
+    SubjectPublicKeyInfo, or None if it's some other type of key."""
+    _, start, end = read_element(publicKeyInfo)
+    (_, algorithmStart, algorithmEnd, _), (_, keyStart, keyEnd, _) = elements(
+        publicKeyInfo, start, end)
+    algorithm = list(elements(publicKeyInfo, algorithmStart, algorithmEnd))
+    oid = oid_text(publicKeyInfo[algorithm[0][1]:algorithm[0][2]])
+    if oid == ecPublicKeyOID and len(algorithm) > 1:
+        curve = curveNames.get(
+            oid_text(publicKeyInfo[algorithm[1][1]:algorithm[1][2]]))
+        return None if curve is None else f"ec:{curve}"
+    if oid == rsaEncryptionOID:
+        # The bit string starts with a byte for the number of unused bits, then
+        # has a sequence of the modulus and exponent.
+        _, sequenceStart, _ = read_element(publicKeyInfo, keyStart + 1)
+        _, modulusStart, modulusEnd = read_element(publicKeyInfo, sequenceStart)
+        modulus = int.from_bytes(
+            publicKeyInfo[modulusStart:modulusEnd], 'big')
+        return f"rsa:{modulus.bit_length()}"
+    return None
+
+def public_key_id(publicKeyInfo):
+    """Identifier of the DER of a SubjectPublicKeyInfo, which is the RSA modulus
+    or the EC public point. It's the same as the private_key_id() of its private
+    key. None for other types of key."""
+    _, start, end = read_element(publicKeyInfo)
+    (_, algorithmStart, _, _), (_, keyStart, keyEnd, _) = elements(
+        publicKeyInfo, start, end)
+    _, oidStart, oidEnd = read_element(publicKeyInfo, algorithmStart)
+    oid = oid_text(publicKeyInfo[oidStart:oidEnd])
+    # Skip the unused bits count at the start of the bit string.
+    key = publicKeyInfo[keyStart + 1:keyEnd]
+    if oid == ecPublicKeyOID:
+        return key
+    if oid == rsaEncryptionOID:
+        _, sequenceStart, _ = read_element(key)
+        _, modulusStart, modulusEnd = read_element(key, sequenceStart)
+        return int.from_bytes(key[modulusStart:modulusEnd], 'big')
+    return None
+
+def _rsa_private_key_id(der):
+    # RSAPrivateKey from PKCS #1 is a version and then the modulus.
+    _, start, end = read_element(der)
+    _, (_, modulusStart, modulusEnd, _) = list(elements(der, start, end))[:2]
+    return int.from_bytes(der[modulusStart:modulusEnd], 'big')
+
+def _ec_private_key_id(der):
+    # ECPrivateKey from SEC 1 has the public point in an optional explicit [1]
+    # tag, which openssl and cryptography always write.
+    _, start, end = read_element(der)
+    for tag, elementStart, elementEnd, _ in elements(der, start, end):
+        if tag == 0xA1:
+            _, keyStart, keyEnd = read_element(der, elementStart)
+            return der[keyStart + 1:keyEnd]
+    return None
+
+def private_key_id(text):
+    """Identifier of the public key of an unencrypted PEM private key, the same
+    as public_key_id(), or None if it can't be read."""
+    try:
+        for der in pem_blocks(text, "PRIVATE KEY"):
+            # PKCS #8 PrivateKeyInfo of a version, an algorithm, and the key in
+            # an octet string.
+            _, start, end = read_element(der)
+            _, (_, algorithmStart, _, _), (_, keyStart, keyEnd, _) = list(
+                elements(der, start, end))[:3]
+            _, oidStart, oidEnd = read_element(der, algorithmStart)
+            oid = oid_text(der[oidStart:oidEnd])
+            if oid == rsaEncryptionOID:
+                return _rsa_private_key_id(der[keyStart:keyEnd])
+            if oid == ecPublicKeyOID:
+                return _ec_private_key_id(der[keyStart:keyEnd])
+            return None
+        for der in pem_blocks(text, "RSA PRIVATE KEY"):
+            return _rsa_private_key_id(der)
+        for der in pem_blocks(text, "EC PRIVATE KEY"):
+            return _ec_private_key_id(der)
+    except (IndexError, ValueError):
+        pass
+    return None
+
+def pkcs7_certificates(data):
+    """DER of each certificate in a PKCS #7 bundle, like a .p7b file, in PEM or
+    DER format, in order. Raises ValueError or IndexError if it isn't one."""
+    if data.lstrip().startswith(b"-----BEGIN"):
+        bundles = pem_blocks(data.decode('ascii'), "PKCS7")
+        if len(bundles) == 0:
+            raise ValueError("No PKCS7 PEM block.")
+    else:
+        bundles = [data]
+    certificates = []
+    for der in bundles:
+        # ContentInfo of a content type and an explicit [0] of SignedData.
+        _, start, end = read_element(der)
+        _, (_, contentStart, _, _) = elements(der, start, end)
+        _, signedStart, signedEnd = read_element(der, contentStart)
+        # The certificates are an implicit [0] set, after the version, digest
+        # algorithms, and encapsulated content.
+        for tag, setStart, setEnd, _ in elements(der, signedStart, signedEnd):
+            if tag == 0xA0:
+                certificates.extend(
+                    der[elementStart:elementEnd]
+                    for _, _, elementEnd, elementStart in elements(
+                        der, setStart, setEnd))
+    return certificates
+
+def _time(tag, content):
+    text = content.decode('ascii').rstrip('Z')
+    # 0x17 is UTCTime, with a two-digit year. Otherwise GeneralizedTime.
+    if tag == 0x17:
+        year = int(text[:2])
+        text = str(1900 + year if year >= 50 else 2000 + year) + text[2:]
+    return datetime.strptime(text, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+
+def _name_attributes(der, start, end):
+    attributes = []
+    for _, setStart, setEnd, _ in elements(der, start, end):
+        for _, sequenceStart, sequenceEnd, _ in elements(
+            der, setStart, setEnd
+        ):
+            (_, oidStart, oidEnd, _), (_, valueStart, valueEnd, _) = elements(
+                der, sequenceStart, sequenceEnd)
+            oid = oid_text(der[oidStart:oidEnd])
+            attributes.append((
+                attributeNames.get(oid, oid),
+                der[valueStart:valueEnd].decode('utf-8', 'replace')))
+    return attributes
+
+def _name_text(attributes):
+    return ", ".join(" = ".join(attribute) for attribute in attributes)
+
+class CertificateDetails:
+    """Details of an X.509 certificate, parsed from its DER bytes."""
+
+    def __init__(self, der):
+        self._der = bytes(der)
+        _, certificateStart, _ = read_element(self._der)
+        _, tbsStart, tbsEnd = read_element(self._der, certificateStart)
+
+        fields = list(elements(self._der, tbsStart, tbsEnd))
+        # Skip the explicit version tag, [0], if present.
+        if fields[0][0] == 0xA0:
+            fields = fields[1:]
+        serial, _, issuer, validity, subject, publicKey = fields[:6]
+        self._serial = int.from_bytes(
+            self._der[serial[1]:serial[2]], 'big', signed=True)
+        self._issuerDER = self._der[issuer[3]:issuer[2]]
+        self._issuer = _name_text(
+            _name_attributes(self._der, issuer[1], issuer[2]))
+        self._subjectAttributes = _name_attributes(
+            self._der, subject[1], subject[2])
+        self._subject = _name_text(self._subjectAttributes)
+        self._subjectDER = self._der[subject[3]:subject[2]]
+        (beforeTag, beforeStart, beforeEnd, _), (
+            afterTag, afterStart, afterEnd, _
+        ) = elements(self._der, validity[1], validity[2])
+        self._notBefore = _time(beforeTag, self._der[beforeStart:beforeEnd])
+        self._notAfter = _time(afterTag, self._der[afterStart:afterEnd])
+        self._publicKeyInfo = self._der[publicKey[3]:publicKey[2]]
+        self._extensions = {}
+        for tag, start, end, _ in fields[6:]:
+            # 0xA3 is the explicit [3] tag of the extensions.
+            if tag != 0xA3:
+                continue
+            _, sequenceStart, sequenceEnd = read_element(self._der, start)
+            for _, extensionStart, extensionEnd, _ in elements(
+                self._der, sequenceStart, sequenceEnd
+            ):
+                parts = list(elements(self._der, extensionStart, extensionEnd))
+                oid = oid_text(self._der[parts[0][1]:parts[0][2]])
+                self._extensions[oid] = self._der[parts[-1][1]:parts[-1][2]]
+
+    @classmethod
+    def from_PEM(cls, text):
+        return [cls(der) for der in pem_blocks(text)]
+
+    @property
+    def der(self):
+        return self._der
+
+    @property
+    def pem(self):
+        return pem_text(self._der)
+
+    @property
+    def serial(self):
+        return self._serial
+
+    @property
+    def issuer(self):
+        return self._issuer
+
+    @property
+    def issuerDER(self):
+        return self._issuerDER
+
+    @property
+    def subject(self):
+        return self._subject
+
+    @property
+    def subjectAttributes(self):
+        """Dictionary of short name, like "CN", to value."""
+        return dict(self._subjectAttributes)
+
+    @property
+    def subjectDER(self):
+        return self._subjectDER
+
+    @property
+    def notBefore(self):
+        return self._notBefore
+
+    @property
+    def notAfter(self):
+        return self._notAfter
+
+    @property
+    def publicKeyInfo(self):
+        """DER of the SubjectPublicKeyInfo, which is the same for a certificate
+        and its private key."""
+        return self._publicKeyInfo
+
+    @property
+    def keySpec(self):
+        """Key specifier, like "rsa:2048", or None for other types of key."""
+        return key_spec(self._publicKeyInfo)
+
+    @property
+    def extensions(self):
+        """Dictionary of extension OID to the DER of the extension value."""
+        return self._extensions
+
+    @property
+    def keyUsages(self):
+        """Names of the key usages, or an empty tuple if there is no key usage
+        extension."""
+        value = self._extensions.get(keyUsageOID)
+        if value is None:
+            return ()
+        # The value is a bit string, in which the first octet is the number of
+        # unused bits, and the first usage is the most significant bit.
+        _, start, end = read_element(value)
+        bits = value[start + 1:end]
+        return tuple(
+            name for index, name in enumerate(keyUsageNames)
+            if index // 8 < len(bits)
+            and bits[index // 8] & (0x80 >> (index % 8)))
+
+    @property
+    def extendedKeyUsages(self):
+        """Names of the extended key usages, or the dotted OID of any that
+        doesn't have a name."""
+        value = self._extensions.get(extendedKeyUsageOID)
+        if value is None:
+            return ()
+        _, start, end = read_element(value)
+        return tuple(
+            extendedKeyUsageNames.get(oid, oid) for oid in (
+                oid_text(value[oidStart:oidEnd])
+                for _, oidStart, oidEnd, _ in elements(value, start, end)))
+
+    @property
+    def fingerprint(self):
+        """SHA-256 fingerprint, in the same format as openssl x509
+        -fingerprint."""
+        return ":".join(f"{byte:02X}" for byte in hashlib.sha256(
+            self._der).digest())
@@ -25,6 +25,14 @@ class KeyUsage(Enum):
     digitalSignature = auto()
     emailProtection = auto()
 
+# Key usages that can't be used with an elliptic curve (EC) key, and what to
+# use instead, or None to leave them out. EC keys encrypt by key agreement,
+# ECDH, not by enciphering.
+ellipticCurveUsages = {
+    KeyUsage.keyEncipherment.name: None,
+    KeyUsage.dataEncipherment.name: KeyUsage.keyAgreement.name
+}
+
 # Some handy pages for key usage values.
 #
 # https://security.stackexchange.com/questions/33824/ssl-cert-types-and-key-usage
@@ -74,6 +82,37 @@ class CertificatePurpose(Enum):
     def suffix(purposes):
         return "".join(( "_" + purpose.name[:4] for purpose in purposes ))
 
+    @classmethod
+    def from_suffix(cls, suffix):
+        """Purposes of a suffix made by suffix(), or None if it isn't one."""
+        purposes = []
+        for part in suffix.split("_")[1:]:
+            for purpose in cls:
+                if purpose.name[:4] == part:
+                    purposes.append(purpose)
+                    break
+            else:
+                return None
+        return purposes if len(purposes) > 0 else None
+
+    @staticmethod
+    def mergedUsages(purposes, ellipticCurve=False):
+        """Key usages and extended key usages of all the purposes, in order and
+        without repetition. For elliptic curve keys, usages that need an RSA
+        key are replaced by their EC equivalents, or left out."""
+        keyUsages = []
+        extendedKeyUsages = []
+        for purpose in purposes:
+            for usage in purpose.keyUsages:
+                if ellipticCurve:
+                    usage = ellipticCurveUsages.get(usage, usage)
+                if usage is not None and usage not in keyUsages:
+                    keyUsages.append(usage)
+            for usage in purpose.extendedKeyUsages:
+                if usage not in extendedKeyUsages:
+                    extendedKeyUsages.append(usage)
+        return keyUsages, extendedKeyUsages
+
     @classmethod
     def short_form(cls, specifier):
         allLower = specifier.islower()
@@ -0,0 +1,181 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Uses the following recent Python features.
+# -   Python 3.9 Path().with_stem()
+#
+# Local imports.
+#
+from certauth.certificate_backend import defaultKeySpec, is_elliptic_curve
+from certauth.certificate_purpose import CertificatePurpose
+from certauth.export_profile import ExportProfile
+
+class ClientCertificate:
+    """One client certificate to be created by a backend.
+
+    The paths of the generated files are derived from the client path, like
+    depot/user01_Auth, and the copy suffix, in the same way as they always have
+    been."""
+
+    def __init__(
+        self, clientName, email, purposes, clientPath, suffix, serial,
+        keySpec=defaultKeySpec
+    ):
+        self._clientName = clientName
+        self._email = email
+        self._purposes = tuple(purposes)
+        self._clientPath = clientPath
+        self._cnfPath = None
+        self._serial = serial
+        self._keySpec = keySpec
+        self._stem = clientPath.with_name(clientPath.name + suffix)
+        self._hasKey = False
+        self._keepCSR = True
+        self._scratchPath = None
+        self._exportProfile = ExportProfile.modern
+        self._exportIterations = None
+
+    @property
+    def clientName(self):
+        return self._clientName
+
+    @property
+    def email(self):
+        return self._email
+
+    @property
+    def purposes(self):
+        return self._purposes
+
+    @property
+    def clientPath(self):
+        return self._clientPath
+
+    # Shared CNF file of the purposes and key type, for backends that use one.
+    # The email address is passed in the environment. See CNF_environment().
+    @property
+    def cnfPath(self):
+        return self._cnfPath
+    @cnfPath.setter
+    def cnfPath(self, cnfPath):
+        self._cnfPath = cnfPath
+
+    @property
+    def purposesSuffix(self):
+        return CertificatePurpose.suffix(self._purposes)
+
+    @property
+    def serial(self):
+        return self._serial
+
+    # Key type and size, like "rsa:2048" or "ec:P-256".
+    @property
+    def keySpec(self):
+        return self._keySpec
+
+    # True if the key file is in place already, for example from the key pool.
+    @property
+    def hasKey(self):
+        return self._hasKey
+    @hasKey.setter
+    def hasKey(self, hasKey):
+        self._hasKey = hasKey
+
+    # True if the CSR file is to be written, which is always the case unless the
+    # authority is in pipeline mode.
+    @property
+    def keepCSR(self):
+        return self._keepCSR
+    @keepCSR.setter
+    def keepCSR(self, keepCSR):
+        self._keepCSR = keepCSR
+
+    # Directory in which to create the files, instead of the depot, or None.
+    # When it's set, the paths of generated files are in this directory.
+    @property
+    def scratchPath(self):
+        return self._scratchPath
+    @scratchPath.setter
+    def scratchPath(self, scratchPath):
+        self._scratchPath = scratchPath
+
+    # PKCS #12 settings of the PFX file, which isn't created if the profile
+    # doesn't export.
+    @property
+    def exportProfile(self):
+        return self._exportProfile
+    @exportProfile.setter
+    def exportProfile(self, exportProfile):
+        self._exportProfile = exportProfile
+
+    # Iteration count of the export, which is the default of the profile unless
+    # it's been set.
+    @property
+    def exportIterations(self):
+        return (
+            self._exportProfile.iterations if self._exportIterations is None
+            else self._exportIterations)
+    @exportIterations.setter
+    def exportIterations(self, exportIterations):
+        self._exportIterations = exportIterations
+
+    @property
+    def passcode(self):
+        return self._clientName
+
+    # Paths of generated files. The stem is the path without the file type, so
+    # its name is the stem of every file, like user01_Auth2.
+    @property
+    def stem(self):
+        return self._stem
+
+    def _path(self, suffix):
+        path = self._stem.with_name(self._stem.name + suffix)
+        return (
+            path if self._scratchPath is None
+            else self._scratchPath / path.name)
+
+    @property
+    def keyPath(self):
+        return self._path(".key.pem")
+
+    @property
+    def csrPath(self):
+        return self._path(".csr.pem")
+
+    @property
+    def certPath(self):
+        return self._path(".cer.pem")
+
+    @property
+    def exportPath(self):
+        return self._path(".pfx")
+
+    @property
+    def outputPaths(self):
+        """Paths of the files that are left in the depot."""
+        return (self.keyPath,) + (
+            (self.csrPath,) if self.keepCSR else ()
+        ) + (self.certPath,) + (
+            (self.exportPath,) if self._exportProfile.exports else ())
+
+    @property
+    def keyUsages(self):
+        return CertificatePurpose.mergedUsages(
+            self._purposes, is_elliptic_curve(self._keySpec))[0]
+
+    @property
+    def extendedKeyUsages(self):
+        return CertificatePurpose.mergedUsages(
+            self._purposes, is_elliptic_curve(self._keySpec))[1]
+
+    @property
+    def label(self):
+        return f'For "{self._stem.name}" '
@@ -0,0 +1,139 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for CSV files.
+# https://docs.python.org/3/library/csv.html
+import csv
+#
+# Module for JSON. Only used for JSON lines.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for the operating system interface. Only used for atomic replacement.
+# https://docs.python.org/3/library/os.html#os.replace
+import os
+#
+# Module for the Python interpreter. Only used for the stdin stream.
+# https://docs.python.org/3/library/sys.html#sys.stdin
+import sys
+#
+# Module for time. Only used to limit how often the checkpoint is written.
+# https://docs.python.org/3/library/time.html#time.monotonic
+import time
+
+# Field names in a CSV header or JSON line.
+fieldNames = ("client", "domain", "purposes", "pfx")
+
+def read_clients(path):
+    """Generate a (client, domain, purposes, pfx) tuple for each line of a
+    clients file, or of stdin if the path is "-". Domain, purposes, and pfx,
+    which is the name of an export profile, are None if not specified on the
+    line.
+
+    Lines are read one at a time so the file can be of any size. Each line can
+    be any of the following.
+
+    -   JSON object, with a "client" member and optional "domain",
+        "purposes", and "pfx" members.
+    -   CSV line, with the client, domain, purposes, and pfx in that order, or
+        in the order of a header line that starts with "client". Purposes that
+        contain commas have to be quoted, like "a,es".
+    -   Plain client specifier, which is the same as a CSV line with only a
+        client.
+
+    Blank lines, and lines that start with a hash, are skipped."""
+    if str(path) == "-":
+        yield from _parse_lines(sys.stdin, "stdin")
+        return
+    with open(path, newline='') as file:
+        yield from _parse_lines(file, str(path))
+
+def _parse_lines(lines, name):
+    header = None
+    # Only the first line can be a header.
+    headerAllowed = True
+    for lineNumber, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+
+        if stripped.startswith("{"):
+            try:
+                record = json.loads(stripped)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'{name} line {lineNumber}. {error}')
+        else:
+            fields = [field.strip() for field in next(csv.reader((stripped,)))]
+            if headerAllowed and fields[0].lower() == fieldNames[0]:
+                header = [field.lower() for field in fields]
+                headerAllowed = False
+                continue
+            record = dict(zip(header or fieldNames, fields))
+        headerAllowed = False
+
+        client = record.get("client")
+        if not client:
+            raise ValueError(f'{name} line {lineNumber}. No client.')
+        yield (
+            client, record.get("domain") or None, record.get("purposes") or None
+            , record.get("pfx") or None)
+
+class Checkpoint:
+    """Count of the clients that have been processed, saved in a file so that
+    an interrupted run can resume.
+
+    The count only ever covers clients whose certificates have all been created,
+    or have failed, and all the clients before them in the file. The file is
+    rewritten at most once a second, and when the run finishes."""
+
+    def __init__(self, path):
+        self._path = path
+        self._count = 0
+        self._saved = 0
+        self._savedTime = time.monotonic()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def count(self):
+        return self._count
+
+    def load(self):
+        try:
+            self._count = int(self._path.read_text().strip() or 0)
+        except FileNotFoundError:
+            self._count = 0
+        self._saved = self._count
+        return self._count
+
+    def advance(self, count):
+        self._count = count
+        if time.monotonic() - self._savedTime >= 1.0:
+            self.save()
+
+    def save(self):
+        if self._count == self._saved:
+            return
+        temporaryPath = self._path.with_name(self._path.name + ".new")
+        temporaryPath.write_text(f"{self._count}\n")
+        os.replace(temporaryPath, self._path)
+        self._saved = self._count
+        self._savedTime = time.monotonic()
+
+    def remove(self):
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
+        self._saved = self._count
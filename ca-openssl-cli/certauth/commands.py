@@ -0,0 +1,605 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Commands that work on an existing depot, like `python3 -m certauth list`. Each
+command has its own command line parser."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for command line switches.
+# https://docs.python.org/3/library/argparse.html
+import argparse
+#
+# Module for CSV output.
+# https://docs.python.org/3/library/csv.html
+import csv
+#
+# Module for dates and times.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timedelta, timezone
+#
+# Module for JSON output.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for regular expressions. Only used to parse durations.
+# https://docs.python.org/3/library/re.html
+import re
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for signal handling. Only used to stop the service on SIGTERM.
+# https://docs.python.org/3/library/signal.html
+import signal
+#
+# Module for the Python interpreter. Only used for the stdout stream.
+# https://docs.python.org/3/library/sys.html#sys.stdout
+import sys
+#
+# Local imports.
+#
+from certauth.benchmark import benchmark_command
+from certauth.bundle_import import import_bundles
+from certauth.certificate_authority import CertificateAuthority
+from certauth.certificate_backend import backendNames, keyTypes
+from certauth.depot_shard import merge_shard, shard_depot_path
+from certauth.depot_verifier import defaultBatchSize, verify_depot
+from certauth.export_profile import (
+    ExportProfile, exportProfileNames, iterations_argument)
+from certauth.issuance_service import IssuanceService, create_server
+from certauth.job_pool import job_count
+from certauth.ocsp_responder import OCSPResponder
+from certauth.ocsp_responder import create_server as create_ocsp_server
+from certauth.revocation_store import revocationReasons
+
+# Columns in text output of certificates.
+textColumns = ("serial", "notAfter", "stem", "email", "purposes")
+
+# Units for durations, like "30d".
+durationUnits = {
+    "m": timedelta(minutes=1), "h": timedelta(hours=1), "d": timedelta(days=1),
+    "w": timedelta(weeks=1)
+}
+
+def duration(text):
+    """Parse a duration like "30d", "12h", "2w", or "90m". A number without a
+    unit is in days."""
+    match = re.fullmatch(r"\s*([0-9]+(?:\.[0-9]+)?)\s*([mhdw]?)\s*", text)
+    if match is None:
+        raise argparse.ArgumentTypeError(
+            f'Duration "{text}" should be a number and a unit, like "30d".'
+            f' Units: {", ".join(durationUnits)}.')
+    return float(match.group(1)) * durationUnits[match.group(2) or "d"]
+
+def _parser(command, description):
+    parser = argparse.ArgumentParser(
+        prog=f"python3 -m certauth {command}", description=description)
+    parser.add_argument(
+        '-d', '--domain', default="example.com", type=str, help=
+        'Internet domain, which is also the name of the depot directory.'
+        ' Default: "example.com"')
+    parser.add_argument(
+        '--authority-stem', dest='authorityStem', default="authority"
+        , type=str, help='Stem for CA file names. Default: "authority"')
+    return parser
+
+def _add_jobs_argument(parser, what):
+    parser.add_argument(
+        '-j', '--jobs', default=1, type=int, help=
+        f'Number of {what} in parallel. Zero means one job per CPU.'
+        ' Default: 1.')
+
+def _add_export_arguments(parser):
+    parser.add_argument(
+        '--pfx-profile', dest='exportProfile', default=exportProfileNames[0]
+        , choices=exportProfileNames, help=
+        'Encryption of PFX files: ' + ExportProfile.usage() + '.'
+        f' Default: "{exportProfileNames[0]}".')
+    parser.add_argument(
+        '--pfx-iterations', dest='pfxIterations', metavar='COUNT'
+        , default=None, type=iterations_argument, help=
+        'Iteration count of PFX files, instead of the default of the profile.')
+
+def _add_index_arguments(parser):
+    parser.add_argument(
+        '--rebuild', action='store_true', help=
+        'Rebuild the index from the certificate files in the depot first.'
+        ' The index is built automatically if there is none.')
+
+def _authority(arguments):
+    authority = CertificateAuthority()
+    authority.domain = arguments.domain
+    authority.authorityStem = arguments.authorityStem
+    authority.jobs = getattr(arguments, 'jobs', 1)
+    authority.backendName = getattr(arguments, 'backendName', backendNames[0])
+    authority.exportProfile = getattr(
+        arguments, 'exportProfile', exportProfileNames[0])
+    authority.pfxIterations = getattr(arguments, 'pfxIterations', None)
+    authority.keyPoolSize = 0
+    return authority
+
+def _load_backend(authority):
+    """Load the backend of the authority, or print why it can't be loaded.
+    Return True if it's loaded. Commands return 4 if it isn't, same as the main
+    command line."""
+    try:
+        authority.backend
+    except (ImportError, ValueError) as error:
+        print(f'Backend "{authority.backendName}" unavailable. {error}')
+        return False
+    return True
+
+def _has_depot(authority):
+    if authority.depotPath.is_dir():
+        return True
+    print(f'No depot directory "{authority.depotPath.resolve()}".')
+    return False
+
+def _has_authority(authority):
+    if authority.authorityCertPath.exists():
+        return True
+    print(f'No authority certificate "{authority.authorityCertPath}".')
+    return False
+
+def _open_index(authority, rebuild=False):
+    if rebuild or not authority.index.exists():
+        jobs = job_count(authority.jobs)
+        print(
+            f'Indexing certificates in "{authority.depotPath.resolve()}"'
+            f' in {jobs} jobs.', file=sys.stderr)
+        added = authority.index.rebuild(authority.depotPath, jobs)
+        print(f'Certificates indexed: {added}.', file=sys.stderr)
+    return authority.index
+
+def print_certificates(rows, outputFormat):
+    if outputFormat == "json":
+        for row in rows:
+            print(json.dumps(row))
+    elif outputFormat == "csv":
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(sys.stdout, fieldnames=tuple(row))
+                writer.writeheader()
+            writer.writerow(row)
+    else:
+        for row in rows:
+            print("  ".join(str(row[column]) for column in textColumns))
+
+def list_command(commandLine):
+    parser = _parser(
+        "list", "List certificates in the depot, from the depot index.")
+    parser.add_argument(
+        '--client', type=str, help='Client name, or glob pattern like "user*".')
+    parser.add_argument(
+        '--email', type=str, help='Email address, or glob pattern.')
+    parser.add_argument('--serial', type=str, help='Serial number, in hex.')
+    parser.add_argument(
+        '--purposes', type=str, help='Purposes suffix, like "_Auth".')
+    parser.add_argument(
+        '--limit', type=int, default=None, help='Maximum number to list.')
+    parser.add_argument(
+        '--all', dest='includeReplaced', action='store_true', help=
+        'Include certificates whose files have since been replaced by a newer'
+        ' certificate for the same client and purposes.')
+    parser.add_argument(
+        '--format', dest='outputFormat', default="text"
+        , choices=("text", "csv", "json"), help='Output format.'
+        ' Default: "text"')
+    _add_index_arguments(parser)
+    _add_jobs_argument(parser, "certificate files to read, if indexing")
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_depot(authority):
+        return 1
+
+    rows = _open_index(authority, arguments.rebuild).query(
+        client=arguments.client, email=arguments.email
+        , serial=arguments.serial, purposes=arguments.purposes
+        , limit=arguments.limit
+        , currentOnly=not arguments.includeReplaced)
+    print_certificates(rows, arguments.outputFormat)
+    return 0
+
+def expiring_command(commandLine):
+    parser = _parser(
+        "expiring", "List certificates in the depot that expire soon, from"
+        " the depot index, and optionally renew them.")
+    parser.add_argument(
+        '--within', default=timedelta(days=30), type=duration, help=
+        'Period in which certificates expire, like "30d", "12h", or "2w".'
+        ' Certificates that have already expired are included. Default: 30d.')
+    parser.add_argument(
+        '--client', type=str, help='Client name, or glob pattern like "user*".')
+    parser.add_argument(
+        '--renew', action='store_true', help=
+        'Create the expiring certificates again, each with a new key and serial'
+        ' number, and the same subject and purposes.')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=
+        f'Backend for --renew. Default: "{backendNames[0]}".')
+    _add_export_arguments(parser)
+    parser.add_argument(
+        '--format', dest='outputFormat', default="text"
+        , choices=("text", "csv", "json"), help='Output format.'
+        ' Default: "text"')
+    _add_index_arguments(parser)
+    _add_jobs_argument(
+        parser, "certificate files to read, if indexing, or to renew")
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_depot(authority):
+        return 1
+
+    rows = _open_index(authority, arguments.rebuild).query(
+        client=arguments.client
+        , expiresBefore=datetime.now(timezone.utc) + arguments.within)
+    # Revoked certificates aren't renewed.
+    revoked = authority.revocations.revokedSerials(
+        row["serial"] for row in rows)
+    rows = [row for row in rows if row["serial"] not in revoked]
+    if not arguments.renew:
+        print_certificates(rows, arguments.outputFormat)
+        return 0
+
+    if not _load_backend(authority):
+        return 4
+    print(f'Certificates to renew: {len(rows)}.')
+    jobPool = authority.renew(rows)
+    print(f"Certificates renewed: {jobPool.succeeded}.")
+    if jobPool.failed > 0:
+        print(f"Certificates failed: {jobPool.failed}.")
+        return 3
+    return 0
+
+def import_p7b_command(commandLine):
+    parser = _parser(
+        "import-p7b", "Import certificates signed by an external CA from PKCS"
+        " #7 bundles, PEM or DER. Each certificate is matched to the key in the"
+        " depot with the same public key, and written next to it with a PFX of"
+        " the key and chain. See the bundle_import.py file for details.")
+    parser.add_argument(
+        dest='bundlePaths', metavar='BUNDLE', type=Path, nargs='+'
+        , help='PKCS #7 bundle files, like "signed.p7b".')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=f'Default: "{backendNames[0]}".')
+    _add_export_arguments(parser)
+    _add_jobs_argument(parser, "PFX files to write")
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_depot(authority):
+        return 1
+    if not _load_backend(authority):
+        return 4
+
+    # Imported certificates are added to the index, which is built first so
+    # that it has the others too.
+    _open_index(authority)
+    imported, failed = import_bundles(
+        authority, arguments.bundlePaths, job_count(authority.jobs))
+    authority.index.close()
+    print(f'Certificates imported: {imported}. Failed: {failed}.')
+    return 3 if failed > 0 else 0
+
+def revoke_command(commandLine):
+    parser = _parser(
+        "revoke", "Revoke certificates. Revocations are kept in a store in the"
+        " depot, and are listed in the next CRL. See the crl command.")
+    parser.add_argument(
+        'targets', metavar='CLIENT_OR_SERIAL', nargs='+', type=str, help=
+        'Serial number, in hex, or client name, or glob pattern like "user*".'
+        ' For a client, all its current certificates are revoked.')
+    parser.add_argument(
+        '--reason', default="unspecified", choices=revocationReasons, help=
+        'Reason code in the CRL. Default: "unspecified".')
+    parser.add_argument(
+        '--all', dest='includeReplaced', action='store_true', help=
+        'For a client, also revoke certificates whose files have since been'
+        ' replaced by a newer certificate.')
+    _add_index_arguments(parser)
+    _add_jobs_argument(parser, "certificate files to read, if indexing")
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_depot(authority):
+        return 1
+
+    index = _open_index(authority, arguments.rebuild)
+    # Every target is processed, even if some don't match, so that a batch
+    # isn't left partly revoked without saying which targets were missed.
+    rows = []
+    unmatched = 0
+    for target in arguments.targets:
+        matches = index.query(serial=target, currentOnly=False)
+        if len(matches) == 0:
+            matches = index.query(
+                client=target, currentOnly=not arguments.includeReplaced)
+        if len(matches) == 0:
+            print(f'No certificates for "{target}".')
+            unmatched += 1
+        rows.extend(matches)
+    revoked = authority.revocations.revoke(rows, arguments.reason)
+    print(f"Certificates revoked: {revoked}.")
+    if revoked < len(rows):
+        print(f"Certificates revoked already: {len(rows) - revoked}.")
+    if unmatched > 0:
+        print(f"Targets with no certificates: {unmatched}.")
+        return 1
+    return 0
+
+def crl_command(commandLine):
+    parser = _parser(
+        "crl", "Create a certificate revocation list (CRL) signed by the"
+        " authority, from the revocations in the depot. Certificates that have"
+        " expired are left out.")
+    parser.add_argument(
+        '--delta', action='store_true', help=
+        'Create a delta CRL, of only the certificates revoked since the latest'
+        ' full CRL, which is its base.')
+    parser.add_argument(
+        '--days', default=7, type=int, help=
+        'Days until the next update of the CRL. Default: 7.')
+    parser.add_argument(
+        '-o', '--output', dest='crlPath', default=None, type=Path, help=
+        'CRL file to write. Default: "authority.crl.pem", or'
+        ' "authority.delta.crl.pem", in the depot.')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=f'Default: "{backendNames[0]}".')
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_authority(authority):
+        return 1
+    if not _load_backend(authority):
+        return 4
+    crlPath = authority.createCRL(
+        arguments.delta, arguments.days, arguments.crlPath)
+    return 3 if crlPath is None else 0
+
+def merge_command(commandLine):
+    parser = _parser(
+        "merge", "Combine shard depots, from runs with the --shard option, into"
+        " the depot. The files of each current certificate in a shard are moved"
+        " into the depot, in its layout, and added to its index and manifest."
+        " Shard depots are removed once everything in them has been moved.")
+    parser.add_argument(
+        dest='shardPaths', metavar='SHARD', default=None, type=Path, nargs='*'
+        , help='Shard depot directories. Default: every shard depot next to the'
+        ' depot, like "example.com.shard-1-of-4".')
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_authority(authority):
+        return 1
+    shardPaths = arguments.shardPaths or sorted(
+        authority.depotPath.parent.glob(
+            shard_depot_path(arguments.domain, ("*", "*")).name))
+    if len(shardPaths) == 0:
+        print(f'No shard depots for "{authority.depotPath.resolve()}".')
+        return 1
+
+    returnCode = 0
+    totalMerged = 0
+    for shardPath in shardPaths:
+        counts = merge_shard(authority, shardPath)
+        if counts is None:
+            returnCode = 3
+            continue
+        merged, failed = counts
+        totalMerged += merged
+        print(
+            f'Shard "{shardPath}" certificates merged: {merged}.'
+            + ("" if failed == 0 else f' Failed: {failed}. Shard kept.'))
+        if failed > 0:
+            returnCode = 3
+    authority.index.close()
+    print(
+        f'Certificates merged: {totalMerged} into'
+        f' "{authority.depotPath.resolve()}".')
+    return returnCode
+
+def verify_command(commandLine):
+    parser = _parser(
+        "verify", "Check that the certificates in the depot chain to the"
+        " authority, have the key usages of their purposes, and that their PFX"
+        " files open with the client name passcode and have the key and chain."
+        " Only failures are printed. See the depot_verifier.py file for"
+        " details.")
+    parser.add_argument(
+        '--client', type=str, help='Client name, or glob pattern like "user*".')
+    parser.add_argument(
+        '--no-pfx', dest='checkPFX', action='store_false', help=
+        "Don't open the PFX files, which is the slowest check.")
+    parser.add_argument(
+        '--batch', dest='batchSize', default=defaultBatchSize, type=int, help=
+        'Number of certificates in each batch, which is one openssl verify'
+        f' process. Default: {defaultBatchSize}.')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=f'Default: "{backendNames[0]}".')
+    _add_index_arguments(parser)
+    _add_jobs_argument(
+        parser, "certificate files to read, if indexing, or batches to verify")
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    if not _has_authority(authority):
+        return 1
+    if not _load_backend(authority):
+        return 4
+
+    rows = _open_index(authority, arguments.rebuild).query(
+        client=arguments.client)
+    # Revoked certificates aren't expected to be valid.
+    revoked = authority.revocations.revokedSerials(
+        row["serial"] for row in rows)
+    rows = [row for row in rows if row["serial"] not in revoked]
+    failed = verify_depot(
+        authority, rows, job_count(authority.jobs), arguments.checkPFX
+        , arguments.batchSize)
+    authority.index.close()
+    print(
+        f'Certificates verified: {len(rows)}. Failed: {failed}.'
+        , file=sys.stderr)
+    return 3 if failed > 0 else 0
+
+def _interrupt(signalNumber, frame):
+    # Stop the service the same way as Ctrl-C.
+    raise KeyboardInterrupt()
+
+def serve_command(commandLine):
+    parser = _parser(
+        "serve", "Run a local service that issues, lists, and exports"
+        " certificates over HTTP. The authority is loaded once and kept in"
+        " memory. See the issuance_service.py file for the API.")
+    parser.add_argument(
+        '--host', default="127.0.0.1", type=str, help=
+        'Address on which to listen. There\'s no authentication, so any peer'
+        ' that can connect can issue certificates. Default: "127.0.0.1", local'
+        ' only.')
+    parser.add_argument(
+        '--port', default=8080, type=int, help='TCP port. Default: 8080.')
+    parser.add_argument(
+        '--socket', dest='socketPath', metavar='PATH', default=None, type=Path
+        , help='Listen on a Unix socket instead of a TCP port.')
+    parser.add_argument(
+        '--queue', dest='queueSize', default=64, type=int, help=
+        'Number of issuance requests that can wait for a job. Requests after'
+        ' that are refused with HTTP status 503. Default: 64.')
+    parser.add_argument(
+        '--key-pool', dest='keyPoolSize', metavar='SIZE', default=0, type=int
+        , help='Take client keys from a key pool, and keep it topped up to SIZE'
+        ' keys in the background. Default: 0, no pool.')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=f'Default: "{backendNames[0]}".')
+    parser.add_argument(
+        '--key-type', dest='keyType', default=keyTypes[0], choices=keyTypes
+        , help=f'Type and size of client keys. Default: "{keyTypes[0]}".')
+    _add_jobs_argument(parser, "certificate sets to issue")
+    arguments = parser.parse_args(commandLine)
+    authority = _authority(arguments)
+    authority.keyPoolSize = arguments.keyPoolSize
+    authority.keyType = arguments.keyType
+    if not _load_backend(authority):
+        return 4
+
+    service = IssuanceService(authority, arguments.queueSize)
+    if not service.start():
+        return 1
+    server = create_server(
+        service, arguments.host, arguments.port, arguments.socketPath)
+    if authority.keyPoolSize > 0:
+        authority.keyPool.start(authority.keyPoolSize)
+    print(" ".join((
+        f'Serving "{authority.depotPath.resolve()}" on',
+        f'"{arguments.socketPath}".' if arguments.socketPath is not None
+        else f'http://{arguments.host}:{arguments.port}/.',
+        f'Jobs: {job_count(authority.jobs)}.'
+    )), flush=True)
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping.")
+    finally:
+        server.server_close()
+        if arguments.socketPath is not None:
+            arguments.socketPath.unlink(missing_ok=True)
+        if authority.keyPoolSize > 0:
+            authority.keyPool.stop()
+        service.close()
+    return 0
+
+def ocsp_command(commandLine):
+    parser = _parser(
+        "ocsp", "Run an OCSP responder for the certificates in the depot."
+        " Responses are signed ahead of time and kept in memory, and signed"
+        " again in the background before they expire. See the"
+        " ocsp_responder.py file for details.")
+    parser.add_argument(
+        '--host', default="127.0.0.1", type=str, help=
+        'Address on which to listen. Default: "127.0.0.1", local only.')
+    parser.add_argument(
+        '--port', default=8081, type=int, help='TCP port. Default: 8081.')
+    parser.add_argument(
+        '--socket', dest='socketPath', metavar='PATH', default=None, type=Path
+        , help='Listen on a Unix socket instead of a TCP port.')
+    parser.add_argument(
+        '--validity', default=timedelta(days=1), type=duration, help=
+        'Time for which each response is valid, like "12h". Default: 1d.')
+    parser.add_argument(
+        '--refresh', default=None, type=duration, help=
+        'Age after which each response is signed again. Default: half the'
+        ' validity.')
+    parser.add_argument(
+        '--poll', default=timedelta(minutes=1), type=duration, help=
+        'Time between checks of the depot for new and revoked certificates,'
+        ' whose responses are signed then. Default: 1m.')
+    parser.add_argument(
+        '--backend', dest='backendName', default=backendNames[0]
+        , choices=backendNames, help=f'Default: "{backendNames[0]}".')
+    _add_jobs_argument(parser, "responses to sign")
+    arguments = parser.parse_args(commandLine)
+    refresh = (
+        arguments.validity / 2 if arguments.refresh is None
+        else arguments.refresh)
+    if refresh >= arguments.validity:
+        print(
+            f'Refresh {refresh} should be less than validity'
+            f' {arguments.validity}, so that responses don\'t expire.')
+        return 2
+    authority = _authority(arguments)
+    if not _has_authority(authority):
+        return 1
+    if not _load_backend(authority):
+        return 4
+
+    _open_index(authority)
+    responder = OCSPResponder(
+        authority, arguments.validity, refresh, min(arguments.poll, refresh)
+        , job_count(authority.jobs))
+    if not responder.start():
+        return 1
+    server = create_ocsp_server(
+        responder, arguments.host, arguments.port, arguments.socketPath)
+    print(" ".join((
+        f'Responding for "{authority.depotPath.resolve()}" on',
+        f'"{arguments.socketPath}".' if arguments.socketPath is not None
+        else f'http://{arguments.host}:{arguments.port}/.',
+        f'Responses: {len(responder)}.'
+    )), flush=True)
+    signal.signal(signal.SIGTERM, _interrupt)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping.")
+    finally:
+        server.server_close()
+        if arguments.socketPath is not None:
+            arguments.socketPath.unlink(missing_ok=True)
+        responder.stop()
+    return 0
+
+# Command names and the function that runs each. The function is passed the
+# command line arguments after the command name.
+commands = {
+    "benchmark": benchmark_command,
+    "crl": crl_command,
+    "expiring": expiring_command,
+    "import-p7b": import_p7b_command,
+    "list": list_command,
+    "merge": merge_command,
+    "ocsp": ocsp_command,
+    "revoke": revoke_command,
+    "serve": serve_command,
+    "verify": verify_command
+}
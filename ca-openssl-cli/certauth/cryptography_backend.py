@@ -0,0 +1,414 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for dates and times. Only used for certificate validity.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timedelta, timezone
+#
+# Third party imports.
+#
+# The pyca cryptography package, which isn't in the standard library. This
+# backend can only be selected if it's installed, like this for example.
+#
+#     python3 -m pip install cryptography
+#
+# Version 42 or later is needed, for the not_valid_before_utc and
+# not_valid_after_utc properties, verify_directly_issued_by(), and
+# load_pem_x509_certificates(). An older version is treated the same as no
+# package, by raising ImportError, so that the backend is reported as
+# unavailable instead of failing part way through a run.
+# https://cryptography.io/en/latest/x509/reference/
+import cryptography
+minimumVersion = 42
+if int(cryptography.__version__.split(".")[0]) < minimumVersion:
+    raise ImportError(
+        f'cryptography version {cryptography.__version__} is older than'
+        f' {minimumVersion}.')
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+from cryptography.x509 import ocsp
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+#
+# Local imports.
+#
+from certauth.certificate_backend import (
+    CertificateBackend, defaultKeySpec, is_elliptic_curve)
+from certauth.job_pool import report
+
+# Same as the openssl req -x509 and openssl x509 -req defaults.
+defaultDays = 30
+
+# Object identifier of the Microsoft User Principal Name (UPN) other name. The
+# openssl backend puts the same thing in the CNF file.
+upnOID = x509.ObjectIdentifier("1.3.6.1.4.1.311.20.2.3")
+
+# Elliptic curves by the names in key specifiers.
+curves = {"P-256": ec.SECP256R1, "P-384": ec.SECP384R1}
+
+# CRL reasons by the names in the RevocationStore.
+crlReasons = {
+    "unspecified": x509.ReasonFlags.unspecified,
+    "keyCompromise": x509.ReasonFlags.key_compromise,
+    "affiliationChanged": x509.ReasonFlags.affiliation_changed,
+    "superseded": x509.ReasonFlags.superseded,
+    "cessationOfOperation": x509.ReasonFlags.cessation_of_operation
+}
+
+extendedKeyUsageOIDs = {
+    'clientAuth': ExtendedKeyUsageOID.CLIENT_AUTH,
+    'emailProtection': ExtendedKeyUsageOID.EMAIL_PROTECTION
+}
+
+# PKCS #12 encryption and MAC digests by their names in export profiles.
+pkcs12Algorithms = {
+    "AES-256-CBC": pkcs12.PBES.PBESv2SHA256AndAES256CBC,
+    "PBE-SHA1-3DES": pkcs12.PBES.PBESv1SHA1And3KeyTripleDESCBC
+}
+pkcs12MACs = {"sha1": hashes.SHA1, "sha256": hashes.SHA256}
+
+def _der_utf8_string(text):
+    encoded = text.encode('utf-8')
+    length = len(encoded)
+    if length < 0x80:
+        lengthBytes = bytes((length,))
+    else:
+        lengthBytes = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+        lengthBytes = bytes((0x80 | len(lengthBytes),)) + lengthBytes
+    # 0x0C is the tag for UTF8String.
+    return b'\x0c' + lengthBytes + encoded
+
+def _key_usage(keyUsages):
+    return x509.KeyUsage(
+        digital_signature='digitalSignature' in keyUsages,
+        content_commitment='nonRepudiation' in keyUsages,
+        key_encipherment='keyEncipherment' in keyUsages,
+        data_encipherment='dataEncipherment' in keyUsages,
+        key_agreement='keyAgreement' in keyUsages,
+        key_cert_sign=False, crl_sign=False,
+        encipher_only=False, decipher_only=False)
+
+def _pkcs12_encryption(exportProfile, iterations, passcode):
+    # Same encryption and MAC as the openssl backend, by the openssl names in
+    # the export profile. The cryptography package has no setting for the MAC
+    # iteration count, which stays at its default.
+    return (
+        serialization.PrivateFormat.PKCS12.encryption_builder()
+        .kdf_rounds(iterations)
+        .key_cert_algorithm(pkcs12Algorithms[exportProfile.pbe])
+        .hmac_hash(pkcs12MACs[exportProfile.macAlgorithm]())
+        .build(passcode.encode('utf-8')))
+
+def sign_OCSP_responses(caCert, caKey, statuses, validity):
+    """Sign an OCSP response for each status, as in
+    CertificateBackend.createOCSPResponses(), with an authority certificate and
+    key that are loaded already. The openssl backend uses this too, if the
+    cryptography package is installed."""
+    issuerNameHash = hashes.Hash(hashes.SHA1())
+    issuerNameHash.update(caCert.subject.public_bytes())
+    issuerNameHash = issuerNameHash.finalize()
+    # The key hash is the same as a method 1 subject key identifier.
+    issuerKeyHash = x509.SubjectKeyIdentifier.from_public_key(
+        caKey.public_key()).digest
+    now = datetime.now(timezone.utc)
+    responses = {}
+    for status in statuses:
+        revoked = status["status"] == "revoked"
+        serial = int(status["serial"], 16)
+        responses[serial] = (
+            ocsp.OCSPResponseBuilder()
+            .add_response_by_hash(
+                issuer_name_hash=issuerNameHash
+                , issuer_key_hash=issuerKeyHash
+                , serial_number=serial, algorithm=hashes.SHA1()
+                , cert_status=(
+                    ocsp.OCSPCertStatus.REVOKED if revoked
+                    else ocsp.OCSPCertStatus.GOOD)
+                , this_update=now, next_update=now + validity
+                , revocation_time=(
+                    datetime.fromisoformat(status["revoked"]) if revoked
+                    else None)
+                , revocation_reason=(
+                    crlReasons[status["reason"]] if revoked else None))
+            .responder_id(ocsp.OCSPResponderEncoding.HASH, caCert)
+            .sign(caKey, hashes.SHA256())
+            .public_bytes(serialization.Encoding.DER))
+    return responses
+
+class CryptographyBackend(CertificateBackend):
+    """Backend that creates keys and certificates in process, with the pyca
+    cryptography package, instead of running openssl."""
+
+    name = "cryptography"
+
+    def _name(self, authority, commonName, email=None):
+        # Same attributes, in the same order, as the openssl backend.
+        attributes = [
+            x509.NameAttribute(NameOID.COMMON_NAME, commonName),
+            x509.NameAttribute(NameOID.COUNTRY_NAME, authority.countryCode),
+            x509.NameAttribute(
+                NameOID.STATE_OR_PROVINCE_NAME, authority.stateName),
+            x509.NameAttribute(NameOID.LOCALITY_NAME, authority.localityName)
+        ]
+        if email is not None:
+            attributes.append(
+                x509.NameAttribute(NameOID.EMAIL_ADDRESS, email))
+        attributes.extend((
+            x509.NameAttribute(
+                NameOID.ORGANIZATION_NAME, authority.organisationName),
+            x509.NameAttribute(
+                NameOID.ORGANIZATIONAL_UNIT_NAME,
+                authority.organisationalUnitName)
+        ))
+        return x509.Name(attributes)
+
+    def _generate_key(self, keySpec=defaultKeySpec):
+        algorithm, _, size = keySpec.partition(':')
+        if is_elliptic_curve(keySpec):
+            return ec.generate_private_key(curves[size]())
+        return rsa.generate_private_key(
+            public_exponent=65537, key_size=int(size))
+
+    def _write_key(self, key, path):
+        path.write_bytes(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()))
+
+    def loadAuthority(self, authority):
+        caCert = x509.load_pem_x509_certificate(
+            authority.authorityCertPath.read_bytes())
+        caKey = serialization.load_pem_private_key(
+            authority.authorityKeyPath.read_bytes(), password=None)
+        return caCert, caKey
+
+    def createAuthority(self, authority):
+        key = self._generate_key(authority.keyType)
+        name = self._name(
+            authority, f'{authority.authorityStem}.{authority.domain}')
+        now = datetime.now(timezone.utc)
+        subjectKeyIdentifier = x509.SubjectKeyIdentifier.from_public_key(
+            key.public_key())
+        # Same extensions as the v3_ca section of the default openssl.cnf
+        # file.
+        caCert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now)
+            .not_valid_after(now + timedelta(days=defaultDays))
+            .add_extension(subjectKeyIdentifier, critical=False)
+            .add_extension(
+                x509.AuthorityKeyIdentifier
+                .from_issuer_subject_key_identifier(subjectKeyIdentifier),
+                critical=False)
+            .add_extension(
+                x509.BasicConstraints(ca=True, path_length=None),
+                critical=True)
+            .sign(key, hashes.SHA256())
+        )
+        self._write_key(key, authority.authorityKeyPath)
+        authority.authorityCertPath.write_bytes(
+            caCert.public_bytes(serialization.Encoding.PEM))
+        return True
+
+    def _extensions(self, certificate):
+        extensions = [(x509.SubjectAlternativeName([
+            x509.OtherName(upnOID, _der_utf8_string(certificate.email)),
+            x509.RFC822Name(certificate.email)
+        ]), False)]
+        keyUsages = certificate.keyUsages
+        critical = 'critical' in keyUsages
+        if len(keyUsages) > (1 if critical else 0):
+            extensions.append((_key_usage(keyUsages), critical))
+        extendedKeyUsages = certificate.extendedKeyUsages
+        critical = 'critical' in extendedKeyUsages
+        extendedKeyUsages = [
+            extendedKeyUsageOIDs[usage] for usage in extendedKeyUsages
+            if usage != 'critical']
+        if len(extendedKeyUsages) > 0:
+            extensions.append(
+                (x509.ExtendedKeyUsage(extendedKeyUsages), critical))
+        return extensions
+
+    def createClient(self, authority, certificate):
+        forClient = certificate.label
+        timings = authority.timings
+        client = certificate.stem.name
+        try:
+            csrPaths = (certificate.csrPath,) if certificate.keepCSR else ()
+            with timings.stage("csr", client, (
+                csrPaths if certificate.hasKey
+                else (certificate.keyPath,) + csrPaths
+            )):
+                if certificate.hasKey:
+                    key = serialization.load_pem_private_key(
+                        certificate.keyPath.read_bytes(), password=None)
+                else:
+                    key = self._generate_key(certificate.keySpec)
+                name = self._name(
+                    authority, certificate.email, certificate.email)
+                extensions = self._extensions(certificate)
+
+                csrBuilder = (
+                    x509.CertificateSigningRequestBuilder().subject_name(name))
+                for extension, critical in extensions:
+                    csrBuilder = csrBuilder.add_extension(extension, critical)
+                csr = csrBuilder.sign(key, hashes.SHA256())
+                if not certificate.hasKey:
+                    self._write_key(key, certificate.keyPath)
+                if certificate.keepCSR:
+                    certificate.csrPath.write_bytes(
+                        csr.public_bytes(serialization.Encoding.PEM))
+            report(forClient + 'CSR and key 0.')
+
+            caCert, caKey = authority.authorityMaterial.handle
+            with timings.stage("signing", client):
+                now = datetime.now(timezone.utc)
+                # Same extensions as the top of the CNF file, which the openssl
+                # backend passes as the -extfile.
+                builder = (
+                    x509.CertificateBuilder()
+                    .subject_name(csr.subject).issuer_name(caCert.subject)
+                    .public_key(csr.public_key())
+                    .serial_number(certificate.serial)
+                    .not_valid_before(now)
+                    .not_valid_after(now + timedelta(days=defaultDays))
+                    .add_extension(
+                        x509.BasicConstraints(ca=False, path_length=None),
+                        critical=False)
+                    .add_extension(
+                        x509.SubjectKeyIdentifier.from_public_key(
+                            csr.public_key()), critical=False)
+                    .add_extension(
+                        x509.AuthorityKeyIdentifier.from_issuer_public_key(
+                            caKey.public_key()), critical=False)
+                )
+                for extension, critical in extensions:
+                    builder = builder.add_extension(extension, critical)
+                clientCert = builder.sign(caKey, hashes.SHA256())
+            report(forClient + 'signing 0.')
+
+            with timings.stage("pem", client, (certificate.certPath,)):
+                certificate.certPath.write_bytes(
+                    clientCert.public_bytes(serialization.Encoding.PEM))
+            report(forClient + 'PEM 0.')
+
+            if certificate.exportProfile.exports:
+                with timings.stage(
+                    "export", client, (certificate.exportPath,)
+                ):
+                    certificate.exportPath.write_bytes(
+                        pkcs12.serialize_key_and_certificates(
+                            None, key, clientCert, [caCert],
+                            _pkcs12_encryption(
+                                certificate.exportProfile
+                                , certificate.exportIterations
+                                , certificate.passcode)))
+                report(forClient + 'export 0.')
+        except (OSError, ValueError) as error:
+            report(forClient + f'failed {error}.')
+            return False
+
+        return True
+
+    def generateKey(self, keyPath, keySpec):
+        try:
+            self._write_key(self._generate_key(keySpec), keyPath)
+        except (OSError, ValueError) as error:
+            report(f'Failed to generate pool key. {error}')
+            return False
+        return True
+
+    def createCRL(self, authority, number, revocations, base, days, crlPath):
+        caCert, caKey = authority.authorityMaterial.handle
+        now = datetime.now(timezone.utc)
+        builder = (
+            x509.CertificateRevocationListBuilder()
+            .issuer_name(caCert.subject)
+            .last_update(now)
+            .next_update(now + timedelta(days=days))
+            .add_extension(
+                x509.AuthorityKeyIdentifier.from_issuer_public_key(
+                    caKey.public_key()), critical=False)
+            .add_extension(x509.CRLNumber(number), critical=False))
+        if base is not None:
+            builder = builder.add_extension(
+                x509.DeltaCRLIndicator(base), critical=True)
+        for row in revocations:
+            builder = builder.add_revoked_certificate(
+                x509.RevokedCertificateBuilder()
+                .serial_number(int(row["serial"], 16))
+                .revocation_date(datetime.fromisoformat(row["revoked"]))
+                .add_extension(
+                    x509.CRLReason(crlReasons[row["reason"]]), critical=False)
+                .build())
+        crlPath.write_bytes(
+            builder.sign(caKey, hashes.SHA256())
+            .public_bytes(serialization.Encoding.PEM))
+        report(f'CRL {number} 0.')
+        return True
+
+    def createOCSPResponses(self, authority, statuses, validity, jobs=1):
+        # Signing is quick enough in one thread.
+        caCert, caKey = authority.authorityMaterial.handle
+        return sign_OCSP_responses(caCert, caKey, statuses, validity)
+
+    def exportPFX(
+        self, keyPath, chainPEM, exportPath, passcode, exportProfile
+        , iterations
+    ):
+        try:
+            key = serialization.load_pem_private_key(
+                keyPath.read_bytes(), password=None)
+            certificates = x509.load_pem_x509_certificates(
+                chainPEM.encode('ascii'))
+            exportPath.write_bytes(pkcs12.serialize_key_and_certificates(
+                None, key, certificates[0], certificates[1:],
+                _pkcs12_encryption(exportProfile, iterations, passcode)))
+        except (OSError, ValueError) as error:
+            report(f'For "{exportPath.name}" export failed {error}.')
+            return False
+        report(f'For "{exportPath.name}" export 0.')
+        return True
+
+    def verifyCertificates(self, authority, certPaths):
+        caCert, _ = authority.authorityMaterial.handle
+        now = datetime.now(timezone.utc)
+        results = []
+        for certPath in certPaths:
+            try:
+                certificate = x509.load_pem_x509_certificate(
+                    certPath.read_bytes())
+                certificate.verify_directly_issued_by(caCert)
+            except InvalidSignature:
+                results.append("certificate signature failure")
+                continue
+            except (OSError, TypeError, ValueError) as error:
+                results.append(str(error) or "not verified")
+                continue
+            results.append(
+                "certificate is not yet valid"
+                if now < certificate.not_valid_before_utc else
+                "certificate has expired"
+                if now > certificate.not_valid_after_utc else None)
+        return results
+
+    def openPFX(self, exportPath, passcode):
+        key, certificate, additional = pkcs12.load_key_and_certificates(
+            exportPath.read_bytes(), passcode.encode('utf-8'))
+        return key is not None, [
+            one.public_bytes(serialization.Encoding.DER)
+            for one in ([] if certificate is None else [certificate])
+            + additional]
@@ -0,0 +1,287 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for process pools. Only used to read certificate files in parallel.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ProcessPoolExecutor
+#
+# Module for dates and times.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for iterator tools. Only used to pass the depot path to every worker.
+# https://docs.python.org/3/library/itertools.html#itertools.repeat
+from itertools import repeat
+#
+# Module for regular expressions. Only used to remove copy numbers.
+# https://docs.python.org/3/library/re.html
+import re
+#
+# Module for SQLite databases.
+# https://docs.python.org/3/library/sqlite3.html
+import sqlite3
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+#
+# Local imports.
+#
+from certauth.certificate_details import CertificateDetails
+from certauth.certificate_purpose import CertificatePurpose
+
+# Columns of the certificates table, in order. Paths are relative to the depot
+# directory. Times are ISO 8601 in UTC, which sort correctly as text. The serial
+# number is hexadecimal, same as openssl prints it. Current is 1 for the latest
+# certificate of each stem, and 0 for certificates whose files have since been
+# replaced. Export profile is the name of the ExportProfile of the PFX file, or
+# None if it isn't known, for example for a certificate that was only ever
+# indexed by a rebuild.
+columns = (
+    "serial", "stem", "client", "email", "purposes", "notBefore", "notAfter",
+    "fingerprint", "certPath", "keyPath", "exportPath", "cnfPath", "issued",
+    "current", "exportProfile"
+)
+
+# Values of columns that rows can leave out.
+columnDefaults = {"current": 1, "exportProfile": None}
+
+schema = """
+CREATE TABLE IF NOT EXISTS certificates (
+    serial TEXT PRIMARY KEY,
+    stem TEXT NOT NULL,
+    client TEXT NOT NULL,
+    email TEXT NOT NULL,
+    purposes TEXT NOT NULL,
+    notBefore TEXT NOT NULL,
+    notAfter TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    certPath TEXT,
+    keyPath TEXT,
+    exportPath TEXT,
+    cnfPath TEXT,
+    issued TEXT NOT NULL,
+    current INTEGER NOT NULL DEFAULT 1,
+    exportProfile TEXT
+);
+CREATE INDEX IF NOT EXISTS certificatesClient ON certificates (client);
+CREATE INDEX IF NOT EXISTS certificatesEmail ON certificates (email);
+CREATE INDEX IF NOT EXISTS certificatesStem ON certificates (stem, current);
+CREATE INDEX IF NOT EXISTS certificatesNotAfter ON certificates (notAfter);
+CREATE INDEX IF NOT EXISTS certificatesFingerprint
+    ON certificates (fingerprint);
+"""
+
+def time_text(when):
+    return when.astimezone(timezone.utc).isoformat(timespec='seconds')
+
+class DepotIndex:
+    """Index of the certificates issued into a depot, in an SQLite database in
+    the depot directory.
+
+    Certificates are added as they're issued so that queries don't have to read
+    the certificate files. One connection is shared by all the threads of a
+    run, under a lock."""
+
+    def __init__(self, path):
+        self._path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def exists(self):
+        return self._path.exists()
+
+    def _connect(self):
+        if self._connection is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(
+                str(self._path), check_same_thread=False, timeout=30)
+            self._connection.row_factory = sqlite3.Row
+            # Write-ahead logging lets a query run while a batch is being
+            # issued, and makes each commit cheap.
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(schema)
+            # Indexes from before there were export profiles don't have the
+            # column, which is added with no value for the existing rows.
+            if "exportProfile" not in (
+                row["name"] for row in self._connection.execute(
+                    "PRAGMA table_info(certificates)")
+            ):
+                self._connection.execute(
+                    "ALTER TABLE certificates ADD COLUMN exportProfile TEXT")
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def add(self, depotPath, certificate, details, paths):
+        """Add a certificate that has just been issued. The paths are a
+        dictionary of column name to path, for the path columns."""
+        row = {
+            "serial": f"{details.serial:X}",
+            "stem": certificate.stem.name,
+            "client": certificate.clientName,
+            "email": certificate.email,
+            "purposes": certificate.purposesSuffix,
+            "notBefore": time_text(details.notBefore),
+            "notAfter": time_text(details.notAfter),
+            "fingerprint": details.fingerprint,
+            "issued": time_text(datetime.now(timezone.utc)),
+            "current": 1,
+            "exportProfile": certificate.exportProfile.name
+        }
+        for column, path in paths.items():
+            row[column] = None if path is None else _relative(path, depotPath)
+        self.insert((row,))
+
+    def insert(self, rows):
+        # A row that's inserted again, by a rebuild for example, keeps its
+        # export profile if the new row doesn't have one.
+        statement = "".join((
+            "INSERT INTO certificates (", ", ".join(columns),
+            ") VALUES (", ", ".join(":" + column for column in columns), ")"
+            " ON CONFLICT (serial) DO UPDATE SET ", ", ".join(
+                f"{column} = excluded.{column}" for column in columns
+                if column not in ("serial", "exportProfile")),
+            ", exportProfile = COALESCE(excluded.exportProfile, exportProfile)"
+        ))
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                for row in rows:
+                    connection.execute(
+                        "UPDATE certificates SET current = 0"
+                        " WHERE stem = ? AND serial != ? AND current = 1"
+                        , (row["stem"], row["serial"]))
+                    connection.execute(statement, {
+                        column: row.get(column, columnDefaults.get(column))
+                        for column in columns})
+
+    def rebuild(self, depotPath, jobs=1):
+        """Add every certificate file in the depot to the index, for example
+        for a depot that was created before there was an index. Certificates are
+        read by CertificateDetails, not by openssl, in one pass over the depot
+        directory and any subdirectories, which there are in the sharded
+        layout. Files are read in parallel processes if jobs is more than one.
+        Return the number added."""
+        certPaths = sorted(depotPath.rglob("*.cer.pem"))
+        depotPaths = repeat(depotPath)
+        if jobs <= 1 or len(certPaths) < 2:
+            results = map(_certificate_row, certPaths, depotPaths)
+            rows = self._rebuild_rows(certPaths, results)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = executor.map(
+                    _certificate_row, certPaths, depotPaths
+                    , chunksize=max(1, len(certPaths) // (jobs * 4)))
+                rows = self._rebuild_rows(certPaths, results)
+        self.insert(rows)
+        return len(rows)
+
+    @staticmethod
+    def _rebuild_rows(certPaths, results):
+        rows = []
+        for certPath, (row, error) in zip(certPaths, results):
+            if row is None:
+                print(f'Skipped "{certPath}". {error}')
+            else:
+                rows.append(row)
+        return rows
+
+    def query(
+        self, client=None, email=None, serial=None, purposes=None,
+        expiresBefore=None, limit=None, currentOnly=True
+    ):
+        """Rows that match all the given filters. Client and email can be glob
+        patterns, like "user0*". Only current certificates are included unless
+        currentOnly is False."""
+        clauses = ["current = 1"] if currentOnly else []
+        parameters = []
+        for column, value, operator in (
+            ("client", client, "GLOB"), ("email", email, "GLOB"),
+            ("serial", None if serial is None else serial.upper(), "="),
+            ("purposes", purposes, "="),
+            ("notAfter",
+             None if expiresBefore is None else time_text(expiresBefore), "<")
+        ):
+            if value is not None:
+                clauses.append(f"{column} {operator} ?")
+                parameters.append(value)
+        statement = "SELECT * FROM certificates"
+        if len(clauses) > 0:
+            statement += " WHERE " + " AND ".join(clauses)
+        statement += " ORDER BY notAfter, stem"
+        if limit is not None:
+            statement += " LIMIT ?"
+            parameters.append(limit)
+        with self._lock:
+            return [
+                dict(row) for row in
+                self._connect().execute(statement, parameters).fetchall()]
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM certificates").fetchone()[0]
+
+def _certificate_row(certPath, depotPath):
+    # Returns a tuple of the row, or None, and an error message. This runs in a
+    # worker process when the index is rebuilt in parallel so it can't print.
+    try:
+        details = CertificateDetails.from_PEM(certPath.read_text())[0]
+    except (IndexError, OSError, ValueError) as error:
+        return None, str(error) or "No certificate."
+    # Paths are relative to the depot, and the other files of the certificate
+    # are in the same directory.
+    directory = certPath.parent.relative_to(depotPath)
+    stem = certPath.name[:-len(".cer.pem")]
+    email = details.subjectAttributes.get(
+        "emailAddress", details.subjectAttributes.get("CN", ""))
+    client = email.partition("@")[0]
+    # What's left of the stem is the purposes suffix, which is empty for the
+    # default, and the copy number if there is one.
+    purposes = re.sub(r"[0-9]+$", "", stem[len(client):])
+    cnfName = client + purposes + ".cnf"
+    return {
+        "serial": f"{details.serial:X}", "stem": stem,
+        "client": client, "email": email,
+        "purposes": purposes or CertificatePurpose.suffix(
+            CertificatePurpose.all()),
+        "notBefore": time_text(details.notBefore),
+        "notAfter": time_text(details.notAfter),
+        "fingerprint": details.fingerprint,
+        "issued": time_text(details.notBefore),
+        "certPath": str(directory / certPath.name),
+        "keyPath": _existing(depotPath, directory / (stem + ".key.pem")),
+        "exportPath": _existing(depotPath, directory / (stem + ".pfx")),
+        # Only depots from before the shared CNF files have a CNF for each
+        # client. Copies share the CNF of the original.
+        "cnfPath": _existing(depotPath, directory / cnfName)
+    }, None
+
+def _relative(path, depotPath):
+    try:
+        return str(path.resolve().relative_to(depotPath.resolve()))
+    except ValueError:
+        return str(path)
+
+def _existing(depotPath, relativePath):
+    return (
+        str(relativePath) if (depotPath / relativePath).exists() else None)
@@ -0,0 +1,127 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for dates and times.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for JSON.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for the operating system interface.
+# https://docs.python.org/3/library/os.html
+import os
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+
+class DepotManifest:
+    """Record of the certificates in the depot, and what they were made from.
+
+    The manifest is a JSON lines file in the depot. Each line is an entry for
+    one certificate stem, for example "user01_Auth" or "user01_Auth2" for a
+    copy. A line is appended whenever a certificate is created so the last line
+    for a stem is the current one. The file is compacted when it's loaded, if it
+    has a lot of out of date lines.
+
+    Each entry has the following.
+
+    -   digest, of whatever the certificate was made from. See the
+        CertificateAuthority cnf_digest() method.
+    -   files, names of the files that were created.
+    -   notAfter, expiry time of the certificate.
+    -   serial, of the certificate, in hexadecimal."""
+
+    def __init__(self, path):
+        self._path = path
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        lines = 0
+        try:
+            with open(self._path) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partly written line from an interrupted run.
+                        continue
+                    self._entries[entry['stem']] = entry
+                    lines += 1
+        except FileNotFoundError:
+            pass
+        if lines > 2 * len(self._entries) + 1000:
+            self._compact()
+        return self._entries
+
+    def _compact(self):
+        temporaryPath = self._path.with_name(self._path.name + ".new")
+        with open(temporaryPath, "w") as file:
+            for entry in self._entries.values():
+                file.write(json.dumps(entry) + "\n")
+        os.replace(temporaryPath, self._path)
+
+    def __len__(self):
+        return len(self._load())
+
+    def entries(self):
+        return self._load().values()
+
+    def get(self, stem):
+        return self._load().get(stem)
+
+    def record(self, stem, digest, files, details):
+        """Record a certificate that has just been created."""
+        entry = {
+            'stem': stem, 'digest': digest,
+            'files': [str(path.name) for path in files],
+            'notAfter': details.notAfter.isoformat(),
+            'serial': f"{details.serial:X}"
+        }
+        with self._lock:
+            self._load()[stem] = entry
+            with open(self._path, "a") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def extend(self, entries):
+        """Add entries from another manifest, for example of a shard depot that
+        is being merged."""
+        with self._lock:
+            loaded = self._load()
+            with open(self._path, "a") as file:
+                for entry in entries:
+                    loaded[entry['stem']] = entry
+                    file.write(json.dumps(entry) + "\n")
+
+    def is_current(self, stem, digest, directory, renewWithin):
+        """True if the certificate for the stem was made from the same digest,
+        all its files still exist, and it doesn't expire in the renewal
+        period."""
+        entry = self.get(stem)
+        if entry is None or entry['digest'] != digest:
+            return False
+        renewAfter = datetime.fromisoformat(entry['notAfter']) - renewWithin
+        if datetime.now(timezone.utc) >= renewAfter:
+            return False
+        return all(
+            os.path.exists(os.path.join(directory, name))
+            for name in entry['files'])
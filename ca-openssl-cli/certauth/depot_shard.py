@@ -0,0 +1,160 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Shards of one issuance run, so that it can be spread over several hosts. Each
+host runs with `--shard i/N`, with a copy of the authority key and certificate.
+Shard i issues certificates for every Nth client, starting with the ith, into a
+shard depot next to the depot, with serial numbers from a range that no other
+shard uses. The shard depots are then copied to one host and combined into the
+depot by `python3 -m certauth merge`."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for command line switches. Only used for the argument type error.
+# https://docs.python.org/3/library/argparse.html
+import argparse
+#
+# Module for JSON.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for high-level file operations. Only used to remove merged shards.
+# https://docs.python.org/3/library/shutil.html#shutil.rmtree
+import shutil
+#
+# Local imports.
+#
+from certauth.depot_index import DepotIndex
+from certauth.depot_manifest import DepotManifest
+from certauth.scratch_directory import move_file
+
+# Serial numbers are less than this, same as openssl -CAcreateserial, so that
+# they fit in 20 octets as a positive integer.
+serialLimit = 1 << 159
+
+# Name of the file in a shard depot that records which shard it is.
+shardFileName = "shard.json"
+
+def shard_argument(text):
+    """Argument type for a shard like "2/8", which is the second of eight.
+    Returns a tuple of the shard number, from 1, and the number of shards."""
+    number, slash, count = text.partition("/")
+    try:
+        number, count = int(number), int(count)
+    except ValueError:
+        number, count = 0, 0
+    if slash == "" or count < 1 or not (1 <= number <= count):
+        raise argparse.ArgumentTypeError(
+            f'Shard "{text}" should be like "2/8", the second of eight shards.')
+    return number, count
+
+def shard_depot_path(domain, shard):
+    """Path of the depot of a shard, next to the depot of the domain."""
+    number, count = shard
+    return Path(f"{domain}.shard-{number}-of-{count}")
+
+def serial_range(shard):
+    """Tuple of the first serial number of a shard and the serial number after
+    its last. The serial numbers up to the limit are split into equal ranges,
+    one per shard."""
+    number, count = shard
+    size = serialLimit // count
+    return max(1, size * (number - 1)), size * number
+
+def in_shard(index, shard):
+    """True if the client at an index in the client list, from zero, is in the
+    shard. Clients are dealt out in turn so that shards get the same number,
+    even when the clients list is a stream."""
+    number, count = shard
+    return index % count == number - 1
+
+def write_shard_file(shardPath, shard, domain, fingerprint):
+    shardPath.mkdir(parents=True, exist_ok=True)
+    first, end = serial_range(shard)
+    Path(shardPath, shardFileName).write_text(json.dumps({
+        "shard": "{}/{}".format(*shard),
+        "domain": domain,
+        "authority": fingerprint,
+        "serials": [f"{first:X}", f"{end:X}"]
+    }, indent=2) + "\n")
+
+def read_shard_file(shardPath):
+    """Dictionary of the shard file of a shard depot, or None if there isn't
+    one or it can't be read."""
+    try:
+        return json.loads(Path(shardPath, shardFileName).read_text())
+    except (OSError, ValueError):
+        return None
+
+def merge_shard(authority, shardPath):
+    """Move the current certificates of a shard depot into the depot of the
+    authority, in the layout of the depot, and add them to its index and
+    manifest. The shard depot is removed if everything in it was moved. Return
+    a tuple of the number of certificates merged and the number that failed, or
+    None if the shard depot isn't a shard of the authority."""
+    shardPath = Path(shardPath)
+    shardFile = read_shard_file(shardPath)
+    if shardFile is None:
+        print(f'No shard file in "{shardPath}". Not merged.')
+        return None
+    fingerprint = authority.authorityMaterial.details.fingerprint
+    if shardFile.get("authority") != fingerprint:
+        print(f'Shard "{shardPath}" has a different authority. Not merged.')
+        return None
+
+    depotPath = authority.depotPath
+    shardIndex = DepotIndex(Path(shardPath, "index.sqlite3"))
+    shardManifest = DepotManifest(Path(shardPath, "manifest.jsonl"))
+    rows = []
+    entries = []
+    failed = 0
+    try:
+        shardRows = shardIndex.query()
+    finally:
+        shardIndex.close()
+    for row in shardRows:
+        sourceDirectory = Path(shardPath, row["certPath"]).parent
+        directory = authority.clientDirectory(depotPath, row["client"])
+        entry = shardManifest.get(row["stem"])
+        # The manifest has every file of the certificate, including any CSR.
+        # Without an entry, the index path columns are all there is.
+        names = set(
+            Path(row[column]).name for column in (
+                "certPath", "keyPath", "exportPath", "cnfPath")
+            if row[column] is not None)
+        if entry is not None:
+            names.update(entry["files"])
+        try:
+            for name in names:
+                sourcePath = Path(sourceDirectory, name)
+                # Copies share a CNF, which is moved with the first copy.
+                if sourcePath.exists() or not Path(directory, name).exists():
+                    move_file(sourcePath, Path(directory, name))
+        except OSError as error:
+            print(f'Failed to merge "{row["stem"]}". {error}')
+            failed += 1
+            continue
+        relative = directory.resolve().relative_to(depotPath.resolve())
+        for column in ("certPath", "keyPath", "exportPath", "cnfPath"):
+            if row[column] is not None:
+                row[column] = str(relative / Path(row[column]).name)
+        rows.append(row)
+        if entry is not None:
+            entries.append(entry)
+
+    authority.index.insert(rows)
+    authority.manifest.extend(entries)
+    if failed == 0:
+        shutil.rmtree(shardPath)
+    return len(rows), failed
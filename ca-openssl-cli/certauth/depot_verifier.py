@@ -0,0 +1,139 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Bulk verification of the certificates in a depot, run like
+`python3 -m certauth verify`. Certificates are checked in batches, in parallel
+jobs. For each certificate these are checked.
+
+-   It was signed by the authority and is valid now. The backend checks a whole
+    batch at a time, which for the openssl backend is one openssl verify
+    process per batch.
+-   It has the key usages and extended key usages of its purposes, from the
+    CertificatePurpose class, and the same subject email as the index.
+-   Its PFX opens with the client name as the passcode, and has a private key,
+    the certificate itself, and the authority certificate. Certificates that
+    were issued with the none export profile aren't expected to have a PFX.
+
+Only failures are printed."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for thread pools.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ThreadPoolExecutor
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Local imports.
+#
+from certauth.certificate_backend import is_elliptic_curve
+from certauth.certificate_details import CertificateDetails
+from certauth.certificate_purpose import CertificatePurpose
+from certauth.export_profile import ExportProfile
+
+# Number of certificates in each batch. Big enough that starting a process per
+# batch doesn't matter, small enough that batches share out between jobs.
+defaultBatchSize = 200
+
+def _usage_failures(row, details):
+    failures = []
+    purposes = CertificatePurpose.from_suffix(row["purposes"])
+    if purposes is None:
+        return [f'unknown purposes "{row["purposes"]}".']
+    keySpec = details.keySpec
+    keyUsages, extendedKeyUsages = CertificatePurpose.mergedUsages(
+        purposes, keySpec is not None and is_elliptic_curve(keySpec))
+    for what, expected, actual in (
+        ("key usages", keyUsages, details.keyUsages),
+        ("extended key usages", extendedKeyUsages, details.extendedKeyUsages)
+    ):
+        if set(expected) != set(actual):
+            failures.append(
+                f'{what} {", ".join(actual) or "none"},'
+                f' expected {", ".join(expected) or "none"}.')
+    email = details.subjectAttributes.get("emailAddress")
+    if email != row["email"]:
+        failures.append(f'email "{email}", expected "{row["email"]}".')
+    return failures
+
+def _pfx_failures(backend, exportPath, passcode, certificateDER, authorityDER):
+    try:
+        hasKey, certificates = backend.openPFX(exportPath, passcode)
+    except (OSError, ValueError) as error:
+        return [f'PFX does not open. {error}']
+    failures = []
+    if not hasKey:
+        failures.append("PFX has no private key.")
+    if certificateDER not in certificates:
+        failures.append("PFX does not have the certificate.")
+    if authorityDER not in certificates:
+        failures.append("PFX does not have the authority certificate.")
+    return failures
+
+def verify_batch(authority, rows, checkPFX=True):
+    """Verify the certificates of a batch of depot index rows. Return a list of
+    tuples of stem and failure message."""
+    depotPath = authority.depotPath
+    backend = authority.backend
+    authorityDetails = authority.authorityMaterial.details
+    failures = []
+    checked = []
+    for row in rows:
+        certPath = Path(depotPath, row["certPath"])
+        try:
+            details = CertificateDetails.from_PEM(certPath.read_text())[0]
+        except (IndexError, OSError, ValueError) as error:
+            failures.append((row["stem"], f'unreadable certificate. {error}'))
+            continue
+        if details.issuerDER != authorityDetails.subjectDER:
+            failures.append((row["stem"], f'issuer "{details.issuer}".'))
+            continue
+        failures.extend(
+            (row["stem"], failure) for failure in _usage_failures(row, details))
+        # Certificates issued with the none export profile have no PFX on
+        # purpose.
+        if checkPFX and row.get("exportProfile") != ExportProfile.none.name:
+            if row["exportPath"] is None:
+                failures.append((row["stem"], "no PFX."))
+            else:
+                failures.extend((row["stem"], failure) for failure in (
+                    _pfx_failures(
+                        backend, Path(depotPath, row["exportPath"])
+                        , row["client"], details.der, authorityDetails.der)))
+        checked.append((row["stem"], certPath))
+    if len(checked) > 0:
+        failures.extend(
+            (stem, f'chain {error}.') for (stem, _), error in zip(
+                checked, backend.verifyCertificates(
+                    authority, [certPath for _, certPath in checked]))
+            if error is not None)
+    return failures
+
+def verify_depot(authority, rows, jobs=1, checkPFX=True, batchSize=None):
+    """Verify the certificates of depot index rows, in batches in parallel
+    jobs. Failures are printed as each batch finishes. Return the number of
+    certificates that failed."""
+    batchSize = batchSize or defaultBatchSize
+    # The authority is loaded once, before the jobs start.
+    authority.authorityMaterial.handle
+    batches = [
+        rows[start:start + batchSize]
+        for start in range(0, len(rows), batchSize)]
+    failedStems = set()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for failures in executor.map(
+            lambda batch: verify_batch(authority, batch, checkPFX), batches
+        ):
+            for stem, failure in failures:
+                print(f'{stem}: {failure}', flush=True)
+                failedStems.add(stem)
+    return len(failedStems)
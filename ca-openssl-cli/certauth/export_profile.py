@@ -0,0 +1,78 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for command line switches. Only used for the argument type error.
+# https://docs.python.org/3/library/argparse.html
+import argparse
+#
+# Module for enum classes.
+# https://docs.python.org/3/library/enum.html
+from enum import Enum
+
+class ExportProfile(Enum):
+    """Settings for the PKCS #12 export of a client key and certificate chain
+    to a PFX file.
+
+    Each profile has the password based encryption (PBE) algorithm of the key
+    and certificates, by its openssl name, the digest of the integrity MAC, and
+    the default iteration count of the key derivation and the MAC. Iterations
+    are most of the CPU time of an export. The none profile doesn't export a PFX
+    file at all."""
+
+    def __init__(self, pbe, macAlgorithm, iterations, description):
+        self.pbe = pbe
+        self.macAlgorithm = macAlgorithm
+        self.iterations = iterations
+        self.description = description
+
+    # Same as the openssl 3 defaults: PBES2 with PBKDF2 and AES-256.
+    modern = ("AES-256-CBC", "sha256", 2048, "AES-256 with PBKDF2")
+
+    # For devices and older Windows versions that can't import PBES2.
+    legacy = ("PBE-SHA1-3DES", "sha1", 2048, "3DES with SHA-1, for old devices")
+
+    # For throwaway identities in load tests.
+    fast = ("AES-256-CBC", "sha256", 1, "AES-256 with one iteration, for tests")
+
+    none = (None, None, 0, "no PFX file")
+
+    @property
+    def exports(self):
+        return self.pbe is not None
+
+    @classmethod
+    def names(cls):
+        return tuple(profile.name for profile in cls)
+
+    @classmethod
+    def from_name(cls, name):
+        """Profile with a name, or None if there isn't one."""
+        return cls.__members__.get(name)
+
+    @classmethod
+    def usage(cls):
+        return ", ".join(
+            f'"{profile.name}" {profile.description}' for profile in cls)
+
+# The first one is the default.
+exportProfileNames = ExportProfile.names()
+
+def iterations_argument(text):
+    """Argument type for a PFX iteration count, which has to be at least one."""
+    try:
+        iterations = int(text)
+    except ValueError:
+        iterations = 0
+    if iterations < 1:
+        raise argparse.ArgumentTypeError(
+            f'Iterations "{text}" should be a whole number, one or more.')
+    return iterations
@@ -0,0 +1,347 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Local issuance service, run like `python3 -m certauth serve`. The service holds
+the authority in memory and issues certificates on HTTP requests, on a TCP port
+or a Unix socket.
+
+-   POST /certificates with a JSON object like {"client": "user01"}, and
+    optional "domain", "purposes", "copies", and "pfx" members, issues
+    certificates. The pfx member is the name of an export profile. Copies can
+    be at most maxCopies.
+-   GET /certificates lists certificates from the depot index. The query can
+    have client, email, serial, purposes, and limit parameters, same as the list
+    command.
+-   GET /certificates/SERIAL.pfx or .cer.pem exports a file of the
+    certificate with that serial number. Private keys are only exported in the
+    PFX, which is protected by its passcode, and never as a plain key file.
+-   GET /health returns the authority and queue status.
+
+Responses are JSON, except for exports. There's no authentication, so listen
+only on the loopback address, which is the default, or on a Unix socket, which
+is created with permissions for its owner only."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for thread pools. Only used for the bounded worker pool.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ThreadPoolExecutor
+#
+# Module for HTTP servers.
+# https://docs.python.org/3/library/http.server.html
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+#
+# Module for JSON.
+# https://docs.python.org/3/library/json.html
+import json
+#
+# Module for the operating system interface. Only used for the umask.
+# https://docs.python.org/3/library/os.html
+import os
+#
+# Module for network servers. Only used for the Unix socket server.
+# https://docs.python.org/3/library/socketserver.html
+import socketserver
+#
+# Module for threads. Only used for the queue limit.
+# https://docs.python.org/3/library/threading.html#semaphore-objects
+import threading
+#
+# Module for URL parsing. Only used for query parameters.
+# https://docs.python.org/3/library/urllib.parse.html
+from urllib.parse import parse_qs, urlsplit
+#
+# Local imports.
+#
+from certauth.certificate_purpose import CertificatePurpose
+from certauth.export_profile import ExportProfile
+from certauth.job_pool import capture, job_count
+
+# Content types of exported files, by the end of their names.
+exportTypes = {
+    ".pfx": "application/x-pkcs12",
+    ".cer.pem": "application/x-pem-file"
+}
+
+# Index row column of the path of each type of exported file.
+exportColumns = {
+    ".pfx": "exportPath", ".cer.pem": "certPath"
+}
+
+# Most copies that one request can issue, so that one request can't keep a
+# worker busy for the whole queue.
+maxCopies = 100
+
+class ServiceError(Exception):
+    """Error with an HTTP status, to be returned to the requester."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class IssuanceService:
+    """Authority, configured and loaded once, and a bounded pool of workers
+    that issue certificates for it.
+
+    At most jobs certificates sets are issued at a time. Requests beyond that
+    wait in a queue, up to queueSize, after which they are refused. Requests for
+    the same client are issued one at a time, because they write the same
+    files."""
+
+    def __init__(self, authority, queueSize):
+        self._authority = authority
+        self._jobs = job_count(authority.jobs)
+        self._executor = ThreadPoolExecutor(max_workers=self._jobs)
+        self._slots = threading.BoundedSemaphore(self._jobs + queueSize)
+        self._issued = 0
+        self._failed = 0
+        self._countLock = threading.Lock()
+        self._clientLocks = {}
+        self._clientLocksLock = threading.Lock()
+
+    @property
+    def authority(self):
+        return self._authority
+
+    def start(self):
+        """Load everything that can be loaded ahead of the first request.
+        Return False if the authority can't be loaded."""
+        authority = self._authority
+        if not authority.authorityCertPath.exists():
+            print(f'No authority certificate "{authority.authorityCertPath}".')
+            return False
+        authority.loadSubject()
+        authority.purposesSpecifier = CertificatePurpose.humanSuffixes()
+        authority.parsePurposesSpecifier()
+        authority.serialAllocator.blockSize = self._jobs * 4
+        authority.index
+        return True
+
+    def status(self):
+        with self._countLock:
+            return {
+                "authority": authority_text(self._authority),
+                "backend": self._authority.backend.name,
+                "jobs": self._jobs,
+                "issued": self._issued,
+                "failed": self._failed
+            }
+
+    def issue(self, request):
+        """Issue the certificates of a request, a dictionary like the JSON
+        request body. Return a dictionary of the new index rows and the issuance
+        output."""
+        client = request.get("client") if isinstance(request, dict) else None
+        if not isinstance(client, str) or client == "":
+            raise ServiceError(400, 'Request has no "client".')
+        domain = request.get("domain")
+        if not (domain is None or isinstance(domain, str)):
+            raise ServiceError(400, f'Domain "{domain}" invalid.')
+        purposesSpecifier = request.get("purposes")
+        if not (
+            purposesSpecifier is None or isinstance(purposesSpecifier, str)
+        ):
+            raise ServiceError(
+                400, f'Failed to parse purposes "{purposesSpecifier}".')
+        certificatesPurposes = self._authority.certificates_purposes(
+            purposesSpecifier)
+        if certificatesPurposes is None:
+            raise ServiceError(
+                400, f'Failed to parse purposes "{purposesSpecifier}".')
+        copies = request.get("copies", 1)
+        # JSON true and false are Python bool, which is a subclass of int.
+        if (
+            not isinstance(copies, int) or isinstance(copies, bool)
+            or copies < 1 or copies > maxCopies
+        ):
+            raise ServiceError(
+                400, f'Copies "{copies}" invalid. Maximum {maxCopies}.')
+        exportName = request.get("pfx") or self._authority.exportProfile
+        exportProfile = (
+            ExportProfile.from_name(exportName)
+            if isinstance(exportName, str) else None)
+        if exportProfile is None:
+            raise ServiceError(400, f'PFX profile "{exportName}" invalid.')
+
+        if not self._slots.acquire(blocking=False):
+            raise ServiceError(503, "Queue full. Try again later.")
+        try:
+            future = self._executor.submit(
+                capture, self._issue_client, client, domain
+                , certificatesPurposes, copies, exportProfile)
+            serials, output = future.result()
+        finally:
+            self._slots.release()
+
+        ok = serials is not False and len(serials) > 0
+        with self._countLock:
+            if ok:
+                self._issued += 1
+            else:
+                self._failed += 1
+        if not ok:
+            raise ServiceError(500, output)
+        # Rows of the certificates of this request, by serial number, which
+        # might have been replaced already by a later request.
+        rows = [
+            row for serial in serials for row in self._authority.index.query(
+                serial=serial, currentOnly=False)]
+        return {"certificates": rows, "output": output}
+
+    def _client_lock(self, email):
+        with self._clientLocksLock:
+            lock = self._clientLocks.get(email)
+            if lock is None:
+                lock = threading.Lock()
+                self._clientLocks[email] = lock
+            return lock
+
+    def _issue_client(
+        self, client, domain, certificatesPurposes, copies, exportProfile
+    ):
+        # Runs in a worker. Returns the serial numbers of the certificates, or
+        # False if any failed. Another request for the same client would
+        # overwrite the same files, so it waits.
+        authority = self._authority
+        _, email = authority.client_name_and_email(client, domain)
+        serials = []
+        with self._client_lock(email):
+            for _, arguments in authority.client_certificates(
+                client, domain, certificatesPurposes, copies, exportProfile
+            ):
+                serial = authority.createClient(*arguments)
+                if not serial:
+                    return False
+                serials.append(serial)
+        return serials
+
+    def list(self, query):
+        def one(name):
+            values = query.get(name)
+            return None if values is None else values[-1]
+        limit = one("limit")
+        try:
+            limit = None if limit is None else int(limit)
+        except ValueError:
+            raise ServiceError(400, f'Limit "{limit}" invalid.')
+        return {"certificates": self._authority.index.query(
+            client=one("client"), email=one("email"), serial=one("serial")
+            , purposes=one("purposes"), limit=limit)}
+
+    def export(self, name):
+        """Return the content type and bytes of an exported file, where the name
+        is the serial number followed by one of the exportTypes endings."""
+        for ending, contentType in exportTypes.items():
+            if name.endswith(ending):
+                serial = name[:-len(ending)]
+                break
+        else:
+            raise ServiceError(404, f'No export type for "{name}".')
+        rows = self._authority.index.query(serial=serial, currentOnly=False)
+        if len(rows) == 0:
+            raise ServiceError(404, f'No certificate with serial "{serial}".')
+        row = rows[0]
+        relativePath = row[exportColumns[ending]]
+        try:
+            if not row["current"]:
+                raise FileNotFoundError()
+            return contentType, (
+                self._authority.depotPath / relativePath).read_bytes()
+        except (FileNotFoundError, TypeError):
+            raise ServiceError(
+                410, f'Certificate "{serial}" files have been replaced.')
+
+    def close(self):
+        self._executor.shutdown()
+        self._authority.index.close()
+
+def authority_text(authority):
+    return authority.authorityMaterial.details.subjectAttributes.get("CN", "")
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler that passes requests to the IssuanceService of the
+    server."""
+
+    server_version = "certauth"
+
+    def _send(self, status, body, contentType="application/json"):
+        if contentType == "application/json":
+            body = (json.dumps(body, indent=2) + "\n").encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        service = self.server.service
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part != ""]
+        try:
+            if method == "GET" and parts == ["health"]:
+                self._send(200, service.status())
+            elif method == "GET" and parts == ["certificates"]:
+                self._send(200, service.list(parse_qs(url.query)))
+            elif (
+                method == "GET" and len(parts) == 2
+                and parts[0] == "certificates"
+            ):
+                contentType, body = service.export(parts[1])
+                self._send(200, body, contentType)
+            elif method == "POST" and parts == ["certificates"]:
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError as error:
+                    raise ServiceError(400, f'Invalid JSON. {error}')
+                self._send(201, service.issue(request))
+            else:
+                raise ServiceError(404, f'No {method} "{url.path}".')
+        except ServiceError as error:
+            self._send(error.status, {"error": str(error)})
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return (
+            self.client_address[0] if isinstance(self.client_address, tuple)
+            else "local")
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+    def server_bind(self):
+        # The socket file is created with mode 0600, so that only its owner can
+        # connect, whatever the umask.
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+def create_server(service, host, port, socketPath=None):
+    if socketPath is None:
+        server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+    else:
+        try:
+            socketPath.unlink()
+        except FileNotFoundError:
+            pass
+        server = ThreadingUnixHTTPServer(
+            str(socketPath), ServiceRequestHandler)
+    server.service = service
+    return server
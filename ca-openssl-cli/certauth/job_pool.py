@@ -0,0 +1,243 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Uses the following recent Python features.
+# -   Python 3.7 subprocess text output and capture_output.
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for double-ended queues. Only used for the queue of pending output.
+# https://docs.python.org/3/library/collections.html#collections.deque
+from collections import deque
+#
+# Module for thread pools.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ThreadPoolExecutor
+#
+# Module for the operating system interface. Only used to get the CPU count,
+# and the environment of child processes.
+# https://docs.python.org/3/library/os.html
+import os
+#
+# Module for spawning a process to run a command.
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+#
+# Module for context variables. Only used for job output buffers.
+# https://docs.python.org/3/library/contextvars.html
+import contextvars
+
+# Output of the job that is running in the current thread, or asyncio task, if
+# any. Outside a job everything goes straight to the console, like it always
+# did. Each thread has its own context, so this works like a thread-local.
+_jobOutput = contextvars.ContextVar("jobOutput", default=None)
+
+def job_output():
+    """List to which the current job's output is appended, or None outside a
+    job."""
+    return _jobOutput.get()
+
+def job_count(jobs):
+    """Number of jobs to run, where None or less than one means one per
+    CPU."""
+    if jobs is None or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+def report(*args):
+    output = _jobOutput.get()
+    if output is None:
+        print(*args)
+    else:
+        output.append(" ".join(str(arg) for arg in args) + "\n")
+
+def command_environment(environment):
+    """Environment for a child process, which is the environment of this
+    process with the given variables added, or None for the same environment
+    as this process."""
+    return None if environment is None else {**os.environ, **environment}
+
+def run(command, input=None, capture=False, environment=None):
+    """Run a command, like subprocess.run(), and return the completed process.
+
+    If capture is True then the command's stdout is returned in the completed
+    process, as text. Any other console output from the command goes to the
+    output of the current job, if there is one, or to the console. The command
+    has the environment of this process, with any environment variables in the
+    environment dictionary added."""
+    output = _jobOutput.get()
+    env = command_environment(environment)
+    if output is None:
+        return subprocess.run(
+            command, input=input, text=True, env=env
+            , stdout=subprocess.PIPE if capture else None)
+
+    completed = subprocess.run(
+        command, input=input, text=True, env=env, stdout=subprocess.PIPE
+        , stderr=subprocess.PIPE if capture else subprocess.STDOUT)
+    if capture:
+        output.append(completed.stderr)
+    else:
+        output.append(completed.stdout)
+        # Same as the console case, which doesn't capture stdout.
+        completed.stdout = None
+    return completed
+
+def capture(job, *args):
+    """Run a job in the current thread with its output captured. Return a tuple
+    of the job's result, which is False if it raised an exception, and its
+    output."""
+    output = []
+    token = _jobOutput.set(output)
+    try:
+        result = job(*args)
+    except Exception as exception:
+        output.append(f"Job failed {exception!r}.\n")
+        result = False
+    finally:
+        _jobOutput.reset(token)
+    return result, "".join(output)
+
+async def capture_async(job, *args):
+    """Same as capture(), for a job that is a coroutine function. Call it in
+    its own asyncio task so that the output of concurrent jobs is separate."""
+    output = []
+    token = _jobOutput.set(output)
+    try:
+        result = await job(*args)
+    except Exception as exception:
+        output.append(f"Job failed {exception!r}.\n")
+        result = False
+    finally:
+        _jobOutput.reset(token)
+    return result, "".join(output)
+
+class JobPool:
+    """Run jobs in a pool of threads and print their output in order.
+
+    Jobs are callables that return True for success. Each job's output is
+    buffered while it runs and then printed in one piece, in the same order
+    that the jobs were submitted. The result is that the console looks the same
+    as a run with one job at a time, except for the timing.
+
+    Threads are used, not processes, because the work is done by openssl child
+    processes. The Python code mostly waits.
+
+    Output goes to the console unless an output file is given, in which case
+    all output, including that of openssl, goes to the file instead."""
+
+    # True for pools that run coroutine functions. See the AsyncJobPool class.
+    asynchronous = False
+
+    def __init__(self, jobs, output=None):
+        jobs = job_count(jobs)
+        self._jobs = jobs
+        self._output = output
+        self._start()
+        # Submission is blocked when there are this many pending items, so that
+        # a long list of clients doesn't get held in memory.
+        self._window = jobs * 4
+        self._pending = deque()
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def _start(self):
+        self._executor = (
+            None if self._jobs <= 1
+            else ThreadPoolExecutor(max_workers=self._jobs))
+
+    def _stop(self, cancel=False):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=cancel)
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+    def message(self, *args):
+        if len(self._pending) == 0 and self._output is None:
+            report(*args)
+        elif len(self._pending) == 0:
+            self._print(" ".join(str(arg) for arg in args) + "\n")
+        else:
+            self._pending.append(" ".join(str(arg) for arg in args) + "\n")
+
+    def skip(self, *args):
+        """Print a message, in order, about a job that didn't need to be
+        submitted."""
+        self.skipped += 1
+        self.message(*args)
+
+    def then(self, callback, *args):
+        """Call the callback, in the main thread, after all the jobs and
+        messages submitted so far have been printed."""
+        if len(self._pending) == 0:
+            callback(*args)
+        else:
+            self._pending.append((callback, args))
+
+    def submit(self, job, *args):
+        if self._executor is None:
+            if self._output is None:
+                # Output goes straight to the console, as it's written, but a
+                # failure is handled the same as by capture().
+                try:
+                    result = job(*args)
+                except Exception as exception:
+                    report(f"Job failed {exception!r}.")
+                    result = False
+                self._count(result)
+            else:
+                self._emit_result(capture(job, *args))
+            return
+        self._pending.append(self._executor.submit(capture, job, *args))
+        while len(self._pending) > self._window:
+            self._emit_one()
+
+    def _count(self, result):
+        if result:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+
+    def _print(self, text):
+        print(text, end="", file=self._output, flush=True)
+
+    def _emit_result(self, resultAndOutput):
+        result, output = resultAndOutput
+        self._print(output)
+        self._count(result)
+
+    def _emit_one(self):
+        item = self._pending.popleft()
+        if isinstance(item, str):
+            self._print(item)
+            return
+        if isinstance(item, tuple):
+            callback, args = item
+            callback(*args)
+            return
+        self._emit_result(item.result())
+
+    def close(self):
+        while len(self._pending) > 0:
+            self._emit_one()
+        self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        if excType is not None:
+            self._stop(cancel=True)
+            return False
+        self.close()
+        return False
@@ -0,0 +1,155 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for double-ended queues. Only used for the names of pooled keys.
+# https://docs.python.org/3/library/collections.html#collections.deque
+from collections import deque
+#
+# Module for thread pools. Only used to fill the pool in parallel.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ThreadPoolExecutor
+#
+# Module for error numbers. Only used to detect moves between file systems.
+# https://docs.python.org/3/library/errno.html
+import errno
+#
+# Module for the operating system interface. Only used for atomic renaming.
+# https://docs.python.org/3/library/os.html#os.rename
+import os
+#
+# Module for cryptographically strong random numbers. Only used for file names.
+# https://docs.python.org/3/library/secrets.html
+import secrets
+#
+# Module for threads.
+# https://docs.python.org/3/library/threading.html
+import threading
+#
+# Local imports.
+#
+from certauth.certificate_backend import defaultKeySpec
+from certauth.scratch_directory import move_file
+
+poolSuffix = ".key.pem"
+
+class KeyPool:
+    """Pool of pre-generated private keys, in a directory in the depot.
+
+    Keys are generated by the backend into temporary files and then renamed into
+    the pool directory, so a key in the pool is always complete. A key is taken
+    by renaming it to the client key path. Renaming is atomic so that two jobs,
+    or two runs, can't take the same key."""
+
+    def __init__(self, directory, backend, keySpec=defaultKeySpec):
+        # Keys of different types are pooled separately.
+        self._directory = directory / keySpec.replace(':', '-')
+        self._backend = backend
+        self._keySpec = keySpec
+        self._names = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def keySpec(self):
+        return self._keySpec
+
+    def _load(self):
+        if self._names is None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            self._names = deque(
+                entry.name for entry in os.scandir(self._directory)
+                if entry.name.endswith(poolSuffix))
+        return self._names
+
+    def __len__(self):
+        return len(self._load())
+
+    def generate(self):
+        names = self._load()
+        name = secrets.token_hex(8) + poolSuffix
+        temporaryPath = self._directory / (name + ".tmp")
+        if not self._backend.generateKey(temporaryPath, self._keySpec):
+            try:
+                temporaryPath.unlink()
+            except FileNotFoundError:
+                pass
+            return False
+        os.rename(temporaryPath, self._directory / name)
+        names.append(name)
+        return True
+
+    def fill(self, highWater, jobs=1):
+        """Generate keys until there are highWater keys in the pool. Return the
+        number of keys generated."""
+        needed = highWater - len(self)
+        if needed <= 0:
+            return 0
+        if jobs <= 1:
+            return sum(1 for _ in range(needed) if self.generate())
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return sum(executor.map(
+                lambda _: 1 if self.generate() else 0, range(needed)))
+
+    def take(self, keyPath):
+        """Move a key from the pool to keyPath. Return True if there was a key
+        in the pool, or False if there wasn't."""
+        names = self._load()
+        while True:
+            try:
+                name = names.popleft()
+            except IndexError:
+                return False
+            try:
+                os.replace(self._directory / name, keyPath)
+                return True
+            except FileNotFoundError:
+                # Taken by another run.
+                continue
+            except OSError as error:
+                if error.errno != errno.EXDEV:
+                    raise
+            # The key path is on another file system, in a scratch directory
+            # for example. Take the key by renaming it in the pool first, so
+            # that no other run can take it, then move it.
+            takenPath = self._directory / (name + f".{secrets.token_hex(4)}")
+            try:
+                os.replace(self._directory / name, takenPath)
+            except FileNotFoundError:
+                continue
+            move_file(takenPath, keyPath)
+            return True
+
+    def start(self, highWater):
+        """Keep the pool topped up to highWater in a background thread, until
+        stop() is called."""
+        self._load()
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._top_up, args=(highWater,), daemon=True)
+        self._thread.start()
+
+    def _top_up(self, highWater):
+        while not self._stopping.is_set():
+            if len(self._names) >= highWater:
+                self._stopping.wait(0.1)
+            elif not self.generate():
+                return
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
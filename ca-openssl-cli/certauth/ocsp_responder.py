@@ -0,0 +1,358 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module.
+
+Local OCSP responder, run like `python3 -m certauth ocsp`. Responses for every
+certificate in the depot index that hasn't expired are signed ahead of time and
+kept in memory, so that answering a query is a dictionary lookup.
+
+-   POST / with an OCSP request body, or GET /BASE64 with the request in the
+    path, as in RFC 6960 appendix A, returns the response for the first
+    certificate in the request.
+-   Requests for certificates that aren't in the cache, or that weren't issued
+    by the authority, get the unauthorized response, as RFC 5019 allows.
+-   Requests can't have a nonce in their response, because responses are
+    signed ahead of time. That's also the RFC 5019 lightweight profile.
+-   Signed responses have Last-Modified and Expires headers of their
+    thisUpdate and nextUpdate, and a max-age of the time left until nextUpdate,
+    so that caching proxies don't hold them past their nextUpdate.
+
+Responses are signed again in the background before they expire. Certificates
+that are issued or revoked are picked up on the next poll of the depot."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for base 64 encoding. Only used for GET requests.
+# https://docs.python.org/3/library/base64.html
+import base64
+#
+# Module for dates and times.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for email utilities. Only used for the dates in HTTP headers.
+# https://docs.python.org/3/library/email.utils.html
+from email.utils import format_datetime
+#
+# Module for secure hashes. Only used for the issuer hashes in requests.
+# https://docs.python.org/3/library/hashlib.html
+import hashlib
+#
+# Module for HTTP servers.
+# https://docs.python.org/3/library/http.server.html
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+#
+# Module for threads. Only used for the refresh thread.
+# https://docs.python.org/3/library/threading.html
+import threading
+#
+# Module for URL parsing. Only used for GET requests.
+# https://docs.python.org/3/library/urllib.parse.html
+from urllib.parse import unquote
+#
+# Local imports.
+#
+from certauth.certificate_details import elements, oid_text, read_element
+from certauth.issuance_service import ThreadingUnixHTTPServer
+
+# Object identifier of SHA-1, the only certificate ID hash that responses are
+# signed for. It's the default of the openssl ocsp command and most clients.
+sha1OID = "1.3.14.3.2.26"
+
+# Complete OCSP responses that have no response bytes, and so aren't signed.
+# Each is a sequence of the enumerated response status.
+malformedRequestResponse = bytes((0x30, 0x03, 0x0A, 0x01, 0x01))
+unauthorizedResponse = bytes((0x30, 0x03, 0x0A, 0x01, 0x06))
+
+def request_certificate_id(request):
+    """Hash algorithm OID, issuer name hash, issuer key hash, and serial number
+    of the first certificate in the DER of an OCSP request. Raises ValueError
+    or IndexError if the request can't be parsed."""
+    _, requestStart, requestEnd = read_element(request)
+    _, tbsStart, tbsEnd = read_element(request, requestStart)
+    # Skip the explicit version and requestor name, if present. The request
+    # list is the first sequence.
+    for tag, start, end, _ in elements(request, tbsStart, tbsEnd):
+        if tag == 0x30:
+            break
+    else:
+        raise ValueError("No request list.")
+    _, singleStart, singleEnd = read_element(request, start)
+    _, idStart, idEnd = read_element(request, singleStart)
+    algorithm, nameHash, keyHash, serial = list(
+        elements(request, idStart, idEnd))[:4]
+    _, oidStart, oidEnd = read_element(request, algorithm[1])
+    return (
+        oid_text(request[oidStart:oidEnd]),
+        request[nameHash[1]:nameHash[2]],
+        request[keyHash[1]:keyHash[2]],
+        int.from_bytes(request[serial[1]:serial[2]], 'big', signed=True))
+
+def _generalized_time(content):
+    # Fractions of a second are allowed in OCSP but aren't needed here.
+    text = content.decode('ascii').rstrip('Z').partition('.')[0]
+    return datetime.strptime(text, "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
+
+def response_update_times(response):
+    """The thisUpdate and nextUpdate of the first single response in the DER of
+    a signed OCSP response, as datetimes. The nextUpdate is None if the response
+    hasn't got one. Raises ValueError or IndexError if the response can't be
+    parsed."""
+    _, start, end = read_element(response)
+    _, (tag, bytesStart, _, _) = elements(response, start, end)
+    if tag != 0xA0:
+        raise ValueError("No response bytes.")
+    _, bytesStart, bytesEnd = read_element(response, bytesStart)
+    _, (_, basicStart, _, _) = elements(response, bytesStart, bytesEnd)
+    _, basicStart, _ = read_element(response, basicStart)
+    _, tbsStart, tbsEnd = read_element(response, basicStart)
+    # Skip the explicit version, responder ID, and produced at time. The
+    # responses are the first sequence.
+    for tag, start, end, _ in elements(response, tbsStart, tbsEnd):
+        if tag == 0x30:
+            break
+    else:
+        raise ValueError("No responses.")
+    _, singleStart, singleEnd = read_element(response, start)
+    # Certificate ID, status, thisUpdate, and then nextUpdate, if present, as
+    # an explicit [0].
+    single = list(elements(response, singleStart, singleEnd))
+    _, thisStart, thisEnd, _ = single[2]
+    nextUpdate = None
+    if len(single) > 3 and single[3][0] == 0xA0:
+        _, nextStart, nextEnd = read_element(response, single[3][1])
+        nextUpdate = _generalized_time(response[nextStart:nextEnd])
+    return _generalized_time(response[thisStart:thisEnd]), nextUpdate
+
+class OCSPResponder:
+    """Cache of signed OCSP responses for the certificates of an authority,
+    and a background thread that keeps it up to date.
+
+    Responses are valid for the validity timedelta, and each is signed again
+    once it's older than the refresh timedelta. The depot is polled after the
+    poll timedelta, and only the responses for new and revoked certificates,
+    and those that are due, are signed then."""
+
+    def __init__(self, authority, validity, refresh, poll, jobs=1):
+        self._authority = authority
+        self._validity = validity
+        self._refresh = refresh
+        self._poll = poll
+        self._jobs = jobs
+        self._responses = {}
+        self._statuses = {}
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @property
+    def authority(self):
+        return self._authority
+
+    @property
+    def validity(self):
+        return self._validity
+
+    def __len__(self):
+        return len(self._responses)
+
+    def start(self):
+        """Sign the first responses and start the background thread. Return
+        False if the authority can't be loaded."""
+        authority = self._authority
+        if not authority.authorityCertPath.exists():
+            print(f'No authority certificate "{authority.authorityCertPath}".')
+            return False
+        details = authority.authorityMaterial.details
+        _, keyInfoStart, keyInfoEnd = read_element(details.publicKeyInfo)
+        _, (_, keyStart, keyEnd, _) = elements(
+            details.publicKeyInfo, keyInfoStart, keyInfoEnd)
+        # The key hash is of the public key bit string, without the unused bits
+        # count at the start.
+        self._issuerHashes = (
+            hashlib.sha1(details.subjectDER).digest(),
+            hashlib.sha1(details.publicKeyInfo[keyStart + 1:keyEnd]).digest())
+        self.update(full=True)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._authority.index.close()
+        self._authority.revocations.close()
+
+    def _current_statuses(self):
+        # Dictionary of serial number to status, for every certificate that
+        # hasn't expired.
+        now = datetime.now(timezone.utc)
+        statuses = {}
+        for row in self._authority.index.query(currentOnly=False):
+            if datetime.fromisoformat(row["notAfter"]) > now:
+                statuses[row["serial"]] = {
+                    "serial": row["serial"], "notAfter": row["notAfter"],
+                    "status": "good"}
+        for row in self._authority.revocations.unexpired(now):
+            statuses[row["serial"]] = {
+                "serial": row["serial"], "notAfter": row["notAfter"],
+                "status": "revoked", "revoked": row["revoked"],
+                "reason": row["reason"]}
+        return statuses
+
+    def update(self, full=False):
+        """Sign responses for certificates whose status is new or has changed,
+        or whose response is due to be signed again, or for every certificate
+        if full is True. Return the number signed."""
+        statuses = self._current_statuses()
+        # Responses with less than this until their nextUpdate are due, which
+        # is when they're older than the refresh timedelta.
+        dueBefore = datetime.now(timezone.utc) + (
+            self._validity - self._refresh)
+
+        def is_due(serial, status):
+            if full or self._statuses.get(serial) != status:
+                return True
+            cached = self._responses.get(int(serial, 16))
+            return cached is None or cached[2] <= dueBefore
+
+        changed = [
+            status for serial, status in statuses.items()
+            if is_due(serial, status)]
+        signed = {} if len(changed) == 0 else (
+            self._authority.backend.createOCSPResponses(
+                self._authority, changed, self._validity, self._jobs))
+        # Each response is cached with its update times, from which the HTTP
+        # caching headers are set.
+        responses = {}
+        for serial, response in signed.items():
+            try:
+                thisUpdate, nextUpdate = response_update_times(response)
+            except (IndexError, ValueError):
+                continue
+            responses[serial] = (
+                response, thisUpdate,
+                thisUpdate + self._validity if nextUpdate is None
+                else nextUpdate)
+        # Statuses that failed to be signed aren't recorded, so that they're
+        # tried again on the next update. Their previous responses are out of
+        # date, so they're dropped too.
+        failed = [
+            status["serial"] for status in changed
+            if int(status["serial"], 16) not in responses]
+        for serial in failed:
+            del statuses[serial]
+        # Certificates that have expired drop out, as do those that failed.
+        newResponses = {}
+        for serial in statuses:
+            number = int(serial, 16)
+            response = responses.get(number) or self._responses.get(number)
+            if response is not None:
+                newResponses[number] = response
+        # Replaced in one assignment so that lookups in request threads never
+        # see a partial update.
+        self._responses = newResponses
+        self._statuses = statuses
+        if len(changed) > 0:
+            print(
+                f'OCSP responses signed: {len(responses)} of {len(changed)}.'
+                f' Cached: {len(newResponses)}.', flush=True)
+        return len(responses)
+
+    def _run(self):
+        while not self._stopping.wait(self._poll.total_seconds()):
+            try:
+                self.update()
+            except Exception as exception:
+                # Keep serving the cached responses.
+                print(f'OCSP update failed {exception!r}.', flush=True)
+
+    def respond(self, request):
+        """DER of the OCSP response to the DER of a request, and its thisUpdate
+        and nextUpdate. The times are None for responses that aren't signed,
+        like the unauthorized response."""
+        try:
+            algorithm, nameHash, keyHash, serial = request_certificate_id(
+                request)
+        except (IndexError, ValueError):
+            return malformedRequestResponse, None, None
+        if algorithm != sha1OID or (nameHash, keyHash) != self._issuerHashes:
+            return unauthorizedResponse, None, None
+        response = self._responses.get(serial)
+        return (
+            (unauthorizedResponse, None, None) if response is None
+            else response)
+
+class OCSPRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler that passes OCSP requests to the OCSPResponder of
+    the server."""
+
+    server_version = "certauth"
+    # Keep connections open between queries, and send each response as soon as
+    # it's written, instead of waiting for the acknowledgement of the headers.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _send(self, response):
+        body, thisUpdate, nextUpdate = response
+        self.send_response(200)
+        self.send_header("Content-Type", "application/ocsp-response")
+        self.send_header("Content-Length", str(len(body)))
+        if nextUpdate is None:
+            # Unsigned responses aren't cached.
+            self.send_header("Cache-Control", "no-cache")
+        else:
+            # As in RFC 5019, caching proxies can hold a response until its
+            # nextUpdate, however long ago it was signed, but not after.
+            maxAge = max(0, int(
+                (nextUpdate - datetime.now(timezone.utc)).total_seconds()))
+            self.send_header(
+                "Last-Modified", format_datetime(thisUpdate, usegmt=True))
+            self.send_header(
+                "Expires", format_datetime(nextUpdate, usegmt=True))
+            self.send_header(
+                "Cache-Control"
+                , f"max-age={maxAge}, public, no-transform, must-revalidate")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._send(self.server.responder.respond(self.rfile.read(length)))
+
+    def do_GET(self):
+        encoded = unquote(self.path.lstrip("/"))
+        try:
+            request = base64.b64decode(encoded, validate=True)
+        except ValueError:
+            request = b""
+        self._send(self.server.responder.respond(request))
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return (
+            self.client_address[0] if isinstance(self.client_address, tuple)
+            else "local")
+
+    def log_message(self, format, *args):
+        # Logging every query would be most of the work.
+        pass
+
+def create_server(responder, host, port, socketPath=None):
+    if socketPath is None:
+        server = ThreadingHTTPServer((host, port), OCSPRequestHandler)
+    else:
+        try:
+            socketPath.unlink()
+        except FileNotFoundError:
+            pass
+        server = ThreadingUnixHTTPServer(str(socketPath), OCSPRequestHandler)
+    server.responder = responder
+    return server
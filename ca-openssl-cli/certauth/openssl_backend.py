@@ -0,0 +1,478 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for named tuples. Only used for the steps of creating a certificate.
+# https://docs.python.org/3/library/collections.html#collections.namedtuple
+from collections import namedtuple
+#
+# Module for thread pools. Only used to sign OCSP responses in parallel.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ThreadPoolExecutor
+#
+# Module for dates and times. Only used for CRL and OCSP database dates.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for regular expressions. Only used to read openssl verify errors.
+# https://docs.python.org/3/library/re.html
+import re
+#
+# Module for spawning a process to run a command. Only used for key generation,
+# OCSP responses, and verification, which have their own output handling.
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+#
+# Module for temporary files. Only used for the CRL and OCSP databases.
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+#
+# Local imports.
+#
+from certauth.async_job_pool import run_async
+from certauth.certificate_backend import CertificateBackend, is_elliptic_curve
+from certauth.certificate_configuration import CNF_environment
+from certauth.certificate_details import CertificateDetails
+from certauth.job_pool import report, run
+
+# One openssl command of the steps to create a client certificate. The stage is
+# the name under which the step is timed. The output paths are the files that
+# the step writes. If there's a stdout path then the captured stdout is written
+# to it, as part of the step, if the command succeeds. The environment has the
+# variables that the command needs, like the email address for the CNF.
+OpenSSLStep = namedtuple(
+    "OpenSSLStep"
+    , ("stage", "command", "input", "capture", "outputPaths", "stdoutPath"
+       , "environment")
+    , defaults=(None, False, (), None, None))
+
+# Line of openssl verify error output with the reason that a certificate failed,
+# which is followed by a line with the path of the certificate.
+verifyErrorPattern = re.compile(r"error [0-9]+ at [0-9]+ depth lookup: (.*)")
+
+def key_arguments(keySpec):
+    """Arguments for openssl genpkey that select the key type and size."""
+    algorithm, _, size = keySpec.partition(':')
+    if is_elliptic_curve(keySpec):
+        return [
+            "-algorithm", "EC", "-pkeyopt", f"ec_paramgen_curve:{size}"]
+    return [
+        "-algorithm", algorithm.upper(), "-pkeyopt", f"rsa_keygen_bits:{size}"]
+
+def index_time(text):
+    """Time in the format of an openssl ca database, from ISO 8601 text."""
+    when = datetime.fromisoformat(text)
+    return when.strftime(
+        "%y%m%d%H%M%SZ" if when.year < 2050 else "%Y%m%d%H%M%SZ")
+
+def index_serial(serial):
+    """Serial number in the format of an openssl ca database, from hexadecimal
+    text. The openssl ca and ocsp commands reject an odd number of digits."""
+    return ("0" if len(serial) % 2 else "") + serial
+
+def der_integer(number):
+    """DER of a small non-negative INTEGER, as openssl config hex."""
+    content = number.to_bytes(number.bit_length() // 8 + 1, 'big')
+    return ":".join(f"{byte:02X}" for byte in (0x02, len(content)) + tuple(
+        content))
+
+def newkey_arguments(keySpec):
+    """Arguments for openssl req to generate a new key."""
+    if is_elliptic_curve(keySpec):
+        return [
+            "-newkey", "ec"
+            , "-pkeyopt", f"ec_paramgen_curve:{keySpec.partition(':')[2]}"]
+    return ["-newkey", keySpec]
+
+def pkcs12_arguments(exportProfile, iterations):
+    """Arguments for openssl pkcs12 -export that select the encryption and MAC
+    of an export profile."""
+    return [
+        "-keypbe", exportProfile.pbe, "-certpbe", exportProfile.pbe
+        , "-macalg", exportProfile.macAlgorithm, "-iter", str(iterations)]
+
+class OpenSSLBackend(CertificateBackend):
+    """Backend that runs the openssl CLI in a child process for each step."""
+
+    name = "openssl"
+
+    def createAuthority(self, authority):
+        commonName = f'{authority.authorityStem}.{authority.domain}'
+
+        # https://www.ibm.com/docs/en/ibm-mq/7.5?topic=certificates-distinguished-names
+        caCertCompleted = run([
+            "openssl", "req", "-x509", "-new", "-nodes", "-batch", "-sha256"
+        ] + newkey_arguments(authority.keyType) + [
+            "-keyout", str(authority.authorityKeyPath)
+            , "-out", str(authority.authorityCertPath)
+            , "-subj", f'/CN={commonName}/C={authority.countryCode}'
+            f'/ST={authority.stateName}/L={authority.localityName}'
+            f'/O={authority.organisationName}'
+            f'/OU={authority.organisationalUnitName}'
+        ])
+        report(f'Authority certificate and key {caCertCompleted.returncode}.')
+        return caCertCompleted.returncode == 0
+
+    def _client_steps(self, authority, certificate):
+        # Generator of the openssl commands to create a client certificate, in
+        # order. Each is yielded as an OpenSSLStep and the completed process is
+        # sent back. Returns True if every step succeeded. The same steps are
+        # driven by createClient() and createClientAsync().
+        if authority.pipeline:
+            return (yield from self._pipeline_steps(authority, certificate))
+        forClient = certificate.label
+        cnfPath = certificate.cnfPath
+        environment = CNF_environment(certificate.email)
+
+        clientKeyPath = certificate.keyPath
+        clientCSR_Path = certificate.csrPath
+        csrCompleted = yield OpenSSLStep("csr", [
+            "openssl", "req", "-new", "-nodes"
+        ] + (
+            ["-key", str(clientKeyPath)] if certificate.hasKey else
+            newkey_arguments(certificate.keySpec)
+            + ["-keyout", str(clientKeyPath)]
+        ) + [
+            "-out", str(clientCSR_Path), "-config", str(cnfPath)
+        ], outputPaths=(
+            (clientCSR_Path,) if certificate.hasKey
+            else (clientKeyPath, clientCSR_Path)), environment=environment)
+        report(forClient + f'CSR and key {csrCompleted.returncode}.')
+        # Handy command to check the CSR, for key usages for example.
+        #
+        #     openssl req -in example.com/user01.csr.pem -text
+
+        # The serial number is allocated by the authority, not by the openssl
+        # -CAserial option, so that certificates can be signed in parallel
+        # without duplicate serial numbers. The openssl CLI has no way to hold
+        # on to the authority key so it's read from the file every time.
+        clientCertPath = certificate.certPath
+        signingCompleted = yield OpenSSLStep("signing", [
+            "openssl", "x509", "-req", "-in", str(clientCSR_Path)
+            , "-set_serial", f"0x{certificate.serial:X}"
+            , "-CA", str(authority.authorityCertPath)
+            , "-CAkey", str(authority.authorityKeyPath)
+            , "-out", str(clientCertPath)
+            # Add the CNF here, as well as in the csr step, because there
+            # doesn't seem to be an equivalent to copy_extensions in the openssl
+            # x509 command.
+            , "-extfile", str(cnfPath)
+        ], outputPaths=(clientCertPath,), environment=environment)
+        report(forClient + f'signing {signingCompleted.returncode}.')
+        if not certificate.exportProfile.exports:
+            return all(completed.returncode == 0 for completed in (
+                csrCompleted, signingCompleted))
+
+        # TOTH how to create a PFX that includes the chain of trust.
+        # https://stackoverflow.com/a/18830742/7657675
+        clientPEM_Completed = yield OpenSSLStep("pem", [
+            "openssl", "x509" , "-in", str(clientCertPath)
+        ], capture=True)
+        # The authority PEM is loaded once per run, not once per certificate.
+        chainPEM = clientPEM_Completed.stdout + authority.authorityMaterial.pem
+        report(forClient + f'PEM {clientPEM_Completed.returncode}.')
+
+        # https://stackoverflow.com/questions/21141215/creating-a-p12-file#comment55842075_21141215
+        clientExportCompleted = yield OpenSSLStep("export", [
+            "openssl", "pkcs12", "-export"
+            , "-inkey", str(clientKeyPath)
+            , "-out", str(certificate.exportPath)
+            , "-passout", f"pass:{certificate.passcode}"
+        ] + pkcs12_arguments(
+            certificate.exportProfile, certificate.exportIterations
+        ), input=chainPEM, outputPaths=(certificate.exportPath,))
+        report(forClient + f'export {clientExportCompleted.returncode}.')
+
+        return all(completed.returncode == 0 for completed in (
+            csrCompleted, signingCompleted, clientPEM_Completed
+            , clientExportCompleted))
+
+    def _pipeline_steps(self, authority, certificate):
+        # Same as _client_steps() but the CSR and certificate are passed from
+        # one command to the next through stdin and stdout, instead of through
+        # files. That's three openssl processes per certificate instead of
+        # four. The key file is still written by the csr step because it has to
+        # be in the depot anyway. The CSR is only written if it's to be kept.
+        forClient = certificate.label
+        cnfPath = certificate.cnfPath
+        environment = CNF_environment(certificate.email)
+        clientKeyPath = certificate.keyPath
+        csrPaths = (certificate.csrPath,) if certificate.keepCSR else ()
+
+        csrCompleted = yield OpenSSLStep("csr", [
+            "openssl", "req", "-new", "-nodes"
+        ] + (
+            ["-key", str(clientKeyPath)] if certificate.hasKey else
+            newkey_arguments(certificate.keySpec)
+            + ["-keyout", str(clientKeyPath)]
+        ) + ["-config", str(cnfPath)], capture=True, outputPaths=(
+            () if certificate.hasKey else (clientKeyPath,)
+        ) + csrPaths, stdoutPath=csrPaths[0] if csrPaths else None
+        , environment=environment)
+        report(forClient + f'CSR and key {csrCompleted.returncode}.')
+        if csrCompleted.returncode != 0:
+            return False
+
+        # The openssl x509 command reads the CSR from stdin and writes the
+        # certificate to stdout, which is then written to the depot and also
+        # passed straight on to the export.
+        signingCompleted = yield OpenSSLStep("signing", [
+            "openssl", "x509", "-req"
+            , "-set_serial", f"0x{certificate.serial:X}"
+            , "-CA", str(authority.authorityCertPath)
+            , "-CAkey", str(authority.authorityKeyPath)
+            , "-extfile", str(cnfPath)
+        ], input=csrCompleted.stdout, capture=True
+        , outputPaths=(certificate.certPath,), stdoutPath=certificate.certPath
+        , environment=environment)
+        report(forClient + f'signing {signingCompleted.returncode}.')
+        if (
+            signingCompleted.returncode != 0
+            or not certificate.exportProfile.exports
+        ):
+            return signingCompleted.returncode == 0
+
+        clientExportCompleted = yield OpenSSLStep("export", [
+            "openssl", "pkcs12", "-export"
+            , "-inkey", str(clientKeyPath)
+            , "-out", str(certificate.exportPath)
+            , "-passout", f"pass:{certificate.passcode}"
+        ] + pkcs12_arguments(
+            certificate.exportProfile, certificate.exportIterations
+        ), input=signingCompleted.stdout + authority.authorityMaterial.pem
+        , outputPaths=(certificate.exportPath,))
+        report(forClient + f'export {clientExportCompleted.returncode}.')
+        return clientExportCompleted.returncode == 0
+
+    @staticmethod
+    def _write_stdout(step, completed):
+        # Called in the timed stage of the step, so that writing is included.
+        if step.stdoutPath is not None and completed.returncode == 0:
+            step.stdoutPath.write_text(completed.stdout)
+
+    def createClient(self, authority, certificate):
+        steps = self._client_steps(authority, certificate)
+        completed = None
+        while True:
+            try:
+                step = steps.send(completed)
+            except StopIteration as stop:
+                return stop.value
+            with authority.timings.stage(
+                step.stage, certificate.stem.name, step.outputPaths
+            ) as timed:
+                completed = run(
+                    step.command, step.input, step.capture, step.environment)
+                timed.returncode = completed.returncode
+                self._write_stdout(step, completed)
+
+    async def createClientAsync(self, authority, certificate):
+        steps = self._client_steps(authority, certificate)
+        completed = None
+        while True:
+            try:
+                step = steps.send(completed)
+            except StopIteration as stop:
+                return stop.value
+            with authority.timings.stage(
+                step.stage, certificate.stem.name, step.outputPaths
+            ) as timed:
+                completed = await run_async(
+                    step.command, step.input, step.capture, step.environment)
+                timed.returncode = completed.returncode
+                self._write_stdout(step, completed)
+
+    def createCRL(self, authority, number, revocations, base, days, crlPath):
+        # The openssl ca command generates CRLs from a database of certificates,
+        # which is written for each CRL with only the revoked certificates in
+        # it. The database is in a temporary directory with the CRL number file
+        # and the configuration.
+        with tempfile.TemporaryDirectory(prefix="certauth-crl-") as directory:
+            databasePath = Path(directory, "index.txt")
+            numberPath = Path(directory, "crlnumber")
+            configPath = Path(directory, "ca.cnf")
+            with open(databasePath, "w") as database:
+                for row in revocations:
+                    database.write("\t".join((
+                        "R", index_time(row["notAfter"])
+                        , f'{index_time(row["revoked"])},{row["reason"]}'
+                        , index_serial(row["serial"]), "unknown"
+                        , f'/CN={row["client"] or row["serial"]}')) + "\n")
+            hexNumber = f"{number:X}"
+            numberPath.write_text(
+                ("0" if len(hexNumber) % 2 else "") + hexNumber + "\n")
+            # A delta CRL has the Delta CRL Indicator extension, which openssl
+            # has no configuration name for, so it's given as DER.
+            configPath.write_text("\n".join((
+                "[ ca ]", "default_ca = CA_default",
+                "[ CA_default ]",
+                f"database = {databasePath}",
+                f"crlnumber = {numberPath}",
+                "default_md = sha256",
+                "crl_extensions = crl_extensions",
+                "[ crl_extensions ]",
+                "authorityKeyIdentifier = keyid:always"
+            ) + (() if base is None else (
+                f"2.5.29.27 = critical, DER:{der_integer(base)}",)
+            )) + "\n")
+            crlCompleted = run([
+                "openssl", "ca", "-gencrl", "-batch"
+                , "-config", str(configPath)
+                , "-cert", str(authority.authorityCertPath)
+                , "-keyfile", str(authority.authorityKeyPath)
+                , "-crldays", str(days), "-out", str(crlPath)
+            ])
+        report(f'CRL {number} {crlCompleted.returncode}.')
+        return crlCompleted.returncode == 0
+
+    def _OCSP_signer(self, authority):
+        # In-process OCSP signing, if the cryptography package is installed,
+        # as a tuple of the signing function and the loaded authority. Loaded
+        # once per authority, because a responder signs again and again.
+        cached = getattr(self, '_OCSPSigner', None)
+        if cached is not None and cached[0] is authority:
+            return cached[1]
+        try:
+            from certauth.cryptography_backend import (
+                CryptographyBackend, sign_OCSP_responses)
+        except ImportError:
+            signer = None
+        else:
+            signer = (
+                sign_OCSP_responses,
+                CryptographyBackend().loadAuthority(authority))
+        self._OCSPSigner = (authority, signer)
+        return signer
+
+    def createOCSPResponses(self, authority, statuses, validity, jobs=1):
+        # Responses are signed in process if the cryptography package is
+        # installed, which avoids a process and a load of the authority key for
+        # every response.
+        signer = self._OCSP_signer(authority)
+        if signer is not None:
+            sign_OCSP_responses, (caCert, caKey) = signer
+            return sign_OCSP_responses(caCert, caKey, statuses, validity)
+
+        # Otherwise, the openssl ocsp command can only sign one response per
+        # certificate per process, from a database like the openssl ca
+        # database. Each process is given a database of only its own
+        # certificate so that the work of a refresh grows with the number of
+        # certificates, not its square. There's still one process per response,
+        # which is the remaining cost of this backend. Processes run in
+        # parallel jobs.
+        minutes = max(1, int(validity.total_seconds() // 60))
+        with tempfile.TemporaryDirectory(prefix="certauth-ocsp-") as directory:
+
+            def sign(status):
+                databasePath = Path(directory, status["serial"] + ".txt")
+                databasePath.write_text("\t".join((
+                    "R" if status["status"] == "revoked" else "V"
+                    , index_time(status["notAfter"])
+                    , "" if status["status"] != "revoked" else
+                    f'{index_time(status["revoked"])},{status["reason"]}'
+                    , index_serial(status["serial"]), "unknown"
+                    , "/CN=unknown")) + "\n")
+                responsePath = Path(directory, status["serial"] + ".der")
+                completed = subprocess.run([
+                    "openssl", "ocsp", "-index", str(databasePath)
+                    , "-CA", str(authority.authorityCertPath)
+                    , "-rsigner", str(authority.authorityCertPath)
+                    , "-rkey", str(authority.authorityKeyPath)
+                    , "-issuer", str(authority.authorityCertPath)
+                    , "-serial", "0x" + status["serial"]
+                    , "-no_nonce", "-resp_no_certs", "-nmin", str(minutes)
+                    , "-respout", str(responsePath)
+                ], capture_output=True, text=True)
+                databasePath.unlink()
+                if completed.returncode != 0:
+                    report(completed.stderr + "".join((
+                        f'Failed to sign OCSP response "{status["serial"]}".',
+                        f" Return code {completed.returncode}.")))
+                    return None
+                response = responsePath.read_bytes()
+                responsePath.unlink()
+                return response
+
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                responses = executor.map(sign, statuses)
+                return {
+                    int(status["serial"], 16): response
+                    for status, response in zip(statuses, responses)
+                    if response is not None}
+
+    def exportPFX(
+        self, keyPath, chainPEM, exportPath, passcode, exportProfile
+        , iterations
+    ):
+        # Same as the export step of a client certificate.
+        completed = run([
+            "openssl", "pkcs12", "-export"
+            , "-inkey", str(keyPath)
+            , "-out", str(exportPath)
+            , "-passout", f"pass:{passcode}"
+        ] + pkcs12_arguments(exportProfile, iterations), input=chainPEM)
+        report(f'For "{exportPath.name}" export {completed.returncode}.')
+        return completed.returncode == 0
+
+    def verifyCertificates(self, authority, certPaths):
+        # One openssl verify process for all the paths, which prints an OK line
+        # for each certificate that passes, and an error for each that doesn't.
+        completed = subprocess.run([
+            "openssl", "verify", "-CAfile", str(authority.authorityCertPath)
+        ] + [str(path) for path in certPaths], capture_output=True, text=True)
+        okPaths = set(
+            line[:-len(": OK")] for line in completed.stdout.splitlines()
+            if line.endswith(": OK"))
+        errors = {}
+        reason = None
+        for line in completed.stderr.splitlines():
+            match = verifyErrorPattern.fullmatch(line)
+            if match is not None:
+                reason = match.group(1)
+            elif line.startswith("error ") and line.endswith(
+                ": verification failed"
+            ):
+                errors[line[len("error "):-len(": verification failed")]] = (
+                    reason)
+                reason = None
+        return [
+            None if str(path) in okPaths
+            else errors.get(str(path)) or "not verified"
+            for path in certPaths]
+
+    def openPFX(self, exportPath, passcode):
+        completed = subprocess.run([
+            "openssl", "pkcs12", "-in", str(exportPath), "-nodes"
+            , "-passin", f"pass:{passcode}"
+        ], capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise ValueError(
+                (completed.stderr.strip().splitlines() or ["failed."])[0])
+        return (
+            "PRIVATE KEY-----" in completed.stdout,
+            [details.der for details in CertificateDetails.from_PEM(
+                completed.stdout)])
+
+    def generateKey(self, keyPath, keySpec):
+        # Output is captured because this can run in the background. It's only
+        # printed if something goes wrong.
+        keyCompleted = subprocess.run(
+            ["openssl", "genpkey"] + key_arguments(keySpec)
+            + ["-out", str(keyPath)], capture_output=True, text=True)
+        if keyCompleted.returncode != 0:
+            report(keyCompleted.stderr + "".join((
+                "Failed to generate pool key.",
+                f" Return code {keyCompleted.returncode}.")))
+        return keyCompleted.returncode == 0
@@ -0,0 +1,201 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for dates and times.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for SQLite databases.
+# https://docs.python.org/3/library/sqlite3.html
+import sqlite3
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+#
+# Local imports.
+#
+from certauth.depot_index import time_text
+
+# CRL reason codes that can be given when revoking, from RFC 5280.
+# https://datatracker.ietf.org/doc/html/rfc5280#section-5.3.1
+revocationReasons = (
+    "unspecified", "keyCompromise", "affiliationChanged", "superseded",
+    "cessationOfOperation"
+)
+
+# Each revocation has the number of the first CRL that lists it, so that a delta
+# CRL is a range query on that column. Revocations whose certificates have
+# expired are left out of CRLs by a range query on the notAfter column.
+schema = """
+CREATE TABLE IF NOT EXISTS revocations (
+    serial TEXT PRIMARY KEY,
+    stem TEXT,
+    client TEXT,
+    notAfter TEXT NOT NULL,
+    revoked TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    crlNumber INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS revocationsCRLNumber ON revocations (crlNumber);
+CREATE INDEX IF NOT EXISTS revocationsNotAfter ON revocations (notAfter);
+CREATE TABLE IF NOT EXISTS crls (
+    number INTEGER PRIMARY KEY,
+    base INTEGER,
+    issued TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+"""
+
+class RevocationStore:
+    """Revoked certificates, and the CRLs that have been issued, in an SQLite
+    database in the depot directory.
+
+    The store is separate from the depot index because the index can be rebuilt
+    from the certificate files, but revocations can't."""
+
+    def __init__(self, path):
+        self._path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _connect(self):
+        if self._connection is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(
+                str(self._path), check_same_thread=False, timeout=30)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.executescript(schema)
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def revoke(self, rows, reason="unspecified", when=None):
+        """Revoke the certificates of depot index rows. Certificates that are
+        revoked already are left as they are. Return the number revoked."""
+        revoked = time_text(when or datetime.now(timezone.utc))
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                # Immediate so that the CRL number can't change, in another
+                # process, before the revocations are written.
+                connection.execute("BEGIN IMMEDIATE")
+                crlNumber = self._last_number(connection) + 1
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO revocations"
+                    " (serial, stem, client, notAfter, revoked, reason"
+                    ", crlNumber) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    , (
+                        (row["serial"].upper(), row.get("stem")
+                         , row.get("client"), row["notAfter"], revoked
+                         , reason, crlNumber)
+                        for row in rows))
+                return connection.total_changes - before
+
+    @staticmethod
+    def _last_number(connection):
+        return connection.execute(
+            "SELECT COALESCE(MAX(number), 0) FROM crls").fetchone()[0]
+
+    def lastBase(self):
+        """Number of the latest full CRL, which is the base of a delta CRL, or
+        None if there hasn't been one. CRLs that haven't been written yet, or
+        failed, don't count."""
+        with self._lock:
+            return self._connect().execute(
+                "SELECT MAX(number) FROM crls WHERE base IS NULL AND path != ''"
+            ).fetchone()[0]
+
+    @staticmethod
+    def _unexpired(connection, base=None, now=None):
+        statement = "SELECT * FROM revocations WHERE notAfter > ?"
+        parameters = [time_text(now or datetime.now(timezone.utc))]
+        if base is not None:
+            statement += " AND crlNumber > ?"
+            parameters.append(base)
+        statement += " ORDER BY revoked, serial"
+        return [
+            dict(row) for row in
+            connection.execute(statement, parameters).fetchall()]
+
+    def unexpired(self, now=None):
+        """Revocations of certificates that haven't expired, oldest first."""
+        with self._lock:
+            return self._unexpired(self._connect(), now=now)
+
+    def startCRL(self, base=None, now=None):
+        """Allocate the number of a new CRL and return a tuple of the number
+        and the revocations to list in it, oldest first. Revocations of
+        certificates that have expired are left out. If base is given then the
+        CRL is a delta CRL and only has the revocations since that CRL.
+
+        The number is allocated in the same transaction as the revocations are
+        read, so any later revocation will be in the next CRL."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                number = self._last_number(connection) + 1
+                connection.execute(
+                    "INSERT INTO crls (number, base, issued, path)"
+                    " VALUES (?, ?, ?, '')"
+                    , (number, base, time_text(datetime.now(timezone.utc))))
+                return number, self._unexpired(connection, base, now)
+
+    def finishCRL(self, number, path):
+        """Record the path of a CRL that has been written."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "UPDATE crls SET path = ? WHERE number = ?"
+                    , (str(path), number))
+
+    def abandonCRL(self, number):
+        """Remove the record of a CRL that couldn't be written, so that its
+        number is used again by the next CRL."""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "DELETE FROM crls WHERE number = ? AND path = ''"
+                    , (number,))
+
+    def revokedSerials(self, serials):
+        """Set of those serial numbers that have been revoked."""
+        serials = [serial.upper() for serial in serials]
+        revoked = set()
+        if self._connection is None and not self._path.exists():
+            return revoked
+        with self._lock:
+            connection = self._connect()
+            # In batches, to stay under the SQLite limit on parameters.
+            for start in range(0, len(serials), 500):
+                batch = serials[start:start + 500]
+                revoked.update(row[0] for row in connection.execute(
+                    "SELECT serial FROM revocations WHERE serial IN ("
+                    + ", ".join("?" * len(batch)) + ")", batch))
+        return revoked
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM revocations").fetchone()[0]
@@ -0,0 +1,108 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for error numbers. Only used to detect moves between file systems.
+# https://docs.python.org/3/library/errno.html
+import errno
+#
+# Module for the operating system interface.
+# https://docs.python.org/3/library/os.html
+import os
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for high-level file operations.
+# https://docs.python.org/3/library/shutil.html
+import shutil
+#
+# Module for temporary files. Only used to name the run directory.
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+#
+# Module for interpreting file status. Only used for the file mode.
+# https://docs.python.org/3/library/stat.html
+import stat
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+
+def move_file(sourcePath, destinationPath):
+    """Move a file so that it appears at the destination all at once, even if
+    the source is on a different file system, like a memory-backed scratch
+    directory and a network-mounted depot. The file keeps its mode, so that a
+    private key that was created 0600 doesn't become readable by others."""
+    try:
+        os.replace(sourcePath, destinationPath)
+        return
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+    # Copy next to the destination, then rename, which is atomic.
+    destinationPath = Path(destinationPath)
+    partialPath = destinationPath.with_name(
+        "." + destinationPath.name + ".partial")
+    mode = stat.S_IMODE(os.stat(sourcePath).st_mode)
+    # Create the partial file with the final mode so that there's no moment
+    # when it has the umask default. Remove any stale partial file first, in
+    # case an earlier move was interrupted.
+    try:
+        os.unlink(partialPath)
+    except FileNotFoundError:
+        pass
+    descriptor = os.open(
+        partialPath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    try:
+        with open(descriptor, 'wb') as partialFile, \
+                open(sourcePath, 'rb') as sourceFile:
+            shutil.copyfileobj(sourceFile, partialFile)
+        # The umask could have cleared bits of the mode in os.open().
+        os.chmod(partialPath, mode)
+    except BaseException:
+        try:
+            os.unlink(partialPath)
+        except OSError:
+            pass
+        raise
+    os.replace(partialPath, destinationPath)
+    os.unlink(sourcePath)
+
+class ScratchDirectory:
+    """Directory for the intermediate files of one run, in a parent directory
+    like /dev/shm. The directory is created when it's first needed and is
+    deleted, with anything left in it, by remove()."""
+
+    def __init__(self, parentPath):
+        self._parentPath = Path(parentPath)
+        self._path = None
+        self._lock = threading.Lock()
+
+    @property
+    def parentPath(self):
+        return self._parentPath
+
+    @property
+    def path(self):
+        with self._lock:
+            if self._path is None:
+                self._parentPath.mkdir(parents=True, exist_ok=True)
+                self._path = Path(tempfile.mkdtemp(
+                    prefix="certauth-", dir=self._parentPath))
+            return self._path
+
+    def remove(self):
+        with self._lock:
+            if self._path is not None:
+                shutil.rmtree(self._path, ignore_errors=True)
+                self._path = None
@@ -0,0 +1,130 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for POSIX file locks. Not available on Windows, in which case there is
+# only locking between threads in the same process.
+# https://docs.python.org/3/library/fcntl.html
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+#
+# Module for the operating system interface. Only used for atomic replacement.
+# https://docs.python.org/3/library/os.html#os.replace
+import os
+#
+# Module for cryptographically strong random numbers. Only used for the first
+# serial number in a new serial file.
+# https://docs.python.org/3/library/secrets.html
+import secrets
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+
+class SerialAllocator:
+    """Allocate certificate serial numbers from an authority serial file.
+
+    The serial file has the same format as the openssl -CAserial file, which is
+    the last serial number used, in hexadecimal. Serial numbers are reserved
+    from the file in blocks, under a file lock, and then handed out from the
+    block under a thread lock. Any run, or any thread in a run, always gets
+    serial numbers that no other has had. Serial numbers left over in a block at
+    the end of a run are never used, which is harmless.
+
+    If there is a serial range, which is a tuple of the first serial number and
+    the serial number after the last, then serial numbers are only allocated
+    from that range. This is for shards of a run, which each have their own
+    range and serial file."""
+
+    def __init__(self, serialPath, blockSize=1, serialRange=None):
+        self._serialPath = serialPath
+        self._lockPath = serialPath.with_name(serialPath.name + ".lock")
+        self._blockSize = max(blockSize, 1)
+        self._serialRange = serialRange
+        self._lock = threading.Lock()
+        self._next = None
+        self._end = None
+
+    @property
+    def serialPath(self):
+        return self._serialPath
+
+    @property
+    def serialRange(self):
+        return self._serialRange
+
+    @property
+    def blockSize(self):
+        return self._blockSize
+    @blockSize.setter
+    def blockSize(self, blockSize):
+        self._blockSize = max(blockSize, 1)
+
+    def _read_last(self):
+        try:
+            text = self._serialPath.read_text().strip()
+        except FileNotFoundError:
+            text = ""
+        last = None if text == "" else int(text, 16)
+        if self._serialRange is not None:
+            first, end = self._serialRange
+            if last is None or not (first <= last < end):
+                # Start at a random place in the first half of the range, so
+                # that serial numbers are still unpredictable.
+                return first + secrets.randbelow((end - first) // 2) - 1
+            return last
+        if last is None:
+            # Same as openssl -CAcreateserial, which starts with a random
+            # number of 159 bits.
+            return secrets.randbits(159)
+        return last
+
+    def _write_last(self, last):
+        temporaryPath = self._serialPath.with_name(
+            self._serialPath.name + ".new")
+        temporaryPath.write_text(f"{last:X}\n")
+        os.replace(temporaryPath, self._serialPath)
+
+    def _reserve(self, count):
+        with open(self._lockPath, "a") as lockFile:
+            if fcntl is not None:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+            try:
+                first = self._read_last() + 1
+                if (
+                    self._serialRange is not None
+                    and first + count > self._serialRange[1]
+                ):
+                    raise ValueError(
+                        f'Serial range of "{self._serialPath}" used up.')
+                self._write_last(first + count - 1)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lockFile, fcntl.LOCK_UN)
+        return first
+
+    def reset(self):
+        """Forget any reserved block, for example after the depot is
+        recreated."""
+        with self._lock:
+            self._next = None
+            self._end = None
+
+    def __call__(self):
+        with self._lock:
+            if self._next is None or self._next >= self._end:
+                self._next = self._reserve(self._blockSize)
+                self._end = self._next + self._blockSize
+            serial = self._next
+            self._next += 1
+        return serial
@@ -0,0 +1,215 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""File in the certauth module."""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for bisection. Only used to count durations in histogram buckets.
+# https://docs.python.org/3/library/bisect.html
+from bisect import bisect_right
+#
+# Module for context managers. Only used for the stage() method.
+# https://docs.python.org/3/library/contextlib.html
+from contextlib import contextmanager
+#
+# Module for the operating system interface. Only used for file sizes.
+# https://docs.python.org/3/library/os.html#os.stat
+import os
+#
+# Module for threads. Only used for a lock.
+# https://docs.python.org/3/library/threading.html#lock-objects
+import threading
+#
+# Module for time. Only used for the performance counter.
+# https://docs.python.org/3/library/time.html#time.perf_counter
+import time
+
+# Stages of creating a client certificate, in order. The first stage includes
+# key generation, unless the key was taken from the key pool.
+clientStages = ("csr", "signing", "pem", "export")
+
+# Upper bounds of the histogram buckets, in seconds. There's also an unbounded
+# bucket at the end. Same as the Prometheus client library defaults.
+histogramBuckets = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def percentile(values, fraction):
+    """Nearest rank percentile of values, which must be sorted. For example,
+    fraction 0.95 for the 95th percentile."""
+    if len(values) == 0:
+        return None
+    rank = max(0, min(len(values) - 1, int(fraction * len(values) + 0.5) - 1))
+    return values[rank]
+
+class Step:
+    """One timed stage, as yielded by StageTimings.stage(). Set the return code
+    if the stage runs a command."""
+
+    def __init__(self):
+        self.returncode = None
+
+class StageTimings:
+    """Wall times, return codes, and bytes written by the stages of a run, like
+    the signing of each certificate.
+
+    Stages can be timed in any thread. Times are kept in memory, which is a few
+    dozen bytes per stage per certificate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    @contextmanager
+    def stage(self, name, client=None, outputPaths=()):
+        """Context manager that times its body as the stage with the name. The
+        stage fails if its body raises an exception, or sets a non-zero return
+        code in the Step. The sizes of any output paths that exist afterwards
+        are counted as bytes written."""
+        step = Step()
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield step
+            failed = step.returncode not in (None, 0)
+        finally:
+            seconds = time.perf_counter() - start
+            written = 0
+            for path in outputPaths:
+                try:
+                    written += os.stat(path).st_size
+                except OSError:
+                    pass
+            self.record(name, seconds, client, failed, written)
+
+    def record(self, name, seconds, client=None, failed=False, written=0):
+        with self._lock:
+            self._durations.setdefault(name, []).append(seconds)
+            self._failures[name] = self._failures.get(name, 0) + (
+                1 if failed else 0)
+            self._bytesWritten[name] = (
+                self._bytesWritten.get(name, 0) + written)
+            if client is not None:
+                self._clientSeconds[client] = (
+                    self._clientSeconds.get(client, 0.0) + seconds)
+
+    def clear(self):
+        with self._lock:
+            self._durations = {}
+            self._failures = {}
+            self._bytesWritten = {}
+            self._clientSeconds = {}
+
+    @property
+    def stageNames(self):
+        """Names of the stages that have been timed, in the order that each was
+        first timed."""
+        with self._lock:
+            return tuple(self._durations)
+
+    def durations(self, name):
+        with self._lock:
+            return tuple(self._durations.get(name, ()))
+
+    def summary(self, name):
+        """Dictionary of the count, total, p50, p95, and maximum of the times of
+        a stage, in seconds."""
+        durations = sorted(self.durations(name))
+        return {
+            "count": len(durations),
+            "total": sum(durations),
+            "p50": percentile(durations, 0.50),
+            "p95": percentile(durations, 0.95),
+            "max": durations[-1] if len(durations) > 0 else None
+        }
+
+    def slowestClients(self, count=10):
+        """List of (client, seconds) of the clients whose stages took the
+        longest in total, slowest first."""
+        with self._lock:
+            clients = list(self._clientSeconds.items())
+        clients.sort(key=lambda item: item[1], reverse=True)
+        return clients[:count]
+
+    def metrics(self, totals=None, slowest=10):
+        """Dictionary of everything that has been recorded, for JSON output.
+        Totals is a dictionary of run totals, like the number of certificates
+        created, to include as well."""
+        stages = {}
+        for name in self.stageNames:
+            durations = sorted(self.durations(name))
+            with self._lock:
+                failures = self._failures.get(name, 0)
+                written = self._bytesWritten.get(name, 0)
+            stages[name] = {
+                **self.summary(name),
+                "failed": failures,
+                "bytesWritten": written,
+                # Cumulative counts, like a Prometheus histogram.
+                "histogram": {
+                    **{
+                        f"{bound:g}": bisect_right(durations, bound)
+                        for bound in histogramBuckets},
+                    "+Inf": len(durations)
+                }
+            }
+        return {
+            "totals": {} if totals is None else dict(totals),
+            "stages": stages,
+            "slowestClients": [
+                {"client": client, "seconds": seconds}
+                for client, seconds in self.slowestClients(slowest)]
+        }
+
+def prometheus_text(metrics, prefix="certauth"):
+    """Prometheus text exposition of metrics from StageTimings.metrics()."""
+    lines = []
+    def family(name, kind, help):
+        lines.append(f"# HELP {prefix}_{name} {help}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+    for name, value in metrics["totals"].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            family(name, "gauge", f"Run total {name}.")
+            lines.append(f"{prefix}_{name} {value}")
+
+    stages = metrics["stages"]
+    family(
+        "stage_seconds", "histogram", "Wall time of each stage, in seconds.")
+    for stage, values in stages.items():
+        for bound, count in values["histogram"].items():
+            lines.append(
+                f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}}'
+                f' {count}')
+        lines.append(
+            f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {values["total"]}')
+        lines.append(
+            f'{prefix}_stage_seconds_count{{stage="{stage}"}}'
+            f' {values["count"]}')
+    family(
+        "stage_failures_total", "counter", "Number of times each stage failed.")
+    for stage, values in stages.items():
+        lines.append(
+            f'{prefix}_stage_failures_total{{stage="{stage}"}}'
+            f' {values["failed"]}')
+    family(
+        "stage_bytes_written_total", "counter"
+        , "Bytes of files written by each stage.")
+    for stage, values in stages.items():
+        lines.append(
+            f'{prefix}_stage_bytes_written_total{{stage="{stage}"}}'
+            f' {values["bytesWritten"]}')
+
+    family(
+        "client_seconds", "gauge"
+        , "Total time of the stages of the slowest clients, in seconds.")
+    for entry in metrics["slowestClients"]:
+        client = entry["client"].replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(
+            f'{prefix}_client_seconds{{client="{client}"}} {entry["seconds"]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,188 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""Tests of the certificate_details module, against certificates made by
+openssl. Run from the ca-openssl-cli directory like this.
+
+    python3 -m unittest discover tests
+"""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for dates and times.
+# https://docs.python.org/3/library/datetime.html
+from datetime import datetime, timezone
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for high-level file operations. Only used to find openssl.
+# https://docs.python.org/3/library/shutil.html#shutil.which
+import shutil
+#
+# Module for spawning a process to run a command.
+# https://docs.python.org/3/library/subprocess.html
+import subprocess
+#
+# Module for temporary files.
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+#
+# Unit test framework.
+# https://docs.python.org/3/library/unittest.html
+import unittest
+#
+# Local imports.
+#
+from certauth.certificate_details import (
+    CertificateDetails, pem_blocks, pem_text, pkcs7_certificates,
+    private_key_id, public_key_id)
+
+def _openssl(*arguments, binary=False):
+    return subprocess.run(
+        ("openssl",) + arguments, check=True, capture_output=True,
+        text=not binary).stdout
+
+def _field(output):
+    # Like "serial=1A2B" from openssl x509 -serial.
+    return output.strip().partition("=")[2]
+
+@unittest.skipIf(shutil.which("openssl") is None, "No openssl command.")
+class TestCertificateDetails(unittest.TestCase):
+
+    # Key specifiers and the openssl -newkey options for each.
+    keyOptions = {
+        "rsa:2048": ("-newkey", "rsa:2048"),
+        "ec:P-256": (
+            "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:P-256"),
+        "ec:P-384": (
+            "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:P-384")
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls._directory = tempfile.TemporaryDirectory()
+        cls._path = Path(cls._directory.name)
+        cls._certificates = {}
+        for keySpec, options in cls.keyOptions.items():
+            stem = cls._path / keySpec.replace(":", "_")
+            keyPath = stem.with_suffix(".key.pem")
+            certPath = stem.with_suffix(".cer.pem")
+            _openssl(
+                "req", "-x509", *options, "-nodes", "-keyout", str(keyPath),
+                "-out", str(certPath), "-days", "30", "-set_serial",
+                "0x1234567890ABCDEF",
+                "-subj", "/CN=user01@example.com/C=UK/O=Example Organisation"
+                "/emailAddress=user01@example.com",
+                "-addext", "keyUsage = digitalSignature, keyEncipherment",
+                "-addext", "extendedKeyUsage = clientAuth, emailProtection")
+            cls._certificates[keySpec] = (keyPath, certPath)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._directory.cleanup()
+
+    def _details(self, keySpec):
+        return CertificateDetails.from_PEM(
+            self._certificates[keySpec][1].read_text())[0]
+
+    def test_PEM_round_trip(self):
+        for keySpec, (_, certPath) in self._certificates.items():
+            with self.subTest(keySpec=keySpec):
+                text = certPath.read_text()
+                details = CertificateDetails.from_PEM(text)[0]
+                self.assertEqual(details.pem, text)
+                self.assertEqual(pem_text(pem_blocks(text)[0]), text)
+
+    def test_DER_matches_openssl(self):
+        for keySpec, (_, certPath) in self._certificates.items():
+            with self.subTest(keySpec=keySpec):
+                der = _openssl(
+                    "x509", "-in", str(certPath), "-outform", "DER",
+                    binary=True)
+                details = CertificateDetails(der)
+                self.assertEqual(details.der, der)
+                self.assertEqual(details.pem, certPath.read_text())
+
+    def test_fields_match_openssl(self):
+        for keySpec, (_, certPath) in self._certificates.items():
+            with self.subTest(keySpec=keySpec):
+                details = self._details(keySpec)
+                path = str(certPath)
+                self.assertEqual(
+                    f"{details.serial:X}",
+                    _field(_openssl("x509", "-in", path, "-noout", "-serial")))
+                self.assertEqual(details.fingerprint, _field(_openssl(
+                    "x509", "-in", path, "-noout", "-fingerprint", "-sha256")))
+                for flag, value in (
+                    ("-startdate", details.notBefore),
+                    ("-enddate", details.notAfter)
+                ):
+                    self.assertEqual(value, datetime.strptime(
+                        _field(_openssl("x509", "-in", path, "-noout", flag)),
+                        "%b %d %H:%M:%S %Y GMT").replace(tzinfo=timezone.utc))
+                self.assertEqual(details.subjectAttributes, {
+                    "CN": "user01@example.com", "C": "UK",
+                    "O": "Example Organisation",
+                    "emailAddress": "user01@example.com"})
+                # Self-signed, so the issuer is the subject.
+                self.assertEqual(details.issuer, details.subject)
+                self.assertEqual(details.issuerDER, details.subjectDER)
+
+    def test_key_spec(self):
+        for keySpec in self._certificates:
+            with self.subTest(keySpec=keySpec):
+                self.assertEqual(self._details(keySpec).keySpec, keySpec)
+
+    def test_private_key_id(self):
+        for keySpec, (keyPath, _) in self._certificates.items():
+            with self.subTest(keySpec=keySpec):
+                keyID = private_key_id(keyPath.read_text())
+                self.assertIsNotNone(keyID)
+                self.assertEqual(
+                    keyID, public_key_id(self._details(keySpec).publicKeyInfo))
+        # Keys of different certificates don't match.
+        self.assertNotEqual(
+            private_key_id(self._certificates["ec:P-256"][0].read_text()),
+            private_key_id(self._certificates["ec:P-384"][0].read_text()))
+
+    def test_extensions(self):
+        for keySpec in self._certificates:
+            with self.subTest(keySpec=keySpec):
+                details = self._details(keySpec)
+                self.assertEqual(
+                    details.keyUsages,
+                    ("digitalSignature", "keyEncipherment"))
+                self.assertEqual(
+                    details.extendedKeyUsages,
+                    ("clientAuth", "emailProtection"))
+                # Subject key identifier, from the openssl defaults.
+                self.assertIn("2.5.29.14", details.extensions)
+
+    def test_PKCS7(self):
+        certPaths = [certPath for _, certPath in self._certificates.values()]
+        certificateFiles = [
+            argument for certPath in certPaths
+            for argument in ("-certfile", str(certPath))]
+        expected = [
+            pem_blocks(certPath.read_text())[0] for certPath in certPaths]
+        for outputFormat in ("PEM", "DER"):
+            with self.subTest(outputFormat=outputFormat):
+                bundle = _openssl(
+                    "crl2pkcs7", "-nocrl", *certificateFiles, "-outform",
+                    outputFormat, binary=True)
+                self.assertEqual(pkcs7_certificates(bundle), expected)
+
+    def test_PKCS7_without_bundle(self):
+        with self.assertRaises(ValueError):
+            pkcs7_certificates(
+                self._certificates["rsa:2048"][1].read_bytes())
+
+if __name__ == '__main__':
+    unittest.main()
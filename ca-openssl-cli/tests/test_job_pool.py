@@ -0,0 +1,143 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""Tests of the job_pool module. Run from the ca-openssl-cli directory like
+this.
+
+    python3 -m unittest discover tests
+"""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for context managers. Only used to capture console output.
+# https://docs.python.org/3/library/contextlib.html#contextlib.redirect_stdout
+import contextlib
+#
+# Module for in-memory text files.
+# https://docs.python.org/3/library/io.html#io.StringIO
+import io
+#
+# Module for the Python interpreter. Only used to run a child process.
+# https://docs.python.org/3/library/sys.html#sys.executable
+import sys
+#
+# Module for time. Only used to make later jobs finish first.
+# https://docs.python.org/3/library/time.html#time.sleep
+import time
+#
+# Unit test framework.
+# https://docs.python.org/3/library/unittest.html
+import unittest
+#
+# Local imports.
+#
+from certauth.job_pool import JobPool, capture, report, run
+
+def _job(index, count, result=True):
+    # Later jobs finish sooner, so that the order of completion is the reverse
+    # of the order of submission.
+    time.sleep((count - index) * 0.01)
+    report(f"Job {index} start.")
+    report(f"Job {index} end.")
+    return result
+
+def _failing_job(index):
+    report(f"Job {index} start.")
+    raise RuntimeError(f"job {index}")
+
+class TestJobPool(unittest.TestCase):
+
+    def _expected(self, indexes):
+        return "".join(
+            f"Job {index} start.\nJob {index} end.\n" for index in indexes)
+
+    def test_output_in_order(self):
+        for jobs in (1, 4):
+            with self.subTest(jobs=jobs):
+                output = io.StringIO()
+                with JobPool(jobs, output) as jobPool:
+                    for index in range(12):
+                        jobPool.submit(_job, index, 12)
+                self.assertEqual(output.getvalue(), self._expected(range(12)))
+                self.assertEqual(jobPool.succeeded, 12)
+                self.assertEqual(jobPool.failed, 0)
+
+    def test_messages_and_callbacks_in_order(self):
+        output = io.StringIO()
+        calls = []
+        with JobPool(3, output) as jobPool:
+            jobPool.submit(_job, 0, 3)
+            jobPool.skip("Skipped 1.")
+            jobPool.submit(_job, 2, 3)
+            jobPool.then(lambda: calls.append(output.getvalue()))
+            jobPool.message("Message 3.")
+        self.assertEqual(output.getvalue(), "".join((
+            self._expected((0,)), "Skipped 1.\n", self._expected((2,)),
+            "Message 3.\n")))
+        # The callback ran after the output submitted before it.
+        self.assertEqual(calls, [
+            "".join((self._expected((0,)), "Skipped 1.\n",
+                     self._expected((2,))))])
+        self.assertEqual(jobPool.skipped, 1)
+        self.assertEqual(jobPool.succeeded, 2)
+
+    def test_failures_counted(self):
+        for jobs in (1, 4):
+            with self.subTest(jobs=jobs):
+                output = io.StringIO()
+                with JobPool(jobs, output) as jobPool:
+                    jobPool.submit(_job, 0, 4)
+                    jobPool.submit(_job, 1, 4, False)
+                    jobPool.submit(_failing_job, 2)
+                    # A result that is a serial number is success too.
+                    jobPool.submit(_job, 3, 4, "1A")
+                self.assertEqual(jobPool.succeeded, 2)
+                self.assertEqual(jobPool.failed, 2)
+                self.assertEqual(output.getvalue(), "".join((
+                    self._expected((0, 1)), "Job 2 start.\n",
+                    "Job failed RuntimeError('job 2').\n",
+                    self._expected((3,)))))
+
+    def test_failure_without_output_file(self):
+        # One job and no output file is the path where output goes straight
+        # to the console.
+        console = io.StringIO()
+        with contextlib.redirect_stdout(console), JobPool(1) as jobPool:
+            jobPool.submit(_failing_job, 0)
+            jobPool.submit(_job, 1, 1)
+        self.assertEqual(console.getvalue(), "".join((
+            "Job 0 start.\nJob failed RuntimeError('job 0').\n",
+            self._expected((1,)))))
+        self.assertEqual(jobPool.succeeded, 1)
+        self.assertEqual(jobPool.failed, 1)
+
+    def test_capture(self):
+        self.assertEqual(
+            capture(_job, 0, 0, "result"), ("result", self._expected((0,))))
+        result, output = capture(_failing_job, 0)
+        self.assertFalse(result)
+        self.assertEqual(
+            output, "Job 0 start.\nJob failed RuntimeError('job 0').\n")
+
+    def test_run_output_in_job(self):
+        def job():
+            report("Before.")
+            completed = run(
+                [sys.executable, "-c", "import os; print(os.environ['X'])"]
+                , environment={"X": "child"})
+            report("After.")
+            return completed.returncode == 0
+        output = io.StringIO()
+        with JobPool(2, output) as jobPool:
+            jobPool.submit(job)
+            jobPool.submit(job)
+        self.assertEqual(output.getvalue(), "Before.\nchild\nAfter.\n" * 2)
+        self.assertEqual(jobPool.succeeded, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""Tests of the scratch_directory module. Run from the ca-openssl-cli
+directory like this.
+
+    python3 -m unittest discover tests
+"""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for error numbers.
+# https://docs.python.org/3/library/errno.html
+import errno
+#
+# Module for the operating system interface.
+# https://docs.python.org/3/library/os.html
+import os
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for interpreting file status.
+# https://docs.python.org/3/library/stat.html
+import stat
+#
+# Module for temporary files.
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+#
+# Unit test framework.
+# https://docs.python.org/3/library/unittest.html
+import unittest
+from unittest import mock
+#
+# Local imports.
+#
+from certauth.scratch_directory import move_file
+
+class TestMoveFile(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self._path = Path(self._directory.name)
+        self._oldUmask = os.umask(0o022)
+        self.addCleanup(os.umask, self._oldUmask)
+
+    def _make_private_file(self, parent):
+        sourcePath = Path(parent, "client.key.pem")
+        descriptor = os.open(
+            sourcePath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with open(descriptor, 'w') as file:
+            file.write("private\n")
+        return sourcePath
+
+    def _check_moved(self, sourcePath, destinationPath):
+        self.assertFalse(sourcePath.exists())
+        self.assertEqual(destinationPath.read_text(), "private\n")
+        self.assertEqual(
+            stat.S_IMODE(os.stat(destinationPath).st_mode), 0o600)
+        self.assertEqual(
+            [path.name for path in destinationPath.parent.iterdir()],
+            [destinationPath.name])
+
+    def test_cross_device_keeps_mode(self):
+        sourceDirectory = self._path / "scratch"
+        sourceDirectory.mkdir()
+        destinationDirectory = self._path / "depot"
+        destinationDirectory.mkdir()
+        sourcePath = self._make_private_file(sourceDirectory)
+        destinationPath = destinationDirectory / sourcePath.name
+
+        # Fail the first rename like a move between file systems would.
+        realReplace = os.replace
+        calls = []
+        def replace(source, destination):
+            calls.append(source)
+            if len(calls) == 1:
+                raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+            return realReplace(source, destination)
+
+        with mock.patch('os.replace', replace):
+            move_file(sourcePath, destinationPath)
+        self.assertEqual(len(calls), 2)
+        self._check_moved(sourcePath, destinationPath)
+
+    def test_real_cross_device_keeps_mode(self):
+        shm = Path("/dev/shm")
+        if not shm.is_dir() or (
+            os.stat(shm).st_dev == os.stat(self._path).st_dev
+        ):
+            self.skipTest("No second file system at /dev/shm.")
+        with tempfile.TemporaryDirectory(dir=shm) as scratch:
+            sourcePath = self._make_private_file(scratch)
+            destinationPath = self._path / sourcePath.name
+            move_file(sourcePath, destinationPath)
+            self._check_moved(sourcePath, destinationPath)
+
+if __name__ == '__main__':
+    unittest.main()
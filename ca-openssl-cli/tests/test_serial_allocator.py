@@ -0,0 +1,145 @@
+#
+#   Copyright (c) 2025 Omnissa, LLC. All rights reserved.
+#   This product is protected by copyright and intellectual property laws in the
+#   United States and other countries as well as by international treaties.
+#   -- Omnissa Public
+#
+
+# Run with Python 3.9 or later.
+"""Tests of the serial_allocator module. Run from the ca-openssl-cli directory
+like this.
+
+    python3 -m unittest discover tests
+"""
+#
+# Standard library imports, in alphabetic order.
+#
+# Module for running threads and processes in a pool.
+# https://docs.python.org/3/library/concurrent.futures.html
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+#
+# Module for OO path handling.
+# https://docs.python.org/3/library/pathlib.html
+from pathlib import Path
+#
+# Module for temporary files.
+# https://docs.python.org/3/library/tempfile.html
+import tempfile
+#
+# Unit test framework.
+# https://docs.python.org/3/library/unittest.html
+import unittest
+#
+# Local imports.
+#
+from certauth.serial_allocator import SerialAllocator, fcntl
+
+def _allocate(serialPath, count, blockSize):
+    """Allocate serial numbers in a process of its own, from a new allocator
+    like a separate run would have."""
+    allocator = SerialAllocator(Path(serialPath), blockSize)
+    return [allocator() for _ in range(count)]
+
+class TestSerialAllocator(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self._serialPath = Path(self._directory.name, "authority.srl")
+
+    def _last(self):
+        return int(self._serialPath.read_text().strip(), 16)
+
+    def test_continues_from_serial_file(self):
+        self._serialPath.write_text("1F\n")
+        allocator = SerialAllocator(self._serialPath)
+        self.assertEqual([allocator() for _ in range(3)], [0x20, 0x21, 0x22])
+        self.assertEqual(self._last(), 0x22)
+
+    def test_new_serial_file(self):
+        allocator = SerialAllocator(self._serialPath)
+        first = allocator()
+        self.assertEqual(self._last(), first)
+        self.assertLess(first, 2 ** 159 + 1)
+
+    def test_reserves_blocks(self):
+        self._serialPath.write_text("100\n")
+        allocator = SerialAllocator(self._serialPath, blockSize=4)
+        self.assertEqual(allocator(), 0x101)
+        # The whole block is reserved in the file by the first allocation.
+        self.assertEqual(self._last(), 0x104)
+        self.assertEqual(
+            [allocator() for _ in range(3)], [0x102, 0x103, 0x104])
+        self.assertEqual(self._last(), 0x104)
+        self.assertEqual(allocator(), 0x105)
+        self.assertEqual(self._last(), 0x108)
+
+    def test_blocks_of_two_allocators_are_disjoint(self):
+        self._serialPath.write_text("0\n")
+        first = SerialAllocator(self._serialPath, blockSize=3)
+        second = SerialAllocator(self._serialPath, blockSize=3)
+        serials = [first(), second(), first(), second()]
+        self.assertEqual(serials, [1, 4, 2, 5])
+
+    def test_threads(self):
+        self._serialPath.write_text("0\n")
+        allocator = SerialAllocator(self._serialPath, blockSize=5)
+        with ThreadPoolExecutor(8) as executor:
+            serials = list(executor.map(
+                lambda _: allocator(), range(200)))
+        self.assertEqual(len(set(serials)), len(serials))
+        self.assertLessEqual(max(serials), self._last())
+
+    @unittest.skipIf(fcntl is None, "No file locks on this platform.")
+    def test_processes(self):
+        self._serialPath.write_text("0\n")
+        with ProcessPoolExecutor(4) as executor:
+            results = list(executor.map(
+                _allocate, [str(self._serialPath)] * 8, [50] * 8, [7] * 8))
+        serials = [serial for result in results for serial in result]
+        self.assertEqual(len(serials), 400)
+        self.assertEqual(len(set(serials)), len(serials))
+        self.assertLessEqual(max(serials), self._last())
+
+    def test_shard_range(self):
+        serialRange = (0x1000, 0x1100)
+        allocator = SerialAllocator(self._serialPath, 4, serialRange)
+        serials = [allocator() for _ in range(10)]
+        for serial in serials:
+            self.assertGreaterEqual(serial, serialRange[0])
+            self.assertLess(serial, serialRange[1])
+        # Starts in the first half of the range.
+        self.assertLess(serials[0], 0x1080 + 1)
+        self.assertEqual(serials, list(range(serials[0], serials[0] + 10)))
+
+    def test_shard_range_ignores_serial_outside(self):
+        # A serial file from before the shard, or from another shard, isn't
+        # continued from.
+        self._serialPath.write_text("FFFF\n")
+        allocator = SerialAllocator(self._serialPath, 1, (0x10, 0x20))
+        serial = allocator()
+        self.assertGreaterEqual(serial, 0x10)
+        self.assertLess(serial, 0x20)
+
+    def test_shard_range_used_up(self):
+        self._serialPath.write_text("1D\n")
+        allocator = SerialAllocator(self._serialPath, 1, (0x10, 0x20))
+        self.assertEqual([allocator(), allocator()], [0x1E, 0x1F])
+        with self.assertRaises(ValueError):
+            allocator()
+        # Nothing is reserved by the failed allocation.
+        self.assertEqual(self._last(), 0x1F)
+
+    def test_reset(self):
+        self._serialPath.write_text("0\n")
+        allocator = SerialAllocator(self._serialPath, blockSize=10)
+        self.assertEqual(allocator(), 1)
+        # Like the depot being recreated with a new serial file.
+        self._serialPath.write_text("500\n")
+        self.assertEqual(allocator(), 2)
+        allocator.reset()
+        self.assertEqual(allocator(), 0x501)
+        self.assertEqual(self._last(), 0x50A)
+
+if __name__ == '__main__':
+    unittest.main()